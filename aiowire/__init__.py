@@ -2,12 +2,20 @@ import importlib.metadata
 
 __version__ = importlib.metadata.version("aiowire")
 
-from .event_loop import EventLoop, UnhandledException
+from .event_loop import EventLoop, UnhandledException, HIGH, NORMAL, LOW
 from .poller import Poller
+from .fd_poller import FdPoller
+from .edge_poller import EdgePoller
+from .shard import ShardedEventLoop
 from .wire import (
     Wire,
     Sequence,
     Call,
+    Offload,
+    InProcess,
     Repeat,
     Forever,
+    After,
+    Every,
 )
+from .compiler import compile, Program
@@ -0,0 +1,201 @@
+from typing import Optional, List, Tuple, Dict, Any
+from inspect import isawaitable
+import asyncio
+
+from .wire import Wire, Sequence, Call, Repeat, Forever
+
+# Opcodes
+CALL   = 0 # arg = (fn, args, kwargs): call fn, await the result if needed
+WCALL  = 1 # arg = (fn, args, kwargs): ret = fn(ev, ...); start ret
+WTAIL  = 2 # arg = (fn, args, kwargs): return fn(ev, ...)
+RUN    = 3 # arg = wire: ret = await wire(ev); start ret
+SPAWN  = 4 # arg = wire: start wire
+STEP   = 5 # continuation boundary (see EventLoop._drive)
+LOOP   = 6 # arg = n: set the loop counter
+NEXT   = 7 # arg = pc: decrement the loop counter, jump to pc if > 0
+JUMP   = 8 # arg = pc: jump to pc
+RETURN = 9 # arg = wire: return wire
+
+Op = Tuple[int, Any]
+
+class Program(Wire):
+    """
+    A wire compiled into a flat list of instructions by `compile`.
+
+    Running it has the same effect as running ``source``,
+    but without walking the tree of composed wires
+    (and creating a coroutine for each node) every time.
+    """
+    __slots__ = ('ops', 'source')
+
+    def __init__(self, ops : List[Op], source : Wire):
+        self.ops = ops
+        self.source = source
+
+    def __repr__(self):
+        return f"Program({self.source!r})"
+
+    async def __call__(self, ev) -> Optional[Wire]:
+        ops = self.ops
+        pc = 0
+        left = 0
+        steps = 0
+        budget = getattr(ev, "step_budget", 64)
+        # Yield when other wires were started (see EventLoop._drive).
+        track = hasattr(ev, "_started")
+        started = ev._started if track else 0
+        while True:
+            op, arg = ops[pc]
+            pc += 1
+            if op == CALL:
+                ret = arg[0](*arg[1], **arg[2])
+                if isawaitable(ret):
+                    await ret
+            elif op == WCALL:
+                ret = arg[0](ev, *arg[1], **arg[2])
+                if isawaitable(ret):
+                    ret = await ret
+                if ret is not None:
+                    ev.start(ret)
+            elif op == WTAIL:
+                ret = arg[0](ev, *arg[1], **arg[2])
+                if isawaitable(ret):
+                    ret = await ret
+                return ret
+            elif op == RUN:
+                ret = await arg(ev)
+                if ret is not None:
+                    ev.start(ret)
+            elif op == SPAWN:
+                ev.start(arg)
+            elif op == STEP:
+                steps += 1
+                if steps == budget or (track and ev._started != started):
+                    steps = 0
+                    await asyncio.sleep(0)
+                    if track:
+                        started = ev._started
+            elif op == LOOP:
+                left = arg
+            elif op == NEXT:
+                left -= 1
+                if left > 0:
+                    pc = arg
+            elif op == JUMP:
+                pc = arg
+            else: # RETURN
+                return arg
+
+class _Compiler:
+    def __init__(self):
+        # Programs compiled so far, by id of their source
+        # (and the source, to keep the id valid).
+        self.done : Dict[int, Tuple[Wire, Wire]] = {}
+
+    def compile(self, w : Wire) -> Wire:
+        key = id(w)
+        if key in self.done:
+            return self.done[key][1]
+        if type(w) not in (Sequence, Repeat, Forever):
+            return w # nothing to gain
+        ops : List[Op] = []
+        prog = Program(ops, w)
+        self.done[key] = (w, prog)
+        self.tail(w, ops)
+        return prog
+
+    def head(self, w : Wire, ops : List[Op]) -> None:
+        # Emit ops that run w, starting whatever it returns.
+        t = type(w)
+        if t is Call:
+            ops.append( (CALL, (w._aiowire_fn, w.args, w.kwargs)) ) # type: ignore[attr-defined]
+        elif t is Wire:
+            ops.append( (WCALL, (w._aiowire, w.args, w.kwargs)) )
+        elif t is Sequence:
+            # Walk the left spine of a >> b >> c iteratively,
+            # so long chains don't hit the recursion limit.
+            rest = []
+            while type(w) is Sequence:
+                rest.append(w.b) # type: ignore[attr-defined]
+                w = w.a # type: ignore[attr-defined]
+            self.head(w, ops)
+            for b in reversed(rest):
+                ops.append( (SPAWN, self.compile(b)) )
+        elif t is Repeat:
+            n = w.n # type: ignore[attr-defined]
+            if n > 1:
+                self.head(w.a, ops) # type: ignore[attr-defined]
+                ops.append( (SPAWN, self.compile(
+                                Repeat(w.a, n-1))) ) # type: ignore[attr-defined]
+            elif n == 1:
+                ops.append( (SPAWN, self.compile(w.a)) ) # type: ignore[attr-defined]
+        elif t is Forever:
+            self.head(w.a, ops) # type: ignore[attr-defined]
+            ops.append( (SPAWN, self.compile(w)) )
+        else:
+            ops.append( (RUN, w) )
+
+    def tail(self, w : Wire, ops : List[Op]) -> None:
+        # Emit ops that run w, and return its continuation.
+        t = type(w)
+        if t is Call:
+            self.head(w, ops)
+            ops.append( (RETURN, None) )
+        elif t is Wire:
+            # (Always preceded by a STEP.)
+            ops.append( (WTAIL, (w._aiowire, w.args, w.kwargs)) )
+        elif t is Sequence:
+            while type(w) is Sequence:
+                self.head(w.a, ops) # type: ignore[attr-defined]
+                ops.append( (STEP, None) )
+                w = w.b # type: ignore[attr-defined]
+            self.tail(w, ops)
+        elif t is Repeat:
+            n = w.n # type: ignore[attr-defined]
+            if n > 1:
+                ops.append( (LOOP, n-1) )
+                start = len(ops)
+                self.head(w.a, ops) # type: ignore[attr-defined]
+                ops.append( (STEP, None) )
+                ops.append( (NEXT, start) )
+                self.tail(w.a, ops) # type: ignore[attr-defined]
+            elif n == 1:
+                ops.append( (STEP, None) )
+                self.tail(w.a, ops) # type: ignore[attr-defined]
+            else:
+                ops.append( (RETURN, None) )
+        elif t is Forever:
+            start = len(ops)
+            self.head(w.a, ops) # type: ignore[attr-defined]
+            ops.append( (STEP, None) )
+            ops.append( (JUMP, start) )
+        else:
+            ops.append( (RETURN, w) )
+
+def compile(w : Wire) -> Wire:
+    """
+    Flatten a wire composed from `Sequence` (``>>``),
+    `Repeat` (``*``), `Forever`, `Call` and plain `Wire`-s
+    into a `Program`: a linear list of instructions run
+    by a single loop.
+
+    The program behaves like ``w``, including concurrently starting
+    the wires that inner nodes return (these are compiled too).
+    Other wire types (including subclasses of the above, and
+    `Call`-s on their own) are run as-is.  Compiled programs can be
+    started any number of times, so frequently started wires only pay
+    for their construction once.
+
+    Each chain runs its steps in the same order as ``w``, but the
+    program may yield to the loop at different points, so its
+    interleaving with concurrently running wires can differ.
+    The gain is in chains run by one task (``a >> (b >> ...)``,
+    `Repeat` and `Forever`); when every node is started as a task of
+    its own (``a >> b >> ...``), the tasks dominate the cost
+    (see `benchmarks/bench_compile.py`).
+
+    Note that the composition is captured at compile time,
+    so later changes to the attributes of its nodes
+    (e.g. ``Repeat.n``) are not seen by the program.
+    """
+    return _Compiler().compile(w)
@@ -0,0 +1,117 @@
+from typing import Optional, Dict, Set, Any
+import os
+
+try:
+    import zmq
+except ImportError:
+    zmq = None # type: ignore[assignment]
+
+from .wire import Wire
+from .poller import Socket, _Registration
+from .fd_poller import FdPoller, POLLIN
+
+class EdgePoller(FdPoller):
+    """
+    Poller for many zmq sockets.
+
+    It has the same interface as `Poller` (without ``batch``),
+    but instead of polling every registered socket on each wakeup,
+    it watches each socket's ``zmq.FD`` with the asyncio selector
+    (as `FdPoller` does) and reads ``zmq.EVENTS`` only for the sockets
+    whose FD signalled.  So the cost of a wakeup depends on the
+    number of active sockets, not on the number registered.
+
+    zmq's FD is edge-triggered: it only signals changes, and
+    operations on the socket (like a callback's ``recv``) can consume
+    the signal.  So a socket's EVENTS are checked again after
+    each of its callbacks finishes, and it is dispatched as long as
+    it stays ready (up to `budget` times before letting other
+    sockets run).
+    """
+    budget = 64
+    _track_spawned = True
+
+    def __init__(self, socks : Dict[Socket, Wire],
+                       default_flags = POLLIN,
+                       default_mode : str = "spawn"):
+        # Duplicates of each socket's FD, so watching them doesn't
+        # clash with zmq.asyncio's own watch on the FD.
+        self._fds : Dict[Socket, int] = {}
+        self._scheduled : Set[Socket] = set()
+        self._checking : Optional[_Registration] = None
+        super().__init__(socks, default_flags, default_mode)
+
+    def register(self, sock : Socket, cb : Wire, flags = None,
+                 mode : Optional[str] = None, workers : int = 1) -> None:
+        """
+        Add a listener on zmq socket sock, invoking cb on activity.
+
+        If flags is None, self.default_flags is used.
+        If mode is None, self.default_mode is used
+        (``workers`` is the pool size for mode "pool").
+        """
+        if sock in self.socks:
+            raise IndexError(f"Already have a callback for sock: {sock}")
+        self._fds[sock] = os.dup(sock.getsockopt(zmq.FD)) # type: ignore[union-attr, arg-type]
+        try:
+            super().register(sock, cb, flags, mode, workers)
+        except BaseException:
+            os.close(self._fds.pop(sock))
+            raise
+
+    def unregister(self, sock : Socket) -> None:
+        super().unregister(sock)
+        self._scheduled.discard(sock)
+        os.close(self._fds.pop(sock))
+
+    def __del__(self):
+        for fd in self._fds.values():
+            os.close(fd)
+        self._fds.clear()
+
+    def _watch(self, reg : _Registration) -> None:
+        if self._loop is None: # not running yet
+            return
+        self._loop.add_reader(self._fds[reg.sock], self._ready, reg)
+        # Events may have arrived while the FD was not watched.
+        self._schedule(reg)
+
+    def _unwatch(self, reg : _Registration) -> None:
+        if self._loop is None:
+            return
+        self._loop.remove_reader(self._fds[reg.sock])
+
+    def _schedule(self, reg : _Registration) -> None:
+        if reg.sock not in self._scheduled and self._loop is not None:
+            self._scheduled.add(reg.sock)
+            self._loop.call_soon(self._scheduled_check, reg)
+
+    def _scheduled_check(self, reg : _Registration) -> None:
+        self._scheduled.discard(reg.sock)
+        self._ready(reg)
+
+    def _ready(self, reg : _Registration) -> None:
+        # Dispatch while reg stays ready, and its callbacks
+        # finish synchronously.
+        n = 0
+        self._checking = reg
+        try:
+            while reg.active and not reg.muted and self._ev is not None:
+                # Reading EVENTS also re-arms the FD.
+                if not reg.sock.getsockopt(zmq.EVENTS) & reg.flags: # type: ignore[union-attr, operator]
+                    return
+                if n == self.budget:
+                    self._schedule(reg)
+                    return
+                n += 1
+                before = reg.inflight
+                self._dispatch(self._ev, reg, ())
+                if reg.inflight > before:
+                    return # checked again when it finishes
+        finally:
+            self._checking = None
+
+    def _finished(self, reg : _Registration) -> None:
+        super()._finished(reg)
+        if reg is not self._checking and reg.active:
+            self._schedule(reg)
@@ -1,34 +1,211 @@
-from typing import Optional, Callable, List, Dict
+from typing import (
+    Optional, Callable, List, Dict, Deque, Awaitable, Any, Generator, Tuple,
+)
+from collections import deque
 from inspect import isawaitable
 import asyncio
+import contextvars
+import functools
+import sys
+import types
 
-from .wire import Wire
+from .wire import Wire, After, Every, next_deadline
+from .timer import Timer, TimerWheel
+from .offload import ThreadPool
+from .process_pool import ProcessPool
+from .stats import Stats, WireStats, _OK, _EXC, _TYPE
+from .lag import LagMonitor, Stall
+from .trace import Tracer, Span, current_span, _unsampled
 
 Handler = Callable[['EventLoop', Exception], None]
 
 class UnhandledException(Exception):
     pass
 
-def default_handler(handler : Optional[Handler] = None) -> Handler:
-    """ This default handler captures the traceback that lead to its creation.
+def unhandled(ev : 'EventLoop', e : Exception) -> None:
+    """ The handler used for wires started without one.
+        It is shared by all of them.
+    """
+    raise UnhandledException("Wire with no exception handler") from e
+
+def _add_note(e : BaseException, note : str) -> None:
+    if hasattr(e, "add_note"): # python >= 3.11
+        e.add_note(note)
+    else:
+        notes = getattr(e, "__notes__", [])
+        e.__notes__ = notes + [note] # type: ignore[attr-defined]
+
+def default_handler(handler : Optional[Handler] = None,
+                    site : Optional[Tuple[str, int, str]] = None) -> Handler:
+    """ This default handler captures the context of its creation.
 
         Any exception raised by the provided handler will
         be re-raised, with an extra note on where this
-        default_handler was created (i.e. the original `EventLoop.start()`)..
+        default_handler was created (i.e. the original `EventLoop.start()`),
+        given as `site = (filename, lineno, function name)`.
 
         If handler is None, then this works as if handler was just
         `raise UnhandledException`.
+
+        `EventLoop` only creates these in debug mode.
     """
     def insulated_handler(ev : 'EventLoop', e : Exception):
-        if handler is None:
-            raise UnhandledException("Wire with no exception handler") from e
-        else:
-            try:
+        try:
+            if handler is None:
+                unhandled(ev, e)
+            else:
                 handler(ev, e)
-            except Exception as e2:
-                raise e2 from e
+        except Exception as e2:
+            if site is not None:
+                _add_note(e2, 'Wire started at File "%s", line %d, in %s'
+                              % site)
+            raise e2 from e
     return insulated_handler
 
+# Outcomes of the first step of a coroutine, taken by _eager_task.
+_YIELDED = 0
+_RETURNED = 1
+_RAISED = 2
+
+@types.coroutine
+def _resume_steps(coro, ctx : contextvars.Context,
+                  first : List[Any]) -> Generator:
+    # Finish a coroutine whose first step had outcome `first`:
+    # pass the values it yields up to the task running us,
+    # and forward everything the task sends (or throws) back down
+    # to the coroutine.
+    kind, yielded, blocking = first
+    if kind == _RETURNED:
+        return yielded
+    if kind == _RAISED:
+        raise yielded
+    if blocking:
+        # Hand the awaited future on to the task, as `await` would.
+        yielded._asyncio_future_blocking = True
+    while True:
+        try:
+            try:
+                value = yield yielded
+            except BaseException as e:
+                yielded = ctx.run(coro.throw, e)
+            else:
+                yielded = ctx.run(coro.send, value)
+        except StopIteration as stop:
+            return stop.value
+
+async def _resume(coro, ctx : contextvars.Context, first : List[Any]) -> Any:
+    """ Continue a coroutine that was stepped eagerly
+        (see `_eager_task`) inside an asyncio.Task.
+    """
+    return await _resume_steps(coro, ctx, first)
+
+def _lazy_task(coro) -> Tuple[bool, Any]:
+    """ Start a task running coro, as _eager_task would where
+        asyncio can't take a step within a task from outside it:
+        the first step is left to the task.
+    """
+    return False, asyncio.get_running_loop().create_task(coro)
+
+if sys.version_info >= (3, 12):
+    def _eager_task(coro) -> Tuple[bool, Any]:
+        """ Start a task running coro, and take its first step
+            right away (synchronously, but within the task).
+            Returns (True, value) if coro returned value in that step,
+            and (False, task) otherwise.
+        """
+        t = asyncio.Task(coro, loop=asyncio.get_running_loop(),
+                         eager_start=True)
+        if t.done() and not t.cancelled() and t.exception() is None:
+            return True, t.result()
+        return False, t
+elif hasattr(asyncio.tasks, "_enter_task") \
+        and hasattr(asyncio.tasks, "_leave_task"):
+    def _eager_task(coro) -> Tuple[bool, Any]:
+        """ Start a task running coro, and take its first step
+            right away (synchronously, but within the task).
+            Returns (True, value) if coro returned value in that step,
+            and (False, task) otherwise.
+        """
+        # Like the eager_start of Python 3.12: the first step runs
+        # with the new task swapped in as the current task, and its
+        # outcome is handed to the task's own coroutine.
+        # (This relies on asyncio's private _enter_task/_leave_task,
+        # which eager_start uses itself; without them, tasks are
+        # just created as usual, below.)
+        loop = asyncio.get_running_loop()
+        ctx = contextvars.copy_context()
+        first : List[Any] = [_RAISED, None, False]
+        t = loop.create_task(_resume(coro, ctx, first))
+        prev = asyncio.current_task(loop)
+        if prev is not None:
+            asyncio.tasks._leave_task(loop, prev)
+        asyncio.tasks._enter_task(loop, t)
+        try:
+            first[1] = ctx.run(coro.send, None)
+            first[0] = _YIELDED
+        except StopIteration as stop:
+            first[0] = _RETURNED
+            first[1] = stop.value
+        except (Exception, asyncio.CancelledError) as e:
+            first[1] = e
+        except BaseException:
+            t.cancel()
+            raise
+        finally:
+            asyncio.tasks._leave_task(loop, t)
+            if prev is not None:
+                asyncio.tasks._enter_task(loop, prev)
+        if first[0] == _RETURNED:
+            return True, first[1] # (t finishes by itself)
+        if first[0] == _YIELDED \
+                and getattr(first[1], "_asyncio_future_blocking",
+                            False) is True:
+            # Like a Task, take the future the coroutine is awaiting
+            # out of its "blocking" state, so other coroutines can
+            # await it before t gets to run.
+            first[1]._asyncio_future_blocking = False
+            first[2] = True
+        return False, t
+else:
+    _eager_task = _lazy_task
+
+# Span cell shared by all unsampled tasks.
+_unsampled_cell = [_unsampled]
+
+_overflow_policies = ("block", "drop_newest", "drop_oldest", "raise")
+
+# Priority classes for EventLoop.start
+HIGH = 0
+NORMAL = 1
+LOW = 2
+_nclasses = 3
+
+def _check_priority(priority : int) -> None:
+    if not (isinstance(priority, int) and HIGH <= priority <= LOW):
+        raise ValueError(f"Unknown priority: {priority!r}")
+
+class Latency:
+    """ Running summary of the admission latencies (in seconds)
+        of one priority class.
+    """
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, dt : float) -> None:
+        self.count += 1
+        self.total += dt
+        if dt > self.max:
+            self.max = dt
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count > 0 else 0.0
+
+    def __repr__(self):
+        return f"Latency(count={self.count}, mean={self.mean}, max={self.max})"
+
 class EventLoop:
     """
     Create a wire-driven event loop.
@@ -66,36 +243,685 @@ class EventLoop:
     returns another wire, or returns None,
     the handler will only be called once by each start()-ed
     task (or not at all).
+
+    Wires started without a handler share the `unhandled`
+    handler, which raises UnhandledException.
+    With `debug=True`, start() also records its caller's location,
+    and exceptions escaping the handler carry a note saying where
+    the wire was started.  This costs a closure per start(), so it
+    is off by default.
+
+    Scheduling:
+
+    Every task pushes itself onto a completion queue
+    (via a done-callback) when it finishes, and `run` just drains
+    that queue.  Hence the cost of handling a completion does not
+    depend on the number of tasks resident in the loop.
+
+    If `trampoline` is True (the default), a task keeps stepping
+    through the chain of Wire-s returned by its wire, rather than
+    handing each successor back to `run` to be wrapped in a new task.
+    The task yields to asyncio every `step_budget` steps so that
+    chains which never await cannot starve the other tasks.
+    It also yields after any step that started new wires, so those
+    get their first step before the successor runs (as they
+    would if the successor were a new task).
+
+    If `eager` is True, `start` takes the first step of each
+    wire's task synchronously, up to its first real suspension,
+    like asyncio's eager task factory: the step runs with the
+    wire's own task as the current task, so `asyncio.timeout`,
+    `TaskGroup` and the like work as usual.  The outcome of wires
+    that return without suspending is handled right away
+    (After and Every continuations go straight into the timer wheel).
+    Eager starts nested inside other eager starts are limited to
+    `inline_limit` levels, after which the wire's task is scheduled
+    as usual.
+
+    Eager starts are off by default, because they change what
+    `start` does: the caller runs the wire's first step before
+    `start` returns, so any state the wire reads must be ready
+    beforehand, and the first steps of the wires it starts come
+    before the caller's next statement.  Before Python 3.12 they
+    also cost an extra coroutine and context copy per task, and rely
+    on asyncio's private `_enter_task` and `_leave_task`; where those
+    are missing, wires are started as if `eager` were False.
+
+    Admission Control:
+
+    If `max_concurrency` is set, at most that many tasks run at once.
+    Wires started beyond the cap wait in a pending queue (in order),
+    and are admitted as running tasks finish.  Continuations
+    of a running wire are never queued.
+    If `max_pending` is also set, `overflow` decides what happens
+    to a wire started while the pending queue is full:
+
+      * "block" -- queue it anyway.  Use `await ev.submit(w)`
+        to wait for room in the pending queue instead.
+      * "drop_newest" -- discard the new wire.
+      * "drop_oldest" -- discard the oldest pending wire,
+        and queue the new one.
+      * "raise" -- start() raises asyncio.QueueFull.
+
+    The handler of a dropped wire is called (by `run`)
+    with an OverflowError.
+
+    The current queue depth is `ev.pending`, and `ev.pending_high`,
+    `ev.admitted` and `ev.dropped` count its high-water mark,
+    the wires admitted from it, and the wires dropped from it.
+
+    Priorities:
+
+    Wires are started with a priority class, `HIGH`, `NORMAL`
+    (the default) or `LOW`, which their continuations inherit.
+    Pending wires are admitted, and finished tasks are processed
+    by `run`, highest class first.  To prevent starvation,
+    a waiting class is served anyway once it has been passed over
+    `starvation_limit` times in a row.  The admission latency
+    of each class is summarized in `ev.latency[priority]`.
+    When "drop_oldest" overflows, the oldest wire of the lowest
+    pending class is dropped.
+
+    Timers:
+
+    Starting (or returning) an `After(delay, w)` wire files `w`
+    in a hierarchical timer wheel owned by the loop, instead of
+    keeping a task asleep.  Timers are rounded up to multiples of
+    `timer_resolution` seconds, and all timers due in the same
+    tick are started together by a single asyncio callback.
+    `ev.after(delay, w)` does the same, returning a `Timer`
+    that can be cancelled.  `run` keeps going while timers are pending.
+    An `Every(period, w)` wire is a single timer that is re-filed
+    after each tick.  Each tick runs `w` in a new task, like
+    any started wire.
+
+    Offloading:
+
+    `Offload(fn, *args)` wires call ``fn`` in `ev.thread_pool`,
+    a `ThreadPool` of `threads` threads created on first use,
+    so blocking calls don't stall the loop.  At most `thread_queue`
+    calls wait for a thread (unbounded if None).
+    Similarly, `InProcess(fn, *args)` wires call ``fn`` in
+    `ev.process_pool`, a `ProcessPool` of `processes` worker processes.
+    The pools are shut down when the loop exits.
+
+    Statistics:
+
+    With `stats=True`, the loop counts the starts, completions,
+    exceptions and non-Wire returns of each kind of wire,
+    and keeps a histogram of the residency times of (a sample of)
+    their tasks.  `ev.stats()` returns the `aiowire.stats.Stats`
+    object holding them.  When `stats` is False (the default),
+    none of this is done.  When enabled, it adds under 5% to the
+    cost of starting and finishing a trivial wire
+    (see `benchmarks/bench_stats.py`),
+    and proportionally less to wires doing real work.
+
+    If `lag_threshold` is set, a `aiowire.lag.LagMonitor` runs while
+    `run` does.  It reports every stall of more than `lag_threshold`
+    seconds, together with the wire (and the step of its chain) that
+    was running, to ``on_lag(ev, stall)`` and to `ev.stats()`.
+
+    Tracing:
+
+    Given an `aiowire.trace.Tracer`, the loop records a span for
+    each step of each wire it runs.  A wire started while another
+    is running is that wire's child (through a context variable),
+    and the continuation a wire returns is linked to it.
+    Wires started by a timer are roots of new traces.
     """
-    def __init__(self, timeout : Optional[float] = None):
-        self.tasks : Dict[asyncio.Task, Handler] = {}
+    step_budget = 64
+    inline_limit = 16
+    starvation_limit = 8
+
+    def __init__(self, timeout : Optional[float] = None,
+                       trampoline : bool = True,
+                       eager : bool = False,
+                       debug : bool = False,
+                       max_concurrency : Optional[int] = None,
+                       max_pending : Optional[int] = None,
+                       overflow : str = "block",
+                       timer_resolution : float = 0.01,
+                       threads : Optional[int] = None,
+                       thread_queue : Optional[int] = None,
+                       processes : Optional[int] = None,
+                       stats : bool = False,
+                       lag_threshold : Optional[float] = None,
+                       on_lag : Optional[Callable[['EventLoop', Stall],
+                                                  None]] = None,
+                       tracer : Optional[Tracer] = None):
+        if max_concurrency is not None and max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+        if max_pending is not None and max_pending < 1:
+            raise ValueError("max_pending must be at least 1")
+        if overflow not in _overflow_policies:
+            raise ValueError(f"Unknown overflow policy: {overflow}")
+        # Running tasks (and finished futures holding the outcome
+        # of wires that completed during start()).
+        self.tasks : Dict[asyncio.Future, Handler] = {}
         self.timeout = timeout
+        self.trampoline = trampoline
+        self.eager = eager
+        self.debug = debug
+        # Depth of nested eager start() calls.
+        self._inline = 0
+        # Number of calls to start(), used by _drive to notice new wires.
+        self._started = 0
+        # Tasks that have finished, but have not been processed by run(),
+        # by priority class.
+        self._done : List[Deque[asyncio.Future]] = \
+                            [deque() for c in range(_nclasses)]
+        self._done_skips = [0]*_nclasses
+        self._done_cbs = [functools.partial(self._on_done, c)
+                          for c in range(_nclasses)]
+        # Future that run() waits on when _done is empty.
+        self._wakeup : Optional[asyncio.Future] = None
+
+        self.max_concurrency = max_concurrency
+        self.max_pending = max_pending
+        self.overflow = overflow
+        # Wires waiting for admission (with the time they were queued)
+        # by priority class, and submit() calls waiting for room.
+        self._pending : List[Deque[Tuple[Wire, Handler, float]]] = \
+                            [deque() for c in range(_nclasses)]
+        self._pending_skips = [0]*_nclasses
+        self._npending = 0
+        self._room : Deque[asyncio.Future] = deque()
+        self.pending_high = 0
+        self.admitted = 0
+        self.dropped = 0
+        self.latency = [Latency() for c in range(_nclasses)]
+
+        self.timer_resolution = timer_resolution
+        # Created on first use.
+        self._wheel : Optional[TimerWheel] = None
+        self._timer_handle : Optional[asyncio.TimerHandle] = None
+
+        self.threads = threads
+        self.thread_queue = thread_queue
+        # Created on first use.
+        self._pool : Optional[ThreadPool] = None
+        self.processes = processes
+        self._procs : Optional[ProcessPool] = None
+
+        self._stats : Optional[Stats] = Stats() if stats else None
+        self.lag_threshold = lag_threshold
+        self.on_lag = on_lag
+        self._lag : Optional[LagMonitor] = None
+        self._tracer = tracer
+        # Cells holding the span of the latest step of each traced task.
+        self._spans : Dict[asyncio.Future, List[Span]] = {}
+
+    @property
+    def pending(self) -> int:
+        """ Number of wires waiting for admission. """
+        return self._npending
+
+    @property
+    def thread_pool(self) -> ThreadPool:
+        """ The pool running `Offload`-ed calls. """
+        if self._pool is None:
+            self._pool = ThreadPool(self.threads, self.thread_queue)
+        return self._pool
+
+    async def offload(self, fn : Callable, *args, **kwargs) -> Any:
+        """ Call fn(*args, **kwargs) in `thread_pool`,
+            and return its result.
+        """
+        return await self.thread_pool.run(fn, *args, **kwargs)
+
+    @property
+    def process_pool(self) -> ProcessPool:
+        """ The pool running `InProcess` calls. """
+        if self._procs is None:
+            self._procs = ProcessPool(self.processes)
+        return self._procs
+
+    async def in_process(self, fn : Callable, *args, **kwargs) -> Any:
+        """ Call fn(*args, **kwargs) in `process_pool`,
+            and return its result.
+        """
+        return await self.process_pool.run(fn, *args, **kwargs)
+
+    def stats(self) -> Stats:
+        """ Per-wire statistics, for a loop created with ``stats=True``.
+        """
+        if self._stats is None:
+            raise RuntimeError("EventLoop was created without stats=True")
+        return self._stats
+
+    def _stalled(self, stall : Stall) -> None:
+        # Report from the lag monitor.
+        if self._stats is not None:
+            self._stats.stalled(stall)
+        if self.on_lag is not None:
+            self.on_lag(self, stall)
+
+    def _pick(self, queues : List[Deque], skips : List[int]) -> int:
+        # Choose the priority class to serve next from queues
+        # (at least one of which must be non-empty).
+        best = -1
+        starved = -1
+        for c, q in enumerate(queues):
+            if len(q) == 0:
+                continue
+            if best < 0:
+                best = c
+            else:
+                skips[c] += 1
+                if starved < 0 and skips[c] > self.starvation_limit:
+                    starved = c
+        if starved >= 0:
+            best = starved
+        skips[best] = 0
+        return best
+
+    def _on_done(self, priority : int, t : asyncio.Future) -> None:
+        # Done-callback attached to every task (bound to its priority).
+        self._done[priority].append(t)
+        self._wake()
+
+    def _wake(self) -> None:
+        # Wake up run() if it is waiting.
+        w = self._wakeup
+        if w is not None and not w.done():
+            w.set_result(None)
+
+    def _outcome(self, handler : Handler, priority : int,
+                 result : Any = None,
+                 exc : Optional[Exception] = None) -> asyncio.Future:
+        # Hand the outcome of a wire that never became a task to run().
+        t = asyncio.get_running_loop().create_future()
+        if exc is None:
+            t.set_result(result)
+        else:
+            t.set_exception(exc)
+        self.tasks[t] = handler
+        self._on_done(priority, t)
+        return t
 
     def start(self, w : Optional[Wire],
               handler : Optional[Handler] = None,
-              capture_context : bool = True) -> None:
+              capture_context : bool = True,
+              priority : int = NORMAL,
+              eager : Optional[bool] = None) -> None:
         """ Schedule the wire, `w`, for execution with
-            the given exception handler.
+            the given exception handler and priority class.
+            If `eager` is given, it overrides the loop's `eager`
+            setting for this wire.
 
-            If capture_context is True, then exceptions raised
-            during invocation of the handler will be wrapped with
-            a traceback showing where start() was originally called.
+            If capture_context is True and the loop is in debug mode,
+            then exceptions raised during invocation of the handler
+            will carry a note showing where start() was originally called.
 
             `capture_context` is set to False when running Wire-s returned
             by Wire-s so we don't trace the entire state history, only
             the original `start()` location.
         """
+        _check_priority(priority)
+        if w is None:
+            return None
+        handler = self._handler(handler, capture_context)
+        self._start(w, handler, priority, eager)
+        return None
+
+    def after(self, delay : float, w : Optional[Wire],
+              handler : Optional[Handler] = None,
+              capture_context : bool = True,
+              priority : int = NORMAL) -> Optional[Timer]:
+        """ Start the wire, `w`, after `delay` seconds,
+            (like ``start(After(delay, w))``).
+
+            Returns a Timer, whose `cancel()` method
+            prevents the start.
+        """
+        _check_priority(priority)
+        if w is None:
+            return None
+        handler = self._handler(handler, capture_context)
+        deadline = asyncio.get_running_loop().time() + delay
+        return self._schedule(deadline, w, handler, priority)
+
+    async def submit(self, w : Optional[Wire],
+                     handler : Optional[Handler] = None,
+                     priority : int = NORMAL) -> None:
+        """ Like start(), but first wait until the pending queue
+            has room for another wire (see `max_pending`).
+        """
+        _check_priority(priority)
         if w is None:
             return None
+        handler = self._handler(handler, True)
+        while self.max_pending is not None \
+                and self._npending >= self.max_pending:
+            room = asyncio.get_running_loop().create_future()
+            self._room.append(room)
+            await room
+        self._start(w, handler, priority)
+
+    def _start(self, w : Wire, handler : Handler, priority : int,
+               eager : Optional[bool] = None) -> None:
+        # Launch a new wire, or queue it if there are too many running.
+        if self.max_concurrency is not None \
+                and len(self.tasks) >= self.max_concurrency:
+            self._enqueue(w, handler, priority)
+        else:
+            self.latency[priority].add(0.0)
+            self._launch(w, handler, priority, eager=eager)
+
+    def _handler(self, handler : Optional[Handler],
+                 capture_context : bool) -> Handler:
+        # Resolve the handler for a wire started by our caller's caller.
+        if capture_context and self.debug:
+            f = sys._getframe(2)
+            return default_handler(handler, (f.f_code.co_filename,
+                                             f.f_lineno,
+                                             f.f_code.co_name))
+        elif handler is None:
+            return unhandled
+        return handler
+
+    def _enqueue(self, w : Wire, handler : Handler, priority : int) -> None:
+        # Add a wire to the pending queue, according to the overflow policy.
+        if self.max_pending is not None \
+                and self._npending >= self.max_pending:
+            if self.overflow == "drop_newest":
+                self._drop(handler, priority)
+                return
+            elif self.overflow == "drop_oldest":
+                for c in range(_nclasses-1, -1, -1):
+                    q = self._pending[c]
+                    if len(q) > 0:
+                        dropped = q.popleft()
+                        self._npending -= 1
+                        self._drop(dropped[1], c)
+                        break
+            elif self.overflow == "raise":
+                raise asyncio.QueueFull(
+                        f"{self._npending} wires already pending")
+        self._pending[priority].append(
+                (w, handler, asyncio.get_running_loop().time()))
+        self._npending += 1
+        if self._npending > self.pending_high:
+            self.pending_high = self._npending
+
+    def _drop(self, handler : Handler, priority : int) -> None:
+        # Tell the handler of a wire dropped from the pending queue.
+        self.dropped += 1
+        self._outcome(handler, priority, exc=OverflowError(
+                f"Wire dropped: {self.max_pending} wires already pending"))
+
+    def _admit(self) -> None:
+        # Launch pending wires while there is room for them.
+        now = asyncio.get_running_loop().time()
+        while self._npending > 0 and (self.max_concurrency is None
+                         or len(self.tasks) < self.max_concurrency):
+            c = self._pick(self._pending, self._pending_skips)
+            w, handler, t0 = self._pending[c].popleft()
+            self._npending -= 1
+            self.admitted += 1
+            self.latency[c].add(now - t0)
+            self._launch(w, handler, c)
+        if len(self._room) > 0:
+            if self.max_pending is None:
+                free = len(self._room)
+            else:
+                free = self.max_pending - self._npending
+            while free > 0 and len(self._room) > 0:
+                room = self._room.popleft()
+                if not room.done():
+                    room.set_result(None)
+                    free -= 1
+
+    def _schedule(self, deadline : float, w : Wire,
+                  handler : Handler, priority : int,
+                  reuse : bool = False) -> Timer:
+        # File w in the timer wheel, to be started at deadline.
+        # (With reuse, the timer is recycled once it expires,
+        # so it must not be handed out.)
+        loop = asyncio.get_running_loop()
+        wheel = self._wheel
+        if wheel is None:
+            wheel = TimerWheel(self.timer_resolution, loop.time())
+            self._wheel = wheel
+        elif len(wheel) == 0:
+            wheel.advance(loop.time())
+        timer = wheel.add(deadline, w, handler, priority, reuse)
+        self._arm(loop)
+        return timer
+
+    def _arm(self, loop : asyncio.AbstractEventLoop) -> None:
+        # Make sure _on_timer gets called when the wheel next needs turning.
+        at = None if self._wheel is None else self._wheel.next_expiry()
+        h = self._timer_handle
+        if h is not None:
+            if at is not None and h.when() <= at:
+                return
+            h.cancel()
+            self._timer_handle = None
+        if at is not None:
+            self._timer_handle = loop.call_at(at, self._on_timer)
+
+    def _on_timer(self) -> None:
+        # Start the wires whose timers have expired.
+        assert self._timer_handle is not None and self._wheel is not None
+        loop = asyncio.get_running_loop()
+        now = max(loop.time(), self._timer_handle.when())
+        self._timer_handle = None
+        for timer in self._wheel.advance(now):
+            if timer.periodic:
+                self._run_coro(self._tick(timer),
+                               timer.handler, timer.priority)
+                continue
+            try:
+                self._start(timer.item, timer.handler, timer.priority)
+            except Exception as e:
+                self._outcome(timer.handler, timer.priority, exc=e)
+            if timer.reuse:
+                self._wheel.release(timer)
+        self._arm(loop)
+        self._wake()
+
+    async def _tick(self, timer : Timer) -> None:
+        # Run one tick of an Every wire (timer.item), then re-file timer.
+        every = timer.item
+        if self.trampoline:
+            ret = await self._drive(every.a)
+        else:
+            ret = every.a(self)
+            if isawaitable(ret):
+                ret = await ret
+        if isinstance(ret, Wire):
+            self._launch(ret, timer.handler, timer.priority)
+        elif ret is not None:
+            raise TypeError(f"Wire returned {ret}")
+
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        timer.deadline = next_deadline(timer.deadline, every.period,
+                                       now, every.policy)
+        assert self._wheel is not None
+        if len(self._wheel) == 0:
+            self._wheel.advance(now)
+        self._wheel.add_timer(timer)
+        self._arm(loop)
+
+    def _launch(self, w : Wire, handler : Handler, priority : int,
+                link : Optional[List[Span]] = None,
+                eager : Optional[bool] = None) -> None:
+        # Run the wire (eagerly, if possible), and track its task.
+        # `link` is the span cell of the task w continues (if traced).
+        if isinstance(w, After):
+            self._schedule(asyncio.get_running_loop().time() + w.delay,
+                           w.a, handler, priority, reuse=True)
+            return None
+        if isinstance(w, Every):
+            self._schedule(asyncio.get_running_loop().time() + w.period,
+                           w, handler, priority).periodic = True
+            return None
+        if self._tracer is not None:
+            return self._launch_traced(w, handler, priority, link, eager)
+        self._started += 1
+        if self.trampoline:
+            # (w is called by the task, so its coroutine is never
+            # left unawaited if the task is cancelled before it starts.)
+            # The task counts its own outcome, so run() needn't.
+            if self._stats is not None:
+                s, t0 = self._stats.start(w)
+                coro = self._drive(w, s, t0)
+            else:
+                coro = self._drive(w)
+            self._run_coro(coro, handler, priority, eager)
+            return None
         coro = w(self)
-        if isawaitable(coro):
-            #t = asyncio.ensure_future(coro)
-            t : asyncio.Task = asyncio.create_task(coro) # type: ignore[arg-type]
-            if handler is None or capture_context:
-                self.tasks[t] = default_handler(handler)
+        if not isawaitable(coro):
+            if self._stats is not None:
+                self._stats.launched(w, None)
+            return None
+        t = self._run_coro(coro, handler, priority, eager)
+        if self._stats is not None:
+            self._stats.launched(w, t)
+
+    def _launch_traced(self, w : Wire, handler : Handler, priority : int,
+                       link : Optional[List[Span]],
+                       eager : Optional[bool] = None) -> None:
+        # _launch, in a new span.
+        assert self._tracer is not None
+        span = self._tracer.begin(w, None if link is None else link[0])
+        token = current_span.set(span)
+        try:
+            self._started += 1
+            if span is not _unsampled:
+                cell = [span]
+                coro = self._traced(w, cell)
+            elif self.trampoline:
+                cell = _unsampled_cell
+                coro = self._drive(w)
             else:
-                self.tasks[t] = handler
-        return None
+                cell = _unsampled_cell
+                coro = w(self)
+                if not isawaitable(coro):
+                    self._tracer.end(span)
+                    return None
+            t = self._run_coro(coro, handler, priority, eager)
+        except BaseException as e:
+            self._tracer.end(span, e)
+            raise
+        finally:
+            current_span.reset(token)
+        if t is not None:
+            self._spans[t] = cell
+        if self._stats is not None:
+            self._stats.launched(w, t)
+
+    def _run_coro(self, coro : Awaitable, handler : Handler,
+             priority : int,
+             eager : Optional[bool] = None) -> Optional[asyncio.Future]:
+        # Run a coroutine in a task (stepped eagerly, if possible),
+        # and track it.  Returns the future run() will process, if any.
+        t : asyncio.Future
+        if eager is None:
+            eager = self.eager
+        if eager and self._inline < self.inline_limit \
+                 and asyncio.iscoroutine(coro):
+            self._inline += 1
+            try:
+                returned, t = _eager_task(coro)
+            finally:
+                self._inline -= 1
+            if returned:
+                ret : Any = t
+                if ret is None:
+                    return None
+                if isinstance(ret, (After, Every)):
+                    self._launch(ret, handler, priority)
+                    return None
+                # Let run() deal with the return value.
+                return self._outcome(handler, priority, result=ret)
+        else:
+            t = asyncio.create_task(coro) # type: ignore[arg-type]
+        self.tasks[t] = handler
+        t.add_done_callback(self._done_cbs[priority])
+        return t
+
+    async def _drive(self, w : Wire, s : Optional[WireStats] = None,
+                     t0 : Optional[float] = None) -> Any:
+        """ Run the wire, then each Wire it returns in turn,
+            all within the current task.
+
+            The first non-Wire return value (or After or Every wire,
+            which need a timer) is returned to `run`.
+            If s is given, the outcome is counted there
+            (see `Stats.start`).
+        """
+        started = self._started
+        steps = 0
+        try:
+            step = w(self)
+            while isawaitable(step):
+                ret = await step
+                if not isinstance(ret, Wire) \
+                        or isinstance(ret, (After, Every)):
+                    break
+                steps += 1
+                if steps == self.step_budget or started != self._started:
+                    steps = 0
+                    await asyncio.sleep(0)
+                    started = self._started
+                step = ret(self)
+            else:
+                ret = None
+        except Exception:
+            if s is not None:
+                s.outcome(_EXC, t0)
+            raise
+        if s is not None:
+            s.outcome(_OK if ret is None or isinstance(ret, Wire)
+                      else _TYPE, t0)
+        return ret
+
+    async def _traced(self, w : Wire, cell : List[Span]) -> Any:
+        # Like _drive (or just running w, if not trampolining),
+        # ending the span in cell[0] after each step, and starting
+        # a span for the next.
+        tracer = self._tracer
+        assert tracer is not None
+        started = self._started
+        steps = 0
+        try:
+            step = w(self)
+        except BaseException as e:
+            tracer.end(cell[0], e)
+            raise
+        if not isawaitable(step):
+            tracer.end(cell[0])
+            return None
+        while True:
+            try:
+                ret = await step
+            except BaseException as e:
+                tracer.end(cell[0], e)
+                raise
+            tracer.end(cell[0])
+            if not self.trampoline or not isinstance(ret, Wire) \
+                    or isinstance(ret, (After, Every)):
+                return ret
+            steps += 1
+            if steps == self.step_budget or started != self._started:
+                steps = 0
+                await asyncio.sleep(0)
+                started = self._started
+            span = tracer.begin(ret, cell[0])
+            cell[0] = span
+            current_span.set(span)
+            try:
+                step = ret(self)
+            except BaseException as e:
+                tracer.end(span, e)
+                raise
+            if not isawaitable(step):
+                tracer.end(span)
+                return None
 
     async def run(self, timeout : Optional[float] = None) -> None:
         """
@@ -103,6 +929,19 @@ class EventLoop:
         automatically when the ``async with EventLoop ...``
         context ends.
         """
+        if self.lag_threshold is None or self._lag is not None:
+            return await self._run(timeout)
+        self._lag = LagMonitor(self.lag_threshold, self._stalled,
+                        record = None if self._stats is None
+                                      else self._stats.lag.record)
+        self._lag.start()
+        try:
+            await self._run(timeout)
+        finally:
+            self._lag.stop()
+            self._lag = None
+
+    async def _run(self, timeout : Optional[float]) -> None:
         loop = asyncio.get_running_loop()
         t0 = loop.time()
         t1 = t0
@@ -110,26 +949,49 @@ class EventLoop:
             fin = None
         else:
             fin = t0+timeout
-        while len(self.tasks) > 0 and (fin is None or t1 < fin):
-            if fin is None:
-                dt = None
-            else:
-                dt = fin - t1
-            done, pending = await asyncio.wait(
-                    self.tasks,
-                    timeout = dt,
-                    return_when = asyncio.FIRST_COMPLETED)
-            for t in done:
+        done = self._done
+        tr = self._tracer
+        # (Trampolined tasks count their own outcomes.)
+        st = self._stats if tr is not None or not self.trampoline \
+                         else None
+        while (len(self.tasks) > 0 or self._npending > 0
+                or (self._wheel is not None and len(self._wheel) > 0)) \
+                and (fin is None or t1 < fin):
+            if self._npending > 0:
+                self._admit()
+            if not any(done):
+                if fin is None:
+                    dt = None
+                else:
+                    dt = fin - t1
+                self._wakeup = loop.create_future()
+                try:
+                    await asyncio.wait((self._wakeup,), timeout = dt)
+                finally:
+                    self._wakeup.cancel()
+                    self._wakeup = None
+            while any(done):
+                c = self._pick(done, self._done_skips)
+                t = done[c].popleft()
                 handler = self.tasks.pop(t)
-                # Need to await t to get its return value,
+                cell = None if tr is None else self._spans.pop(t, None)
+                # Need to get t's return value,
                 # then pass it to start again.
                 try:
-                    ret = await t
+                    ret = t.result()
                     if isinstance(ret, Wire):
-                        self.start(ret, handler, False)
+                        if st is not None:
+                            st.finish(t, _OK)
+                        self._launch(ret, handler, c, cell)
                     elif ret is not None:
+                        if st is not None:
+                            st.finish(t, _TYPE)
                         handler(self, TypeError(f"Wire returned {ret}"))
+                    elif st is not None:
+                        st.finish(t, _OK)
                 except Exception as e:
+                    if st is not None:
+                        st.finish(t, _EXC)
                     handler(self, e)
             t1 = loop.time()
 
@@ -143,7 +1005,32 @@ class EventLoop:
             await self.run(self.timeout)
 
         for t in self.tasks: #[max(self.cur-1,0):]:
+            for cb in self._done_cbs:
+                t.remove_done_callback(cb)
             if not t.done():
                 t.cancel()
         self.tasks.clear()
+        if self._stats is not None:
+            self._stats._tracked.clear()
+        self._spans.clear()
+        if self._tracer is not None:
+            self._tracer.flush()
+        for q in self._done:
+            q.clear()
+        for q in self._pending:
+            q.clear()
+        self._npending = 0
+        if self._timer_handle is not None:
+            self._timer_handle.cancel()
+            self._timer_handle = None
+        self._wheel = None
+        for room in self._room:
+            room.cancel()
+        self._room.clear()
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+        if self._procs is not None:
+            self._procs.shutdown()
+            self._procs = None
         return False # continue to raise any exception
@@ -0,0 +1,92 @@
+from typing import Optional, Dict, Any
+import asyncio
+import selectors
+
+from .wire import Wire
+from .event_loop import EventLoop
+from .poller import _Dispatcher, _Registration
+
+POLLIN = selectors.EVENT_READ
+POLLOUT = selectors.EVENT_WRITE
+
+class FdPoller(_Dispatcher):
+    """
+    File descriptor poller that does not need zmq.
+
+    It has the same interface as `Poller`, but watches
+    plain file descriptors (or objects with a ``fileno()`` method)
+    using the asyncio event loop's own selector
+    (``loop.add_reader`` / ``loop.add_writer``).
+    Callbacks are dispatched straight from the selector,
+    while the FdPoller wire itself just waits for `shutdown`.
+
+    Flags are POLLIN and/or POLLOUT (from this module,
+    and equal to zmq's).  Readiness is level-triggered,
+    so in mode "spawn" callbacks are started eagerly, and should
+    consume their input before they first suspend
+    (see `Poller` for the other modes).
+    """
+    eager_dispatch = True
+    def __init__(self, socks : Dict[Any, Wire],
+                       default_flags = POLLIN,
+                       default_mode : str = "spawn"):
+        super().__init__(default_flags, default_mode)
+        self.done = False
+        self._ev : Optional[EventLoop] = None
+        self._loop : Optional[asyncio.AbstractEventLoop] = None
+        self._stop : Optional[asyncio.Future] = None
+        for sock, cb in socks.items():
+            self.register(sock, cb)
+
+    def shutdown(self) -> None:
+        """
+        Stop watching all sockets, and finish the FdPoller wire.
+        """
+        self.done = True
+        if self._stop is not None and not self._stop.done():
+            self._stop.set_result(None)
+
+    def _ready(self, reg : _Registration) -> None:
+        if reg.active and not reg.muted:
+            self._dispatch(self._ev, reg, ()) # type: ignore[arg-type]
+
+    def _watch(self, reg : _Registration) -> None:
+        loop = self._loop
+        if loop is None: # not running yet
+            return
+        if reg.flags & POLLIN:
+            loop.add_reader(reg.sock, self._ready, reg)
+        if reg.flags & POLLOUT:
+            loop.add_writer(reg.sock, self._ready, reg)
+
+    def _unwatch(self, reg : _Registration) -> None:
+        loop = self._loop
+        if loop is None:
+            return
+        if reg.flags & POLLIN:
+            loop.remove_reader(reg.sock)
+        if reg.flags & POLLOUT:
+            loop.remove_writer(reg.sock)
+
+    async def __call__(self, ev : EventLoop) -> Optional[Wire]:
+        if self.done:
+            return None
+        if self._loop is not None:
+            raise RuntimeError("FdPoller is already running")
+        self._ev = ev
+        self._loop = asyncio.get_running_loop()
+        self._stop = self._loop.create_future()
+        for reg in self._regs.values():
+            if not reg.muted:
+                self._watch(reg)
+        try:
+            await self._stop
+        finally:
+            for reg in self._regs.values():
+                if not reg.muted:
+                    self._unwatch(reg)
+                self._stop_workers(reg)
+            self._loop = None
+            self._stop = None
+            self._ev = None
+        return None
@@ -0,0 +1,175 @@
+from typing import Optional, List, Tuple, Any
+from inspect import CO_COROUTINE
+import asyncio
+import os
+import sys
+import threading
+import time
+
+from .wire import Wire
+from .stats import wire_name
+
+# Frames belonging to the loop machinery, rather than to wires.
+_machinery = (os.path.join(os.path.dirname(__file__), "event_loop.py"),
+              os.path.dirname(asyncio.__file__) + os.sep)
+
+def _is_machinery(filename : str) -> bool:
+    return filename == _machinery[0] or filename.startswith(_machinery[1])
+
+class Stall:
+    """
+    A stretch of `lag` seconds during which the loop could not
+    run its callbacks, and the wire that was running then.
+
+    `path` names the wires on the stack, from the one the loop
+    was running (`wire`) down to the innermost (`step`), e.g.
+    ``["Forever", "Sequence", "Call(parse)"]``.  It is empty if no
+    wire was found (the stall was not caught in the act, or was
+    in code outside any wire).  Coroutines run by plain asyncio tasks
+    can't be told apart from async functions started as wires,
+    so they are named too.  `where` is the innermost Python frame
+    at the time, as (filename, lineno, function name).
+    """
+    __slots__ = ('lag', 'path', 'where')
+
+    def __init__(self, lag : float, path : List[str],
+                 where : Optional[Tuple[str, int, str]]):
+        self.lag = lag
+        self.path = path
+        self.where = where
+
+    @property
+    def wire(self) -> Optional[str]:
+        return self.path[0] if self.path else None
+
+    @property
+    def step(self) -> Optional[str]:
+        return self.path[-1] if self.path else None
+
+    def __repr__(self):
+        return f"Stall(lag={self.lag}, path={self.path}, where={self.where})"
+
+def blame(frame : Any) -> Tuple[List[str], Optional[Tuple[str, int, str]]]:
+    """ The wire path and innermost location (see `Stall`)
+        of a stack, given its innermost frame.
+    """
+    frames = []
+    f = frame
+    while f is not None:
+        frames.append(f)
+        f = f.f_back
+    if not frames:
+        return [], None
+    where = (frame.f_code.co_filename, frame.f_lineno, frame.f_code.co_name)
+    # Wire frames are the ones after the last frame of the loop.
+    start = len(frames)
+    for i, f in enumerate(frames):
+        if _is_machinery(f.f_code.co_filename):
+            start = i
+            break
+    path = []
+    for f in reversed(frames[:start]):
+        code = f.f_code
+        if code.co_name == "__call__":
+            w = f.f_locals.get("self")
+            if isinstance(w, Wire):
+                path.append(wire_name(w))
+                continue
+        if not path and code.co_flags & CO_COROUTINE:
+            # a plain async function, started as a wire
+            path.append(getattr(code, "co_qualname", code.co_name)
+                        .rsplit("<locals>.", 1)[-1])
+    return path, where
+
+class LagMonitor:
+    """
+    Measures how late the asyncio loop runs a heartbeat callback,
+    scheduled every `interval` seconds, and reports each delay
+    over `threshold` seconds as a `Stall` to ``report(stall)``
+    (on the loop's thread).
+
+    A heartbeat can only notice a stall after it is over.
+    So a watchdog thread checks on the heartbeat, and when it is
+    overdue, captures the loop thread's stack with
+    `sys._current_frames` to find the wire that is hogging the loop.
+    """
+    def __init__(self, threshold : float, report : Any,
+                 interval : Optional[float] = None,
+                 record : Any = None):
+        if threshold <= 0:
+            raise ValueError("threshold must be positive")
+        self.threshold = threshold
+        self.interval = threshold/2 if interval is None else interval
+        self.report = report
+        self.record = record # called with every heartbeat's lag
+        self.beats = 0
+        self._loop : Optional[asyncio.AbstractEventLoop] = None
+        self._handle : Optional[asyncio.TimerHandle] = None
+        self._thread : Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        # Time of the last heartbeat (perf_counter), and the stack
+        # captured by the watchdog during the current stall.
+        self._last = 0.0
+        self._caught : Optional[Tuple[int, List[str],
+                                      Optional[Tuple[str, int, str]]]] = None
+
+    @property
+    def running(self) -> bool:
+        return self._loop is not None
+
+    def start(self) -> None:
+        loop = asyncio.get_running_loop()
+        self._loop = loop
+        self._last = time.perf_counter()
+        self._handle = loop.call_at(loop.time() + self.interval,
+                                    self._beat)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._watch,
+                                        args=(threading.get_ident(),),
+                                        name="aiowire-lag", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._loop = None
+
+    def _beat(self) -> None:
+        assert self._loop is not None and self._handle is not None
+        now = self._loop.time()
+        lag = max(0.0, now - self._handle.when())
+        self._last = time.perf_counter()
+        caught = self._caught
+        self._caught = None
+        self.beats += 1
+        self._handle = self._loop.call_at(now + self.interval, self._beat)
+        if self.record is not None:
+            self.record(lag)
+        if lag > self.threshold:
+            if caught is not None and caught[0] == self.beats - 1:
+                path, where = caught[1], caught[2]
+            else:
+                path, where = [], None
+            self.report(Stall(lag, path, where))
+
+    def _watch(self, ident : int) -> None:
+        # Watchdog thread.
+        step = min(self.interval, self.threshold) / 2
+        while not self._stop.wait(step):
+            beats = self.beats
+            overdue = time.perf_counter() - self._last - self.interval
+            if overdue < self.threshold/2 or (self._caught is not None
+                                        and self._caught[0] == beats):
+                continue
+            frame = sys._current_frames().get(ident)
+            if frame is None:
+                continue
+            path, where = blame(frame)
+            del frame
+            if self.beats == beats: # still stalled
+                self._caught = (beats, path, where)
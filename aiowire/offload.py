@@ -0,0 +1,102 @@
+from typing import Optional, Callable, Any
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import os
+import sys
+import threading
+import time
+
+class ThreadPool:
+    """
+    A pool of `size` threads, owned by an `EventLoop`,
+    that runs the blocking calls of `Offload` wires.
+
+    At most `max_queue` calls wait for a free thread.
+    Further calls wait (asynchronously) for room in the queue,
+    so a burst of offloaded work pushes back on the wires
+    producing it.  If `max_queue` is None, the queue is unbounded.
+
+    `submitted`, `completed`, `busy` (calls running now) and
+    `queued` count the calls, and `utilization()` is the fraction
+    of the threads' time spent running them since the pool was created.
+    """
+    def __init__(self, size : Optional[int] = None,
+                       max_queue : Optional[int] = None):
+        if size is None:
+            size = min(32, (os.cpu_count() or 1) + 4)
+        if size < 1:
+            raise ValueError("size must be positive")
+        if max_queue is not None and max_queue < 0:
+            raise ValueError("max_queue must be non-negative")
+        self.size = size
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(size,
+                                            thread_name_prefix="aiowire")
+        # Created on first use, inside the running loop.
+        self._slots : Optional[asyncio.Semaphore] = None
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.completed = 0
+        self.busy = 0
+        self._queued = 0
+        self.busy_time = 0.0
+        self.t0 = time.perf_counter()
+
+    @property
+    def queued(self) -> int:
+        """ Number of calls waiting for a thread. """
+        return self._queued
+
+    def utilization(self) -> float:
+        """ Fraction of thread time spent running calls. """
+        elapsed = time.perf_counter() - self.t0
+        if elapsed <= 0:
+            return 0.0
+        return min(1.0, self.busy_time / (self.size * elapsed))
+
+    def _call(self, fn : Callable, args, kwargs) -> Any:
+        # Runs in a pool thread.
+        t = time.perf_counter()
+        with self._lock:
+            self._queued -= 1
+            self.busy += 1
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            dt = time.perf_counter() - t
+            with self._lock:
+                self.busy -= 1
+                self.busy_time += dt
+
+    async def run(self, fn : Callable, *args, **kwargs) -> Any:
+        """ Call fn(*args, **kwargs) in a pool thread,
+            and return its result.
+        """
+        if self.max_queue is not None:
+            if self._slots is None:
+                self._slots = asyncio.Semaphore(self.size + self.max_queue)
+            await self._slots.acquire()
+        self.submitted += 1
+        with self._lock:
+            self._queued += 1
+        cf = None
+        try:
+            cf = self._executor.submit(self._call, fn, args, kwargs)
+            return await asyncio.wrap_future(cf)
+        finally:
+            if cf is None or cf.cancelled():
+                # The call never started.
+                with self._lock:
+                    self._queued -= 1
+            self.completed += 1
+            if self._slots is not None:
+                self._slots.release()
+
+    def shutdown(self) -> None:
+        """ Stop the threads once their current calls finish,
+            discarding queued calls (without waiting).
+        """
+        if sys.version_info >= (3, 9):
+            self._executor.shutdown(wait=False, cancel_futures=True)
+        else:
+            self._executor.shutdown(wait=False)
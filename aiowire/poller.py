@@ -1,4 +1,8 @@
-from typing import Optional, Dict, Union
+from typing import Optional, Dict, List, Union, Callable, Any
+from inspect import isawaitable
+from abc import ABCMeta, abstractmethod
+import asyncio
+import os
 
 try:
     import zmq
@@ -13,7 +17,168 @@ except ImportError:
 from .wire import Wire
 from .event_loop import EventLoop
 
-class Poller(Wire):
+_modes = ("spawn", "serialized", "pool")
+
+# A Wire, or in batch mode a function called as ``cb(ev, msgs)``.
+Callback = Union[Wire, Callable[[EventLoop, List[Any]], Any]]
+
+class _Registration:
+    """ A socket registered with a poller, and its in-flight callbacks.
+    """
+    def __init__(self, sock : Socket, cb : Callback, flags : int,
+                 mode : str, workers : int):
+        self.sock = sock
+        self.cb : Any = cb
+        self.flags = flags
+        self.mode = mode
+        self.inflight = 0
+        # Not watched while `limit` callbacks are in flight.
+        self.limit : Optional[int] = None
+        self.muted = False
+        self.active = True
+        # Created on first dispatch, inside the running loop.
+        self.queue : Optional[asyncio.Queue] = None
+        self.workers = 0 # workers still to start
+        if mode == "serialized":
+            self.limit = 1
+        elif mode == "pool":
+            if workers < 1:
+                raise ValueError("workers must be positive")
+            self.limit = workers
+            self.workers = workers
+
+class _Dispatcher(Wire, metaclass=ABCMeta):
+    """
+    Registration of callbacks, and their dispatch according to
+    each socket's mode (see `Poller`).  Subclasses start and stop
+    watching a socket in `_watch` and `_unwatch`.
+    Callbacks are started with `EventLoop.start`'s `eager` set to
+    `eager_dispatch` (None for the loop's own setting).
+    Callbacks of "spawn" sockets are started as they are, and not
+    counted in `inflight`, unless `_track_spawned` is set (for
+    subclasses that need `_finished` after every callback).
+    """
+    eager_dispatch : Optional[bool] = None
+    _track_spawned = False
+    def __init__(self, default_flags, default_mode : str):
+        if default_mode not in _modes:
+            raise ValueError(f"Unknown mode: {default_mode}")
+        self.socks : Dict[Socket, Callback] = {}
+        self._regs : Dict[Socket, _Registration] = {}
+        self.default_flags = default_flags
+        self.default_mode = default_mode
+
+    @abstractmethod
+    def _watch(self, reg : _Registration) -> None:
+        ...
+
+    @abstractmethod
+    def _unwatch(self, reg : _Registration) -> None:
+        ...
+
+    def register(self, sock : Socket, cb : Wire, flags = None,
+                 mode : Optional[str] = None, workers : int = 1) -> None:
+        """
+        Add a listener on sock, invoking cb on activity.
+
+        If flags is None, self.default_flags is used.
+        If mode is None, self.default_mode is used
+        (``workers`` is the pool size for mode "pool").
+        """
+        self._add(sock, cb, flags, mode, workers)
+
+    def _add(self, sock : Socket, cb : Callback, flags,
+             mode : Optional[str], workers : int) -> None:
+        if flags is None:
+            flags = self.default_flags
+        if mode is None:
+            mode = self.default_mode
+        if mode not in _modes:
+            raise ValueError(f"Unknown mode: {mode}")
+        if sock in self.socks:
+            raise IndexError(f"Already have a callback for sock: {sock}")
+        reg = _Registration(sock, cb, flags, mode, workers)
+        self.socks[sock] = cb
+        self._regs[sock] = reg
+        self._watch(reg)
+
+    def unregister(self, sock : Socket) -> None:
+        """
+        Stop listening on sock.  Callbacks already in flight
+        run to completion, and then a pool's workers exit.
+        """
+        reg = self._regs.pop(sock)
+        del self.socks[sock]
+        reg.active = False
+        if not reg.muted:
+            self._unwatch(reg)
+        self._stop_workers(reg)
+
+    def inflight(self, sock : Socket) -> int:
+        """ The number of callbacks running for sock
+            (in mode "spawn", only an `EdgePoller` counts them).
+        """
+        return self._regs[sock].inflight
+
+    def _stop_workers(self, reg : _Registration) -> None:
+        if reg.queue is not None:
+            for i in range(reg.limit or 0):
+                reg.queue.put_nowait(None)
+        reg.workers = 0
+
+    def _dispatch(self, ev : EventLoop, reg : _Registration,
+                  args : tuple) -> None:
+        if reg.limit is None and not self._track_spawned:
+            ev.start(Wire(reg.cb, *args) if args else reg.cb,
+                     eager=self.eager_dispatch)
+            return
+        reg.inflight += 1
+        if reg.limit is not None and reg.inflight >= reg.limit:
+            self._unwatch(reg)
+            reg.muted = True
+        if reg.mode == "pool":
+            if reg.queue is None:
+                reg.queue = asyncio.Queue()
+            while reg.workers > 0:
+                reg.workers -= 1
+                ev.start(Wire(self._worker, reg))
+            reg.queue.put_nowait(args)
+        else:
+            ev.start(Wire(self._run, reg, args), eager=self.eager_dispatch)
+
+    def _finished(self, reg : _Registration) -> None:
+        reg.inflight -= 1
+        if reg.muted and reg.active:
+            reg.muted = False
+            self._watch(reg)
+
+    async def _run(self, ev : EventLoop, reg : _Registration,
+                   args : tuple) -> Optional[Wire]:
+        try:
+            ret = reg.cb(ev, *args)
+            if isawaitable(ret):
+                ret = await ret
+        finally:
+            self._finished(reg)
+        return ret
+
+    async def _worker(self, ev : EventLoop, reg : _Registration) -> None:
+        assert reg.queue is not None
+        while True:
+            args = await reg.queue.get()
+            if args is None:
+                return None
+            try:
+                ret = await self._run(ev, reg, args)
+            except BaseException:
+                # Replace this worker, and report the error.
+                if reg.active:
+                    ev.start(Wire(self._worker, reg))
+                raise
+            if ret is not None:
+                ev.start(ret)
+
+class Poller(_Dispatcher):
     """
     File descriptor poller.  When a file it's watching
     gets input, it starts the corresponding callback (Wire).
@@ -21,60 +186,163 @@ class Poller(Wire):
     init takes a dictionary mapping sockets to Wire-s
 
     Interval is a report-back time (in milliseconds).
-    It is only needed in the case that EventLoop is run without
-    a timeout AND you have some other Wire that will call
-    Poller.shutdown().
+    It is not needed to notice `shutdown`, `register` or `unregister`,
+    since these wake up a waiting poll through an internal pipe
+    (which is closed after shutdown).
+
+    With ``batch=N``, zmq sockets are drained without blocking,
+    up to N messages (each a list of frames from ``recv_multipart``)
+    at a time, and the callback is started as ``cb(ev, msgs)``
+    with that list, instead of as a Wire (so for zmq sockets it must
+    be a plain function, not a Wire).  Each cycle starts
+    serving the ready sockets at a different one (round-robin),
+    so no busy socket always goes first.  Raw file descriptors
+    are not drained, and their callbacks are started as usual.
+
+    Each socket has a dispatch mode (`default_mode` unless given
+    to `register`):
+
+      * "spawn" -- start the callback for every ready event
+      * "serialized" -- at most one callback in flight
+      * "pool" -- ``workers`` long-lived wires take turns running
+        the callback
+
+    In the last two, the socket is not polled while all its callbacks
+    are busy, so a slow callback can't cause a pile-up of new ones
+    on a socket that stays readable.  `inflight` counts the callbacks
+    running for each of these sockets (not including the continuations
+    they return).
+    Pools are best combined with ``batch``, since otherwise several
+    workers may be woken to ``recv`` a single message.
 
     See `the pyzmq docs <https://pyzmq.readthedocs.io/en/latest/api/zmq.html#polling>`_
     for more info.
     """
-    def __init__(self, socks : Dict[Socket, Wire],
+    def __init__(self, socks : Dict[Socket, Callback],
                        default_flags = zmqPOLLIN,
-                       interval : Optional[int] = 1000):
-        self.socks : Dict[Socket, Wire] = {}
-        self.default_flags = default_flags
+                       interval : Optional[int] = None,
+                       batch : Optional[int] = None,
+                       default_mode : str = "spawn"):
+        if batch is not None and batch < 1:
+            raise ValueError("batch must be positive")
+        super().__init__(default_flags, default_mode)
         self.interval = interval
+        self.batch = batch
         self.done = False
+        # Synchronous shadows of the sockets drained in batch mode.
+        self._shadows : Dict[Socket, Any] = {}
+        # Round-robin offset into the ready sockets.
+        self._rr = 0
 
         self.poller = zmq.asyncio.Poller()
+        # Wakeup channel, written to when a poll is waiting
+        # and needs to notice a change.
+        self._polling = False
+        self._woken = False
+        self._wake_r, self._wake_w = os.pipe()
+        os.set_blocking(self._wake_r, False)
+        os.set_blocking(self._wake_w, False)
+        self.poller.register(self._wake_r, zmqPOLLIN)
         for sock, cb in socks.items():
             self.register(sock, cb)
 
-    def register(self, sock : Socket, cb : Wire, flags = None) -> None:
+    def register(self, sock : Socket, cb : Callback, flags = None,
+                 mode : Optional[str] = None, workers : int = 1) -> None:
         """
         Add a listener on sock, invoking cb on activity.
         See pyzmq.Poller.register for more info on sock.
 
         If flags is None, self.default_flags is used.
+        If mode is None, self.default_mode is used
+        (``workers`` is the pool size for mode "pool").
         """
-        if flags is None:
-            flags = self.default_flags
-        if sock in self.socks:
-            raise IndexError(f"Already have a callback for sock: {sock}")
-        self.poller.register(sock, flags)
-        self.socks[sock] = cb
+        self._add(sock, cb, flags, mode, workers)
+        if self.batch is not None and isinstance(sock, zmq.Socket):
+            self._shadows[sock] = zmq.Socket.shadow(sock.underlying)
 
     def unregister(self, sock : Socket) -> None:
-        self.poller.unregister(sock)
-        del self.socks[sock]
+        super().unregister(sock)
+        self._shadows.pop(sock, None)
+
+    def _watch(self, reg : _Registration) -> None:
+        self.poller.register(reg.sock, reg.flags)
+        self._wake()
+
+    def _unwatch(self, reg : _Registration) -> None:
+        self.poller.unregister(reg.sock)
+        self._wake()
 
     def shutdown(self) -> None:
         """
         Shutdown only needs to be called if the EventLoop
-        is running in non-stop mode.
+        is running in non-stop mode.  A waiting poll
+        returns immediately.
         """
         self.done = True
+        self._wake()
+
+    def _wake(self) -> None:
+        if self._polling and not self._woken and self._wake_w >= 0:
+            self._woken = True
+            try:
+                os.write(self._wake_w, b'\0')
+            except BlockingIOError:
+                pass
+
+    def _drain(self) -> None:
+        self._woken = False
+        try:
+            while os.read(self._wake_r, 4096):
+                pass
+        except BlockingIOError:
+            pass
+
+    def _close(self) -> None:
+        if getattr(self, "_wake_r", -1) >= 0:
+            os.close(self._wake_r)
+            os.close(self._wake_w)
+            self._wake_r = self._wake_w = -1
+
+    def __del__(self):
+        self._close()
     
     async def __call__(self, ev : EventLoop) -> Optional[Wire]:
-        # TODO: we could further capture the coroutine
-        # here within self, then cancel it
-        # during shutdown -- then await would probably throw something.
-        events = await self.poller.poll(self.interval)
+        if not self.done:
+            self._polling = True
+            try:
+                events = await self.poller.poll(self.interval)
+            finally:
+                self._polling = False
         if self.done:
+            if self._wake_r >= 0:
+                self.poller.unregister(self._wake_r)
+                self._close()
+                for r in self._regs.values():
+                    self._stop_workers(r)
             return None
 
+        if self.batch is not None and len(events) > 1:
+            i = self._rr % len(events)
+            self._rr += 1
+            events = events[i:] + events[:i]
+        batch = self.batch or 0
         for fd, event in events:
-            cb = self.socks.get(fd, None)
-            if cb is not None:
-                ev.start(cb)
+            if fd == self._wake_r:
+                self._drain()
+                continue
+            reg = self._regs.get(fd, None)
+            if reg is None or reg.muted:
+                continue
+            shadow = self._shadows.get(fd, None)
+            if shadow is None:
+                self._dispatch(ev, reg, ())
+                continue
+            msgs : List[Any] = []
+            try:
+                while len(msgs) < batch:
+                    msgs.append(shadow.recv_multipart(zmq.NOBLOCK))
+            except zmq.Again:
+                pass
+            if len(msgs) > 0:
+                self._dispatch(ev, reg, (msgs,))
         return self
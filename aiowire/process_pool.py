@@ -0,0 +1,246 @@
+from typing import Optional, Callable, List, Any, NamedTuple, Tuple
+from multiprocessing import shared_memory
+import asyncio
+import multiprocessing
+import os
+import pickle
+import sys
+
+class _Shared(NamedTuple):
+    """ A large argument or result, passed in a shared memory segment. """
+    name : str
+    size : int
+    kind : str # "bytes", "bytearray", "memoryview" or "ndarray"
+    meta : Any = None # (dtype, shape) of an ndarray
+
+def _encode(x : Any, threshold : int, made : List[Any]) -> Any:
+    # Move x into a new shared memory segment (appended to made)
+    # if it's a large buffer.
+    np = sys.modules.get("numpy")
+    if isinstance(x, (bytes, bytearray, memoryview)):
+        kind = type(x).__name__
+        meta = None
+        data = memoryview(x).cast("B")
+    elif np is not None and isinstance(x, np.ndarray):
+        kind = "ndarray"
+        meta = (x.dtype.str, x.shape)
+        data = memoryview(np.ascontiguousarray(x)).cast("B")
+    else:
+        return x
+    if data.nbytes < threshold:
+        return x
+    shm = shared_memory.SharedMemory(create=True, size=max(1, data.nbytes))
+    shm.buf[:data.nbytes] = data # type: ignore[index]
+    made.append(shm)
+    return _Shared(shm.name, data.nbytes, kind, meta)
+
+def _decode(x : Any, opened : List[Any], copy : bool) -> Any:
+    # Inverse of _encode.  Unless `copy`, memoryviews and arrays
+    # point into the segment, which must stay open while they are used.
+    if not isinstance(x, _Shared):
+        return x
+    shm = shared_memory.SharedMemory(name=x.name)
+    opened.append(shm)
+    buf = shm.buf[:x.size] # type: ignore[index]
+    if x.kind == "bytes":
+        return bytes(buf)
+    if x.kind == "bytearray":
+        return bytearray(buf)
+    if x.kind == "memoryview":
+        return memoryview(bytearray(buf)) if copy else buf
+    import numpy as np # type: ignore[import-not-found]
+    arr = np.ndarray(x.meta[1], dtype=np.dtype(x.meta[0]), buffer=buf)
+    return arr.copy() if copy else arr
+
+def _close(segments : List[Any], unlink : bool) -> None:
+    for shm in segments:
+        try:
+            shm.close()
+        except BufferError: # still exported (e.g. by a returned view)
+            pass
+        if unlink:
+            try:
+                shm.unlink()
+            except FileNotFoundError:
+                pass
+    segments.clear()
+
+def _dumps_exc(e : BaseException) -> bytes:
+    try:
+        return pickle.dumps(e)
+    except Exception:
+        return pickle.dumps(RuntimeError(repr(e)))
+
+def _worker_main(conn, threshold : int) -> None:
+    while True:
+        try:
+            msg = conn.recv()
+        except (EOFError, KeyboardInterrupt):
+            return
+        if msg is None:
+            return
+        fn, args, kwargs = msg
+        opened : List[Any] = []
+        made : List[Any] = []
+        try:
+            args = [_decode(a, opened, False) for a in args]
+            kwargs = {k: _decode(v, opened, False) for k, v in kwargs.items()}
+            result = fn(*args, **kwargs)
+            out : Tuple[str, Any] = ("ok", _encode(result, threshold, made))
+        except BaseException as e:
+            out = ("err", _dumps_exc(e))
+        del args, kwargs
+        result = None
+        _close(opened, False)
+        # The parent unlinks the result's segment.
+        _close(made, False)
+        conn.send(out)
+
+def _set_ready(fut : asyncio.Future) -> None:
+    if not fut.done():
+        fut.set_result(None)
+
+class _Worker:
+    def __init__(self, mp : Any, threshold : int):
+        self.conn, child = mp.Pipe()
+        self.proc = mp.Process(target=_worker_main, args=(child, threshold),
+                               name="aiowire-worker", daemon=True)
+        self.proc.start()
+        child.close()
+
+    def stop(self, kill : bool) -> None:
+        if kill:
+            self.proc.terminate()
+        else:
+            try:
+                self.conn.send(None)
+            except OSError:
+                pass
+        self.proc.join(1.0)
+        if self.proc.is_alive():
+            self.proc.kill()
+            self.proc.join()
+        self.conn.close()
+
+class ProcessPool:
+    """
+    A pool of `size` persistent worker processes, owned by an `EventLoop`,
+    that runs the calls of `InProcess` wires.
+
+    Functions and arguments are pickled, so they must be picklable
+    (e.g. module-level functions).  But top-level arguments,
+    keyword arguments and results that are bytes, bytearray, memoryview
+    or NumPy arrays of at least `threshold` bytes travel through
+    `multiprocessing.shared_memory` segments instead.
+    Memoryview and array arguments are passed to the function as
+    views of the segment, valid only during the call.
+
+    Exceptions raised by the function are re-raised by `run`.
+    If `run` is cancelled, its worker is terminated
+    (and replaced by a new one).
+
+    Workers are started with the ``mp_context`` start method
+    ("forkserver" by default, see `ShardedEventLoop`).
+    `submitted`, `completed`, `busy` and `restarts` count the calls,
+    and the workers replaced after a cancellation or crash.
+    """
+    def __init__(self, size : Optional[int] = None,
+                       threshold : int = 1 << 16,
+                       mp_context : Optional[str] = None):
+        if size is None:
+            size = os.cpu_count() or 1
+        if size < 1:
+            raise ValueError("size must be positive")
+        if mp_context is None:
+            mp_context = "forkserver" \
+                if "forkserver" in multiprocessing.get_all_start_methods() \
+                else "spawn"
+        self.size = size
+        self.threshold = threshold
+        self._mp : Any = multiprocessing.get_context(mp_context)
+        # Created on first use, inside the running loop.
+        self._idle : Optional[asyncio.Queue] = None
+        self._workers : List[_Worker] = []
+        self._closed = False
+        self.submitted = 0
+        self.completed = 0
+        self.busy = 0
+        self.restarts = 0
+
+    def _spawn(self) -> _Worker:
+        w = _Worker(self._mp, self.threshold)
+        self._workers.append(w)
+        return w
+
+    def _replace(self, w : _Worker) -> None:
+        # Kill w, and put a new worker in its place.
+        self._workers.remove(w)
+        w.stop(True)
+        if not self._closed and self._idle is not None:
+            self.restarts += 1
+            self._idle.put_nowait(self._spawn())
+
+    async def run(self, fn : Callable, *args, **kwargs) -> Any:
+        """ Call fn(*args, **kwargs) in a worker process,
+            and return its result.
+        """
+        if self._closed:
+            raise RuntimeError("ProcessPool is shut down")
+        if self._idle is None:
+            self._idle = asyncio.Queue()
+            for i in range(self.size):
+                self._idle.put_nowait(self._spawn())
+        self.submitted += 1
+        made : List[Any] = []
+        w : Optional[_Worker] = None
+        healthy = False
+        try:
+            msg = (fn,
+                   [_encode(a, self.threshold, made) for a in args],
+                   {k: _encode(v, self.threshold, made)
+                    for k, v in kwargs.items()})
+            w = await self._idle.get()
+            self.busy += 1
+            loop = asyncio.get_running_loop()
+            w.conn.send(msg)
+            ready = loop.create_future()
+            fd = w.conn.fileno()
+            loop.add_reader(fd, _set_ready, ready)
+            try:
+                await ready
+            finally:
+                loop.remove_reader(fd)
+            try:
+                kind, value = w.conn.recv()
+            except EOFError:
+                raise RuntimeError("Worker process died") from None
+            healthy = True
+        finally:
+            self.completed += 1
+            _close(made, True)
+            if w is not None:
+                self.busy -= 1
+                if healthy:
+                    self._idle.put_nowait(w)
+                else:
+                    self._replace(w)
+        if kind == "err":
+            raise pickle.loads(value)
+        if isinstance(value, _Shared):
+            opened : List[Any] = []
+            try:
+                value = _decode(value, opened, True)
+            finally:
+                _close(opened, True)
+        return value
+
+    def shutdown(self) -> None:
+        """ Stop all workers (terminating busy ones). """
+        self._closed = True
+        idle = set()
+        if self._idle is not None:
+            while not self._idle.empty():
+                idle.add(self._idle.get_nowait())
+        for w in self._workers:
+            w.stop(w not in idle)
+        self._workers.clear()
@@ -0,0 +1,192 @@
+"""
+Sampling profiler for aiowire programs.
+
+Usage::
+
+    python -m aiowire.profiler [-o stacks.txt] [-i 0.001] script.py [args ...]
+
+runs ``script.py`` (as ``__main__``) while sampling its main thread,
+and writes the samples as collapsed stacks, ready for
+``flamegraph.pl`` or speedscope.
+"""
+from typing import Optional, List, Dict, Tuple, Any
+import argparse
+import os
+import runpy
+import selectors
+import sys
+import threading
+
+from .wire import Wire, Repeat, _Repeating
+from .stats import wire_name
+from .lag import _is_machinery
+
+# Attributes holding the wires a wire runs.
+_slots = ("a", "b")
+
+def _slot(parent : Any, w : Any) -> Optional[str]:
+    for name in _slots:
+        if getattr(parent, name, None) is w:
+            return name
+    return None
+
+def _label(w : Wire) -> str:
+    if type(w) is _Repeating:
+        return "Repeat"
+    return wire_name(w)
+
+def _frame_label(code : Any) -> str:
+    name = getattr(code, "co_qualname", code.co_name)
+    return (f"{name.rsplit('<locals>.', 1)[-1]} "
+            f"({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+
+# Frames to leave out (with those of asyncio and EventLoop).
+_skip = (os.path.abspath(__file__), runpy.__file__, selectors.__file__)
+
+def collapse(frame : Any) -> Tuple[str, ...]:
+    """
+    The stack of a thread, given its innermost frame, as a tuple
+    of labels (outermost first).
+
+    Frames of asyncio and the `EventLoop` are left out,
+    along with everything outside them, so the stack starts
+    at the wire the loop is running.
+    Each wire's ``__call__`` is labelled by the wire
+    (see `aiowire.stats.wire_name`), followed by ``.a`` or ``.b``
+    when it is running that part of itself,
+    e.g. ``Repeat.a;Sequence.b;Call(send)``.
+    Other frames are labelled ``function (file:line)``.
+    """
+    frames = []
+    f = frame
+    while f is not None:
+        if _is_machinery(f.f_code.co_filename) \
+                or f.f_code.co_filename in _skip:
+            break
+        frames.append(f)
+        f = f.f_back
+    labels : List[str] = []
+    outer : Optional[Tuple[int, Any]] = None # innermost wire so far
+    for f in reversed(frames):
+        code = f.f_code
+        w = None
+        if code.co_name == "__call__":
+            w = f.f_locals.get("self")
+        if not isinstance(w, Wire):
+            labels.append(_frame_label(code))
+            continue
+        if outer is not None:
+            i, parent = outer
+            if type(w) is _Repeating and type(parent) is Repeat:
+                continue # part of the Repeat
+            slot = _slot(parent, w)
+            if slot is not None:
+                labels[i] += "." + slot
+        labels.append(_label(w))
+        outer = (len(labels)-1, w)
+    return tuple(lbl.replace(";", ":") for lbl in labels)
+
+class Profiler:
+    """
+    Samples the stack of a thread (by default, the one creating
+    the Profiler) every `interval` seconds, from a background thread,
+    and counts each distinct `collapse`-d stack.
+
+    Samples where the thread is waiting in the event loop
+    are counted as ``<idle>`` if `idle` is True, and dropped otherwise.
+
+    Use as a (synchronous) context manager, or call `start` and `stop`.
+    """
+    def __init__(self, interval : float = 0.001,
+                       thread_id : Optional[int] = None,
+                       idle : bool = False):
+        if interval <= 0:
+            raise ValueError("interval must be positive")
+        self.interval = interval
+        self.thread_id = threading.get_ident() if thread_id is None \
+                         else thread_id
+        self.idle = idle
+        self.counts : Dict[Tuple[str, ...], int] = {}
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread : Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run,
+                                        name="aiowire-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self) -> 'Profiler':
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback) -> None:
+        self.stop()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def sample(self) -> None:
+        """ Take one sample. """
+        frame = sys._current_frames().get(self.thread_id)
+        if frame is None:
+            return
+        stack = collapse(frame)
+        del frame
+        if len(stack) == 0:
+            if not self.idle:
+                return
+            stack = ("<idle>",)
+        self.samples += 1
+        self.counts[stack] = self.counts.get(stack, 0) + 1
+
+    def collapsed(self) -> str:
+        """ The samples, in collapsed stack format
+            (``label;label;... count`` per line).
+        """
+        return "".join(f"{';'.join(stack)} {n}\n"
+                       for stack, n in sorted(self.counts.items()))
+
+    def write(self, path : str) -> None:
+        with open(path, "w") as f:
+            f.write(self.collapsed())
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m aiowire.profiler",
+                                     description=__doc__.split("\n\n")[0])
+    parser.add_argument("-o", "--output", default="-",
+                        help="file for the collapsed stacks (default stdout)")
+    parser.add_argument("-i", "--interval", type=float, default=0.001,
+                        help="seconds between samples")
+    parser.add_argument("--idle", action="store_true",
+                        help="count samples where the loop is idle")
+    parser.add_argument("script", help="Python script to run")
+    parser.add_argument("args", nargs=argparse.REMAINDER,
+                        help="arguments for the script")
+    args = parser.parse_args(argv)
+
+    sys.argv = [args.script] + args.args
+    sys.path.insert(0, os.path.dirname(os.path.abspath(args.script)))
+    prof = Profiler(args.interval, idle=args.idle)
+    try:
+        with prof:
+            runpy.run_path(args.script, run_name="__main__")
+    except KeyboardInterrupt: # e.g. to stop a server
+        pass
+    finally:
+        if args.output == "-":
+            sys.stdout.write(prof.collapsed())
+        else:
+            prof.write(args.output)
+        print(f"{prof.samples} samples", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
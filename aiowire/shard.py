@@ -0,0 +1,331 @@
+from typing import Optional, List, Dict, Any, Union, Sequence as Seq
+import asyncio
+import bisect
+import hashlib
+import multiprocessing
+import os
+import pickle
+import shutil
+import tempfile
+import time
+
+try:
+    import zmq
+    import zmq.asyncio
+except ImportError:
+    zmq = None # type: ignore[assignment]
+
+from .wire import Wire
+from .event_loop import (
+    EventLoop, Handler, UnhandledException, NORMAL, _add_note,
+    _check_priority,
+)
+
+def _hash(key : Any) -> int:
+    # A hash that is the same in every process
+    # (unlike hash() of str and bytes).
+    if isinstance(key, bytes):
+        data = key
+    elif isinstance(key, str):
+        data = key.encode()
+    else:
+        data = repr(key).encode()
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(),
+                          "little")
+
+def _dumps_exc(e : BaseException) -> bytes:
+    try:
+        return pickle.dumps(e)
+    except Exception:
+        return pickle.dumps(RuntimeError(repr(e)))
+
+def _shard_main(index : int, url : str, cpu : Optional[int],
+                loop_kws : Dict[str, Any]) -> None:
+    if cpu is not None:
+        os.sched_setaffinity(0, {cpu})
+    asyncio.run(_shard(index, url, loop_kws))
+
+async def _shard(index : int, url : str, loop_kws : Dict[str, Any]) -> None:
+    ctx = zmq.asyncio.Context()
+    inbox = ctx.socket(zmq.PULL)
+    inbox.connect(f"{url}/shard{index}")
+    outbox = ctx.socket(zmq.PUSH)
+    outbox.connect(f"{url}/out")
+    # Synchronous view of outbox, for use from handlers.
+    out : Any = zmq.Socket.shadow(outbox.underlying)
+
+    started = 0
+    errors = 0
+    def report(ev : EventLoop, e : Exception) -> None:
+        nonlocal errors
+        errors += 1
+        out.send(pickle.dumps(("error", index, _dumps_exc(e))))
+
+    def stats(ev : EventLoop) -> Dict[str, Any]:
+        return { "shard": index,
+                 "pid": os.getpid(),
+                 "started": started,
+                 "errors": errors,
+                 "running": len(ev.tasks),
+                 "pending": ev.pending,
+                 "cpu_time": time.process_time(),
+               }
+
+    async def serve(ev : EventLoop) -> None:
+        nonlocal started
+        while True:
+            msg = pickle.loads(await inbox.recv())
+            if msg[0] == "start":
+                started += 1
+                try:
+                    ev.start(pickle.loads(msg[1]), report, priority=msg[2])
+                except Exception as e:
+                    report(ev, e)
+            elif msg[0] == "stats":
+                await outbox.send(pickle.dumps(
+                                ("stats", index, msg[1], stats(ev))))
+            elif msg[0] == "stop":
+                return None
+            # else "hello" (just checks the connection)
+
+    async with EventLoop(**loop_kws) as ev:
+        ev.start(serve)
+    await outbox.send(pickle.dumps(("done", index, stats(ev))))
+    inbox.close()
+    outbox.close(linger=1000)
+    ctx.term()
+
+class ShardedEventLoop:
+    """
+    A group of `shards` worker processes, each running an `EventLoop`.
+
+    Wires are pickled and sent to the workers over zmq ipc sockets,
+    so they (and their arguments) must be picklable --
+    e.g. `Call`-s of module-level functions.
+    ``start(w, key=k)`` always sends wires with the same key
+    to the same shard (by consistent hashing, so adding shards
+    moves few keys).  Wires without a key go round-robin.
+
+    Each shard reports exceptions from its wires back here,
+    where they are passed to ``handler(self, e)``
+    (with a note on the shard they came from).
+    Without a handler, the first one is raised as an
+    `UnhandledException` when the group shuts down.
+
+    ``pin=True`` pins shard i to the i-th CPU this process may run on
+    (or give the list of CPUs to use).  Extra keyword arguments
+    are passed to each shard's `EventLoop`.
+
+    Use as an async context manager: leaving it shuts down
+    all the shards, after each has finished its wires.
+    The shards are created with the ``mp_context`` start method
+    ("forkserver" by default), since forking the current process
+    would copy its running event loop and zmq context.
+    """
+    vnodes = 64
+
+    def __init__(self, shards : Optional[int] = None,
+                       handler : Optional[Handler] = None,
+                       pin : Union[bool, Seq[int]] = False,
+                       hwm : int = 10000,
+                       mp_context : Optional[str] = None,
+                       **loop_kws):
+        if shards is None:
+            shards = os.cpu_count() or 1
+        if shards < 1:
+            raise ValueError("shards must be positive")
+        self.shards = shards
+        self.handler = handler
+        self.hwm = hwm
+        self.loop_kws = loop_kws
+        self.cpus : List[Optional[int]] = [None]*shards
+        if pin is not False:
+            if not hasattr(os, "sched_setaffinity"):
+                raise ValueError("CPU pinning is not supported here")
+            cpus = sorted(os.sched_getaffinity(0)) if pin is True \
+                   else list(pin) # type: ignore[arg-type]
+            self.cpus = [cpus[i % len(cpus)] for i in range(shards)]
+        if mp_context is None:
+            mp_context = "forkserver" \
+                if "forkserver" in multiprocessing.get_all_start_methods() \
+                else "spawn"
+        self.mp_context = mp_context
+
+        # Consistent hashing ring: sorted points, and their shards.
+        ring = sorted((_hash(f"{i}:{v}"), i) for i in range(shards)
+                                             for v in range(self.vnodes))
+        self._points = [p for p, i in ring]
+        self._owners = [i for p, i in ring]
+        self._rr = 0
+
+        self.errors : List[Exception] = []
+        self.final_stats : List[Dict[str, Any]] = []
+        self._procs : List[Any] = []
+        self._socks : List[Any] = []
+        self._queues : List[Any] = [] # synchronous views of _socks
+        self._reader : Optional[asyncio.Task] = None
+        self._requests : Dict[int, Any] = {}
+        self._nreq = 0
+        self._done : Optional[asyncio.Future] = None
+        self._dir : Optional[str] = None
+
+    def shard_of(self, key : Any) -> int:
+        """ The shard that wires started with `key` go to. """
+        i = bisect.bisect(self._points, _hash(key))
+        return self._owners[i % len(self._owners)]
+
+    def _route(self, key : Any) -> int:
+        if key is None:
+            self._rr = (self._rr + 1) % self.shards
+            return self._rr
+        return self.shard_of(key)
+
+    def _message(self, w : Wire, priority : int) -> bytes:
+        return pickle.dumps(("start", pickle.dumps(w), priority))
+
+    def start(self, w : Wire, key : Any = None,
+              priority : int = NORMAL) -> int:
+        """ Send w to a shard, returning the shard's index.
+            Raises asyncio.QueueFull if `hwm` wires are already
+            waiting to be sent to that shard.
+        """
+        _check_priority(priority)
+        i = self._route(key)
+        try:
+            self._queues[i].send(self._message(w, priority), zmq.NOBLOCK)
+        except zmq.Again:
+            raise asyncio.QueueFull(f"Shard {i} is full")
+        return i
+
+    async def submit(self, w : Wire, key : Any = None,
+                     priority : int = NORMAL) -> int:
+        """ Like `start`, but waits for room to send w. """
+        _check_priority(priority)
+        i = self._route(key)
+        await self._socks[i].send(self._message(w, priority))
+        return i
+
+    async def stats(self) -> List[Dict[str, Any]]:
+        """ Statistics from each shard (in shard order). """
+        self._nreq += 1
+        req = self._nreq
+        fut = asyncio.get_running_loop().create_future()
+        self._requests[req] = (fut, {})
+        for s in self._socks:
+            await s.send(pickle.dumps(("stats", req)))
+        return await fut
+
+    async def _read(self, inbox) -> None:
+        while True:
+            msg = pickle.loads(await inbox.recv())
+            kind, index = msg[0], msg[1]
+            if kind == "error":
+                e = pickle.loads(msg[2])
+                _add_note(e, f"In shard {index}")
+                if self.handler is None:
+                    self.errors.append(e)
+                else:
+                    try:
+                        self.handler(self, e) # type: ignore[arg-type]
+                    except Exception as e2:
+                        self.errors.append(e2)
+            elif kind == "stats":
+                fut, got = self._requests[msg[2]]
+                got[index] = msg[3]
+                if len(got) == self.shards:
+                    del self._requests[msg[2]]
+                    if not fut.done():
+                        fut.set_result([got[i] for i in range(self.shards)])
+            else: # "done"
+                self.final_stats.append(msg[2])
+                if len(self.final_stats) == self.shards \
+                        and self._done is not None \
+                        and not self._done.done():
+                    self._done.set_result(None)
+
+    async def __aenter__(self) -> 'ShardedEventLoop':
+        self._dir = tempfile.mkdtemp(prefix="aiowire-")
+        url = f"ipc://{self._dir}"
+        self.ctx = zmq.asyncio.Context()
+        inbox = self.ctx.socket(zmq.PULL)
+        inbox.bind(f"{url}/out")
+        self._inbox = inbox
+        for i in range(self.shards):
+            s = self.ctx.socket(zmq.PUSH)
+            s.setsockopt(zmq.SNDHWM, self.hwm)
+            s.bind(f"{url}/shard{i}")
+            self._socks.append(s)
+            self._queues.append(zmq.Socket.shadow(s.underlying))
+        self._done = asyncio.get_running_loop().create_future()
+        self._reader = asyncio.create_task(self._read(inbox))
+
+        mp : Any = multiprocessing.get_context(self.mp_context)
+        for i in range(self.shards):
+            p = mp.Process(target=_shard_main,
+                           args=(i, url, self.cpus[i], self.loop_kws),
+                           name=f"aiowire-shard{i}", daemon=True)
+            p.start()
+            self._procs.append(p)
+        # Wait for every shard to connect.
+        hello = pickle.dumps(("hello",))
+        for p, sock in zip(self._procs, self._socks):
+            sent = asyncio.ensure_future(sock.send(hello))
+            while not sent.done():
+                await asyncio.wait((sent,), timeout=0.1)
+                if not p.is_alive() and not sent.done():
+                    sent.cancel()
+                    await self.shutdown(0)
+                    raise RuntimeError(f"{p.name} failed to start")
+        return self
+
+    async def shutdown(self, timeout : Optional[float] = None) -> None:
+        """
+        Stop all shards after they have finished their wires
+        (waiting at most `timeout` seconds before terminating them).
+        Their last statistics are left in `final_stats`.
+        """
+        if self._done is None:
+            return
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        try:
+            stop = pickle.dumps(("stop",))
+            for p, s in zip(self._procs, self._socks):
+                if p.is_alive():
+                    await s.send(stop)
+            # Stop waiting early if shards die without saying so.
+            while not self._done.done() \
+                    and any(p.is_alive() for p in self._procs):
+                dt = 0.1
+                if deadline is not None:
+                    dt = min(dt, deadline - loop.time())
+                    if dt <= 0:
+                        break
+                await asyncio.wait((self._done,), timeout=dt)
+        finally:
+            self._done = None
+            if self._reader is not None:
+                self._reader.cancel()
+                self._reader = None
+            for p in self._procs:
+                await loop.run_in_executor(None, p.join, 1.0)
+                if p.is_alive():
+                    p.terminate()
+                    p.join()
+            self._procs = []
+            self._inbox.close(linger=0)
+            for s in self._socks:
+                s.close(linger=0)
+            self._socks = []
+            self._queues = []
+            self.ctx.term()
+            if self._dir is not None:
+                shutil.rmtree(self._dir, ignore_errors=True)
+                self._dir = None
+        self.final_stats.sort(key=lambda st: st["shard"])
+
+    async def __aexit__(self, exc_type, exc, traceback) -> None:
+        await self.shutdown(self.loop_kws.get("timeout"))
+        if exc is None and len(self.errors) > 0:
+            raise UnhandledException("Wire with no exception handler") \
+                    from self.errors[0]
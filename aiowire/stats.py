@@ -0,0 +1,362 @@
+from typing import Optional, Dict, List, Tuple, Deque, Any
+from array import array
+from collections import deque
+import asyncio
+import math
+import os
+import socket
+import tempfile
+import time
+
+from .wire import Wire
+
+class Histogram:
+    """
+    Log-bucketed histogram of durations (in seconds), in the style
+    of HdrHistogram.
+
+    Values are counted in units of `unit` seconds.  The first 16 units
+    have a bucket each, and each power of two above that is split into
+    8 equal buckets, so every recorded value is known to within
+    1/8 of itself (or one unit).  Values beyond `octaves` powers of two
+    share the last bucket.  The counts live in an array allocated
+    up front, so recording a value never allocates.
+    """
+    def __init__(self, unit : float = 1e-6, octaves : int = 40):
+        self.unit = unit
+        self._scale = 1.0 / unit
+        self.counts = array('Q', bytes(8*8*(octaves+1)))
+        self._last = len(self.counts) - 1
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, dt : float) -> None:
+        v = int(dt * self._scale)
+        if v < 16:
+            i = v if v > 0 else 0
+        else:
+            # Bucket by the top 4 bits of v.
+            k = v.bit_length() - 4
+            i = 8*k + (v >> k)
+            if i > self._last:
+                i = self._last
+        self.counts[i] += 1
+        self.count += 1
+        self.total += dt
+        if dt > self.max:
+            self.max = dt
+
+    def upper(self, i : int) -> float:
+        """ Upper bound of bucket i (in seconds). """
+        if i < 16:
+            return (i+1) * self.unit
+        k = i//8 - 1
+        return ((i%8 + 9) << k) * self.unit
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count > 0 else 0.0
+
+    def quantile(self, q : float) -> float:
+        """ Value below which a fraction q of the recorded values fall
+            (to within the bucket width).
+        """
+        if self.count == 0:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if n > 0 and seen >= rank:
+                return min(self.upper(i), self.max)
+        return self.max
+
+    def cumulative(self) -> List[Tuple[float, int]]:
+        """ (le, count of values <= le) at each power of two
+            from 16 units up to the largest value recorded.
+        """
+        out = []
+        seen = sum(self.counts[:16])
+        le = 16 * self.unit
+        out.append((le, seen))
+        i = 16
+        while le < self.max and i < len(self.counts):
+            seen += sum(self.counts[i:i+8])
+            i += 8
+            le *= 2.0
+            out.append((le, seen))
+        return out
+
+    def __repr__(self):
+        return (f"Histogram(count={self.count}, mean={self.mean}, "
+                f"p50={self.quantile(0.5)}, p99={self.quantile(0.99)}, "
+                f"max={self.max})")
+
+class WireStats:
+    """ Counters and residency histogram for one kind of wire. """
+    __slots__ = ('name', 'starts', 'completions', 'exceptions',
+                 'type_errors', 'stalls', 'stall_seconds', 'residency')
+
+    def __init__(self, name : str):
+        self.name = name
+        self.starts = 0
+        self.completions = 0
+        self.exceptions = 0
+        self.type_errors = 0 # TypeError("Wire returned ...")
+        # Loop stalls blamed on this wire (see `aiowire.lag`).
+        self.stalls = 0
+        self.stall_seconds = 0.0
+        self.residency = Histogram()
+
+    def outcome(self, outcome : int, t0 : Optional[float]) -> None:
+        # Count an outcome (_OK, _EXC or _TYPE) of a task launched
+        # at t0 (None if it isn't timed).
+        if outcome == _OK:
+            self.completions += 1
+        elif outcome == _EXC:
+            self.exceptions += 1
+        else:
+            self.type_errors += 1
+        if t0 is not None:
+            self.residency.record(_clock() - t0)
+
+    def as_dict(self) -> Dict[str, Any]:
+        h = self.residency
+        return { "starts": self.starts,
+                 "completions": self.completions,
+                 "exceptions": self.exceptions,
+                 "type_errors": self.type_errors,
+                 "stalls": self.stalls,
+                 "stall_seconds": self.stall_seconds,
+                 "residency": { "count": h.count,
+                                "mean": h.mean,
+                                "p50": h.quantile(0.5),
+                                "p99": h.quantile(0.99),
+                                "max": h.max },
+               }
+
+    def __repr__(self):
+        return f"WireStats({self.name!r}, {self.as_dict()})"
+
+def _fn_name(fn : Any) -> str:
+    name = getattr(fn, "__qualname__", None)
+    if name is None:
+        name = type(fn).__qualname__
+    # Drop the enclosing function of nested definitions.
+    return name.rsplit("<locals>.", 1)[-1]
+
+def wire_name(w : Any) -> str:
+    """ The name `Stats` files w under:
+        ``Call(fn)`` (or ``Offload(fn)`` ...) for wires calling a function,
+        the function's name for plain async functions and ``Wire(fn)``,
+        and the class name for other wires.
+    """
+    fn = getattr(w, "_aiowire_fn", None)
+    if fn is not None:
+        return f"{type(w).__name__}({_fn_name(fn)})"
+    if type(w) is Wire:
+        return _fn_name(w._aiowire)
+    if isinstance(w, Wire):
+        return type(w).__qualname__
+    return _fn_name(w)
+
+_function = type(_fn_name)
+
+def _key(w : Any) -> Any:
+    # Something cheaper to compute than wire_name(w) that determines it
+    # (using code objects, which are shared by every closure of a function).
+    t = type(w)
+    if t is _function:
+        return w.__code__
+    fn = getattr(w, "_aiowire_fn", None)
+    if fn is not None:
+        return (t, getattr(fn, "__code__", fn))
+    if t is Wire:
+        return getattr(w._aiowire, "__code__", w._aiowire)
+    return t
+
+_clock = time.perf_counter
+
+# Outcomes of a tracked wire.
+_OK = 0
+_EXC = 1
+_TYPE = 2
+
+class Stats:
+    """
+    Statistics kept by an ``EventLoop(stats=True)``,
+    per kind of wire (see `wire_name`).
+
+    Every wire launched by the loop (by `start`, or as the continuation
+    returned by a finished task) counts as a start.
+    It completes when it returns (None or another Wire),
+    or counts under `exceptions` or `type_errors` if it fails.
+    Wires that become tasks are timed from launch until their
+    outcome is known, in their `residency` histogram.
+    To keep the overhead down, only one in `sample` launches of each
+    kind of wire is timed (starting with the first), so `residency`
+    holds a sample of them.  Set `sample` to 1 to time every task.
+    A trampolining loop counts the outcome (and residency) of
+    the chains it drives itself (see `start`), so that only tasks
+    running a bare wire are tracked here.
+    Wires run by a trampolined chain within the same task
+    are part of the wire that started the chain.
+
+    If the loop has a lag monitor (``EventLoop(lag_threshold=...)``),
+    `lag` is a histogram of its heartbeats' delays, `stalls` holds the
+    latest `aiowire.lag.Stall`-s, and each stall is counted
+    against the innermost wire it was blamed on (its `step`).
+    """
+    max_stalls = 100
+    sample = 16
+
+    def __init__(self) -> None:
+        self.wires : Dict[str, WireStats] = {}
+        self._keys : Dict[Any, WireStats] = {}
+        self.lag = Histogram()
+        self.stalls : Deque[Any] = deque(maxlen=self.max_stalls)
+        # Tracked tasks, with their WireStats and launch time
+        # (None if they aren't timed).
+        self._tracked : Dict[asyncio.Future,
+                             Tuple[WireStats, Optional[float]]] = {}
+        # The wire started last, and its WireStats.
+        self._last : Any = None
+        self._last_stats = WireStats("")
+
+    def __getitem__(self, name : str) -> WireStats:
+        return self.wires[name]
+
+    def _named(self, name : str) -> WireStats:
+        s = self.wires.get(name)
+        if s is None:
+            s = WireStats(name)
+            self.wires[name] = s
+        return s
+
+    def start(self, w : Any) -> Tuple[WireStats, Optional[float]]:
+        # Count a start of w.  Returns its WireStats and the time
+        # it was launched (None if it isn't timed), for the caller
+        # to pass to `WireStats.outcome` when it finishes.
+        if w is not self._last:
+            key = _key(w)
+            s = self._keys.get(key)
+            if s is None:
+                s = self._named(wire_name(w))
+                self._keys[key] = s
+            self._last = w
+            self._last_stats = s
+        s = self._last_stats
+        n = s.starts
+        s.starts = n + 1
+        if n % self.sample:
+            return s, None
+        return s, _clock()
+
+    def launched(self, w : Any, t : Optional[asyncio.Future]) -> None:
+        # Record the start of w, which became t
+        # (or finished at once, if t is None).
+        s, t0 = self.start(w)
+        if t is None:
+            s.outcome(_OK, None)
+        else:
+            self._tracked[t] = (s, t0)
+
+    def finish(self, t : asyncio.Future, outcome : int) -> None:
+        # Record the outcome (_OK, _EXC or _TYPE) of t.
+        rec = self._tracked.pop(t, None)
+        if rec is not None:
+            rec[0].outcome(outcome, rec[1])
+
+    def stalled(self, stall : Any) -> None:
+        # Record a Stall.
+        self.stalls.append(stall)
+        if stall.step is not None:
+            s = self._named(stall.step)
+            s.stalls += 1
+            s.stall_seconds += stall.lag
+
+    def clear(self) -> None:
+        self.wires.clear()
+        self._keys.clear()
+        self._last = None
+        self.lag = Histogram()
+        self.stalls.clear()
+
+    def as_dict(self) -> Dict[str, Dict[str, Any]]:
+        return {name: s.as_dict() for name, s in self.wires.items()}
+
+def _label(name : str) -> str:
+    return name.replace("\\", "\\\\").replace('"', '\\"') \
+               .replace("\n", "\\n")
+
+def _histogram(lines : List[str], metric : str, labels : str,
+               h : Histogram) -> None:
+    for le, n in h.cumulative():
+        lines.append(f'{metric}_bucket{{{labels}le="{le:g}"}} {n}')
+    lines.append(f'{metric}_bucket{{{labels}le="+Inf"}} {h.count}')
+    labels = labels.rstrip(",")
+    lines.append(f'{metric}_sum{{{labels}}} {h.total!r}')
+    lines.append(f'{metric}_count{{{labels}}} {h.count}')
+
+def prometheus_text(stats : Stats, ev : Any = None,
+                    prefix : str = "aiowire") -> str:
+    """ Render stats in the Prometheus text exposition format
+        (plus the task and pending counts of `ev`, if given).
+    """
+    lines : List[str] = []
+    counters = [("starts", "Wires launched"),
+                ("completions", "Wires that returned"),
+                ("exceptions", "Wires that raised"),
+                ("type_errors", "Wires that returned a non-Wire"),
+                ("stalls", "Loop stalls blamed on the wire"),
+                ("stall_seconds", "Duration of the stalls")]
+    for field, doc in counters:
+        metric = f"{prefix}_wire_{field}_total"
+        lines.append(f"# HELP {metric} {doc}.")
+        lines.append(f"# TYPE {metric} counter")
+        for name, s in stats.wires.items():
+            lines.append(f'{metric}{{wire="{_label(name)}"}} '
+                         f'{getattr(s, field)}')
+    metric = f"{prefix}_wire_residency_seconds"
+    lines.append(f"# HELP {metric} Time from launch to outcome.")
+    lines.append(f"# TYPE {metric} histogram")
+    for name, s in stats.wires.items():
+        _histogram(lines, metric, f'wire="{_label(name)}",', s.residency)
+    if stats.lag.count > 0:
+        metric = f"{prefix}_loop_lag_seconds"
+        lines.append(f"# HELP {metric} Delay of the lag monitor's heartbeat.")
+        lines.append(f"# TYPE {metric} histogram")
+        _histogram(lines, metric, "", stats.lag)
+    if ev is not None:
+        for field, value in [("tasks", len(ev.tasks)),
+                             ("pending", ev.pending)]:
+            metric = f"{prefix}_{field}"
+            lines.append(f"# TYPE {metric} gauge")
+            lines.append(f"{metric} {value}")
+    return "\n".join(lines) + "\n"
+
+def write_prometheus(text : str, path : Optional[str] = None,
+                     unix_socket : Optional[str] = None) -> None:
+    """
+    Write Prometheus text to a file (replaced atomically,
+    e.g. for node_exporter's textfile collector),
+    and/or send it to a listener on a UNIX socket.
+
+    This blocks, so run it with `EventLoop.offload`
+    if the destination may be slow.
+    """
+    if path is not None:
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path) or ".",
+                                   prefix=".aiowire-", suffix=".prom")
+        try:
+            with os.fdopen(fd, "w") as f:
+                f.write(text)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+    if unix_socket is not None:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+            s.connect(unix_socket)
+            s.sendall(text.encode())
@@ -0,0 +1,246 @@
+from typing import Optional, List, Any
+import math
+
+class Timer:
+    """
+    An entry in a `TimerWheel`.
+
+    `item` is whatever the wheel's owner wants back when
+    the timer expires (the `EventLoop` stores a wire there).
+    If `reuse` is True, the owner hands the timer back to
+    the wheel (see `TimerWheel.release`) once it has expired.
+    `periodic` is left to the owner (the `EventLoop` sets it
+    on the timers that tick an `Every` wire).
+    """
+    __slots__ = ('deadline', 'tick', 'item', 'handler', 'priority', 'wheel',
+                 'reuse', 'periodic')
+
+    def __init__(self, deadline : float, tick : int, item : Any,
+                 handler : Any = None, priority : int = 0,
+                 wheel : Optional['TimerWheel'] = None,
+                 reuse : bool = False, periodic : bool = False):
+        self.deadline = deadline
+        self.tick = tick
+        self.item = item
+        self.handler = handler
+        self.priority = priority
+        self.wheel = wheel
+        self.reuse = reuse
+        self.periodic = periodic
+
+    @property
+    def active(self) -> bool:
+        return self.wheel is not None
+
+    def cancel(self) -> bool:
+        """ Cancel the timer.  Returns False if it had
+            already expired or been cancelled.
+        """
+        wheel = self.wheel
+        if wheel is None:
+            return False
+        # Cancelled entries stay in their slot until it is visited.
+        self.wheel = None
+        self.item = None
+        self.handler = None
+        wheel.count -= 1
+        return True
+
+class TimerWheel:
+    """
+    Hierarchical timing wheel.
+
+    Time is divided into ticks of `resolution` seconds
+    starting at `t0`.  Deadlines are rounded up to the next tick,
+    so timers never expire early, and all timers falling into
+    the same tick expire together (the resolution is the timer slack).
+
+    Level 0 has one slot per tick for the next 256 ticks.
+    Each further level has 64 slots, each covering a whole
+    revolution of the level below.  Its slots are moved down
+    ("cascaded") as the wheel turns.  Hence adding and cancelling
+    a timer are O(1), and advancing the wheel costs O(1) per tick,
+    plus the cost of moving each timer down at most once per level.
+    Stretches where the lower levels are empty are skipped over
+    (up to the next cascade) in one step.
+    The wheel spans 2**26 ticks, and timers beyond that
+    are re-filed when the top level cascades.
+
+    While the wheel is empty, `advance` jumps straight to
+    the given time, so owners should advance an empty wheel
+    to the present before adding timers to it.
+
+    Up to `freelist` expired timers that nothing else refers to
+    are kept (see `release`), and reused by `add`.
+    """
+    bits = (8, 6, 6, 6)
+    freelist = 256
+
+    def __init__(self, resolution : float = 0.01, t0 : float = 0.0):
+        if resolution <= 0:
+            raise ValueError("resolution must be positive")
+        self.resolution = resolution
+        self.t0 = t0
+        # All ticks before `now` have been expired.
+        self.now = 0
+        # Number of active timers.
+        self.count = 0
+        self.levels : List[List[List[Timer]]] = \
+                [[[] for i in range(1 << b)] for b in self.bits]
+        # Number of entries (including cancelled ones) in each level.
+        self.filled = [0 for b in self.bits]
+        self.shifts : List[int] = []
+        shift = 0
+        for b in self.bits:
+            self.shifts.append(shift)
+            shift += b
+        self.span = 1 << shift
+        self._free : List[Timer] = []
+
+    def __len__(self) -> int:
+        return self.count
+
+    def tick_of(self, t : float) -> int:
+        """ The first tick at or after time `t`. """
+        tick = math.ceil((t - self.t0) / self.resolution)
+        if self.time_of(tick) < t: # rounding
+            tick += 1
+        return tick
+
+    def time_of(self, tick : int) -> float:
+        return self.t0 + tick*self.resolution
+
+    def add(self, deadline : float, item : Any,
+            handler : Any = None, priority : int = 0,
+            reuse : bool = False) -> Timer:
+        """ Add a timer for `item`, expiring at time `deadline`.
+
+            If `reuse` is True, the caller must `release` the timer
+            after it expires (and must not cancel it after that).
+        """
+        tick = self.tick_of(deadline)
+        if reuse and len(self._free) > 0:
+            timer = self._free.pop()
+            timer.deadline = deadline
+            timer.tick = tick
+            timer.item = item
+            timer.handler = handler
+            timer.priority = priority
+            timer.wheel = self
+        else:
+            timer = Timer(deadline, tick, item, handler, priority, self, reuse)
+        self.count += 1
+        self._file(timer)
+        return timer
+
+    def release(self, timer : Timer) -> None:
+        """ Hand back an expired timer added with ``reuse=True``,
+            for a later `add` to reuse.
+        """
+        if timer.reuse and timer.wheel is None \
+                and len(self._free) < self.freelist:
+            timer.item = None
+            timer.handler = None
+            self._free.append(timer)
+
+    def add_timer(self, timer : Timer) -> None:
+        """ Re-file a timer which has expired, at timer.deadline.
+            (Cancelled timers must not be re-filed.)
+        """
+        timer.tick = self.tick_of(timer.deadline)
+        timer.wheel = self
+        self.count += 1
+        self._file(timer)
+
+    def _file(self, timer : Timer) -> None:
+        tick = timer.tick
+        delta = tick - self.now
+        if delta < 0:
+            tick = self.now
+            delta = 0
+        elif delta >= self.span:
+            tick = self.now + self.span - 1
+            delta = self.span - 1
+        for k, (b, shift) in enumerate(zip(self.bits, self.shifts)):
+            if delta < (1 << (b + shift)):
+                self.levels[k][(tick >> shift) & ((1 << b) - 1)].append(timer)
+                self.filled[k] += 1
+                return
+
+    def _cascade(self, k : int) -> int:
+        # Re-file all timers in the current slot of level k.
+        # Returns that slot's index.
+        idx = (self.now >> self.shifts[k]) & ((1 << self.bits[k]) - 1)
+        slot = self.levels[k][idx]
+        if len(slot) > 0:
+            self.levels[k][idx] = []
+            self.filled[k] -= len(slot)
+            for timer in slot:
+                if timer.wheel is self:
+                    self._file(timer)
+        return idx
+
+    def _skip(self) -> int:
+        # The next tick at which anything can happen.
+        # That's `now` unless level 0 is empty, in which case it's the
+        # next cascade of the lowest non-empty level.
+        for k, n in enumerate(self.filled):
+            if n > 0:
+                if k == 0:
+                    return self.now
+                step = 1 << self.shifts[k]
+                return (self.now + step - 1) // step * step
+        return self.now
+
+    def advance(self, t : float) -> List[Timer]:
+        """ Turn the wheel up to time `t`, returning the
+            timers that expired (in order of expiry).
+        """
+        due : List[Timer] = []
+        # end = the last tick at or before time t
+        end = math.floor((t - self.t0) / self.resolution)
+        if self.time_of(end + 1) <= t: # rounding
+            end += 1
+        level0 = self.levels[0]
+        mask0 = (1 << self.bits[0]) - 1
+        while self.now <= end:
+            if self.count == 0:
+                self.now = end + 1
+                break
+            self.now = min(self._skip(), end + 1)
+            if self.now > end:
+                break
+            idx = self.now & mask0
+            if idx == 0:
+                k = 1
+                while k < len(self.levels) and self._cascade(k) == 0:
+                    k += 1
+            slot = level0[idx]
+            if len(slot) > 0:
+                level0[idx] = []
+                self.filled[0] -= len(slot)
+                for timer in slot:
+                    if timer.wheel is self:
+                        timer.wheel = None
+                        self.count -= 1
+                        due.append(timer)
+            self.now += 1
+        return due
+
+    def next_expiry(self) -> Optional[float]:
+        """ Time at which `advance` next needs to be called,
+            or None if there are no active timers.
+
+            This is the next non-empty tick in level 0,
+            or else the next cascade.
+        """
+        if self.count == 0:
+            return None
+        level0 = self.levels[0]
+        mask0 = (1 << self.bits[0]) - 1
+        tick = self._skip()
+        while True:
+            # Level 0 cascades at the start of each revolution.
+            if tick & mask0 == 0 or len(level0[tick & mask0]) > 0:
+                return self.time_of(tick)
+            tick += 1
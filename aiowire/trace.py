@@ -0,0 +1,190 @@
+from typing import Optional, List, Dict, Any
+import contextvars
+import json
+import os
+import random
+import time
+
+from .stats import wire_name
+
+class Span:
+    """
+    One step of a wire: from the call ``w(ev)`` until it returns
+    (or raises).
+
+    `parent_id` is the span that was running when the wire was
+    started (None for the root of a trace), and `link_id` is
+    the span of the wire that returned this one as its continuation,
+    i.e. the previous step of the same chain.
+    Times are `time.perf_counter_ns` values.
+    """
+    __slots__ = ('name', 'trace_id', 'span_id', 'parent_id', 'link_id',
+                 'start', 'end', 'error')
+
+    def __init__(self, name : str, trace_id : int, span_id : int,
+                 parent_id : Optional[int], link_id : Optional[int]):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = span_id
+        self.parent_id = parent_id
+        self.link_id = link_id
+        self.start = time.perf_counter_ns()
+        self.end = 0
+        self.error : Optional[str] = None
+
+    @property
+    def duration(self) -> float:
+        """ In seconds. """
+        return (self.end - self.start) * 1e-9
+
+    def __repr__(self):
+        return (f"Span({self.name!r}, trace={self.trace_id:032x}, "
+                f"span={self.span_id:016x}, duration={self.duration})")
+
+# Stands in for the span of a wire in a trace that was not sampled,
+# so the wires it starts aren't traced either.
+_unsampled = Span("", 0, 0, None, None)
+
+# The span of the running wire.
+current_span : "contextvars.ContextVar[Optional[Span]]" = \
+        contextvars.ContextVar("aiowire_span", default=None)
+
+_formats = ("chrome", "otlp")
+
+class Tracer:
+    """
+    Records a `Span` for every step of every wire an `EventLoop`
+    runs, for a loop created with ``EventLoop(tracer=Tracer(...))``.
+
+    Whether a trace is recorded is decided once, at its root
+    (a wire started outside of any traced wire), with probability
+    `sample`.  Wires started by an unsampled wire, and their
+    continuations, are not traced at all.
+
+    Finished spans are kept in `spans` until `flush` writes them
+    to the file at `path` (if given), which happens whenever
+    `buffer` spans are waiting, and when the loop exits.
+    Each flush appends to the file, in one of the formats:
+
+      * "chrome" -- the Trace Event (JSON array) format read by
+        Perfetto and chrome://tracing.  Each trace is one async track,
+        with the parent and link of each span in its args.
+      * "otlp" -- OTLP/JSON, one ``ExportTraceServiceRequest``
+        per line (as written by the OpenTelemetry collector's
+        file exporter).
+    """
+    def __init__(self, path : Optional[str] = None,
+                       format : str = "chrome",
+                       sample : float = 1.0,
+                       buffer : int = 10000,
+                       service : str = "aiowire"):
+        if format not in _formats:
+            raise ValueError(f"Unknown trace format: {format}")
+        self.path = path
+        self.format = format
+        self.sample = sample
+        self.buffer = buffer
+        self.service = service
+        self.spans : List[Span] = []
+        self.written = 0
+        # For converting perf_counter_ns to wall-clock time.
+        self._epoch = time.time_ns() - time.perf_counter_ns()
+        self._random = random.Random()
+
+    def begin(self, w : Any, link : Optional[Span] = None) -> Span:
+        """ Start the span of a step of w, following `link`
+            in its chain (if it's a continuation).
+        """
+        if link is not None:
+            if link is _unsampled:
+                return link
+            trace_id = link.trace_id
+            parent_id = link.parent_id
+            link_id : Optional[int] = link.span_id
+        else:
+            parent = current_span.get()
+            if parent is _unsampled:
+                return parent
+            if parent is None:
+                if self.sample < 1.0 and self._random.random() >= self.sample:
+                    return _unsampled
+                trace_id = self._random.getrandbits(128) or 1
+                parent_id = None
+            else:
+                trace_id = parent.trace_id
+                parent_id = parent.span_id
+            link_id = None
+        return Span(wire_name(w), trace_id, self._random.getrandbits(64) or 1,
+                    parent_id, link_id)
+
+    def end(self, span : Span, exc : Optional[BaseException] = None) -> None:
+        """ Finish span (which failed with exc, if given). """
+        if span is _unsampled or span.end != 0:
+            return
+        span.end = time.perf_counter_ns()
+        if exc is not None:
+            span.error = repr(exc)
+        self.spans.append(span)
+        if len(self.spans) >= self.buffer:
+            self.flush()
+
+    def flush(self) -> None:
+        """ Append the finished spans to the file (if any). """
+        if self.path is None or len(self.spans) == 0:
+            return
+        spans = self.spans
+        self.spans = []
+        if self.format == "chrome":
+            text = self._chrome(spans, self.written == 0)
+        else:
+            text = json.dumps(self._otlp(spans)) + "\n"
+        with open(self.path, "a") as f:
+            f.write(text)
+        self.written += len(spans)
+
+    def _chrome(self, spans : List[Span], first : bool) -> str:
+        pid = os.getpid()
+        lines = ["["] if first else []
+        for s in spans:
+            args : Dict[str, Any] = {"span_id": f"{s.span_id:016x}"}
+            if s.parent_id is not None:
+                args["parent_id"] = f"{s.parent_id:016x}"
+            if s.link_id is not None:
+                args["link_id"] = f"{s.link_id:016x}"
+            if s.error is not None:
+                args["error"] = s.error
+            common = { "cat": "aiowire", "id": f"0x{s.trace_id:032x}",
+                       "name": s.name, "pid": pid, "tid": pid }
+            lines.append(json.dumps(dict(common, ph="b",
+                                         ts=s.start/1000, args=args)) + ",")
+            lines.append(json.dumps(dict(common, ph="e",
+                                         ts=s.end/1000)) + ",")
+        # The closing "]" is optional in this format.
+        return "\n".join(lines) + "\n"
+
+    def _otlp(self, spans : List[Span]) -> Dict[str, Any]:
+        out = []
+        for s in spans:
+            span : Dict[str, Any] = {
+                "traceId": f"{s.trace_id:032x}",
+                "spanId": f"{s.span_id:016x}",
+                "name": s.name,
+                "kind": 1, # SPAN_KIND_INTERNAL
+                "startTimeUnixNano": str(self._epoch + s.start),
+                "endTimeUnixNano": str(self._epoch + s.end),
+            }
+            if s.parent_id is not None:
+                span["parentSpanId"] = f"{s.parent_id:016x}"
+            if s.link_id is not None:
+                span["links"] = [{ "traceId": span["traceId"],
+                                   "spanId": f"{s.link_id:016x}" }]
+            if s.error is not None:
+                span["status"] = {"code": 2, "message": s.error}
+            out.append(span)
+        return { "resourceSpans": [{
+                    "resource": { "attributes": [{
+                        "key": "service.name",
+                        "value": {"stringValue": self.service} }] },
+                    "scopeSpans": [{ "scope": {"name": "aiowire"},
+                                     "spans": out }],
+                }] }
@@ -1,5 +1,7 @@
-from typing import Optional
+from typing import Optional, List
 from inspect import isawaitable
+import asyncio
+import math
 
 class Wire:
     """
@@ -28,7 +30,19 @@ class Wire:
           any other class.  The only rule for extension is that
           IF the extension implements either __init__ or __call__,
           then it MUST implement both __init__ and __call__.
+
+    The built-in wires use ``__slots__`` rather than an instance
+    ``__dict__``, to keep large compositions small.  Extensions
+    get a ``__dict__`` as usual, unless they declare ``__slots__``
+    for their own attributes too.  Since a subclass can't drop
+    the slots of its base, every wire carries the three slots of
+    ``Wire(fn, *args, **kwargs)``, and those that don't use them
+    (like `Sequence` and `Repeat`) waste 24 bytes each.  Moving them
+    into a subclass would make ``Wire(fn)`` something other than
+    a plain `Wire`, which the ``type(w) is Wire`` checks rely on.
     """
+    __slots__ = ('_aiowire', 'args', 'kwargs')
+
     def __init__(self, a, *args, **kwargs):
         self._aiowire = a
         self.args   = args
@@ -51,6 +65,8 @@ class Sequence(Wire):
     If a returns another Wire, c, then both c *and* b are run
     concurrently.
     """
+    __slots__ = ('a', 'b')
+
     def __init__(self, a, b):
         self.a = a
         self.b = b
@@ -66,6 +82,8 @@ class Call(Wire):
 
     The return value of the wire created is always None.
     """
+    __slots__ = ('_aiowire_fn',)
+
     def __init__(self, fn, *args, **kwargs):
         self._aiowire_fn = fn
         self.args = args
@@ -76,23 +94,200 @@ class Call(Wire):
             ret = await ret
         return None
 
+class Offload(Wire):
+    """
+    Like `Call`, but calls the function in the `EventLoop`'s
+    thread pool (see `EventLoop.offload`), so that a blocking
+    call doesn't stall every other wire.
+
+    The return value of the wire created is always None.
+    Exceptions raised by the function are raised by the wire.
+    If the wire is cancelled, the call still runs to completion
+    in its thread.
+    """
+    __slots__ = ('_aiowire_fn',)
+
+    def __init__(self, fn, *args, **kwargs):
+        self._aiowire_fn = fn
+        self.args = args
+        self.kwargs = kwargs
+    async def __call__(self, ev) -> Optional[Wire]:
+        await ev.offload(self._aiowire_fn, *self.args, **self.kwargs)
+        return None
+
+class InProcess(Wire):
+    """
+    Like `Offload`, but calls the function in one of the `EventLoop`'s
+    worker processes (see `EventLoop.in_process`), for CPU-bound work.
+    The function and its arguments must be picklable,
+    and large buffers are passed through shared memory
+    (see `ProcessPool`).
+
+    The return value of the wire created is always None.
+    Exceptions raised by the function are raised by the wire.
+    If the wire is cancelled, its worker process is terminated.
+    """
+    __slots__ = ('_aiowire_fn',)
+
+    def __init__(self, fn, *args, **kwargs):
+        self._aiowire_fn = fn
+        self.args = args
+        self.kwargs = kwargs
+    async def __call__(self, ev) -> Optional[Wire]:
+        await ev.in_process(self._aiowire_fn, *self.args, **self.kwargs)
+        return None
+
 class Repeat(Wire):
+    """
+    Run the wire ``a`` ``n`` times in a row
+    (``a * n`` is shorthand for this).
+
+    Any wires returned by the first ``n-1`` runs of ``a`` are started
+    concurrently, while the last run is returned as the continuation.
+
+    The count is kept by a separate ``_Repeating`` wire created
+    for each run, so the same Repeat can be started any number
+    of times (even concurrently).  Up to `freelist` finished
+    ``_Repeating`` wires are kept for reuse by later runs
+    (set it to 0 to turn this off).
+    """
+    __slots__ = ('a', 'n')
+    freelist = 64
+
     def __init__(self, a : Wire, n : int):
         self.a = a
         self.n = n
 
     async def __call__(self, ev) -> Optional[Wire]:
-        self.n -= 1
-        if self.n == 0:
+        if self.n > 1:
+            return await _Repeating.new(self.a, self.n-1)(ev)
+        elif self.n == 1:
             return self.a
-        elif self.n > 0:
-            M = Sequence(self.a, self)
-            return await M(ev)
         return None
 
+# Finished _Repeating wires, for reuse (see Repeat.freelist).
+_free_repeating : List['_Repeating'] = []
+
+class _Repeating(Wire):
+    """
+    The state of one run of a `Repeat`:
+    ``left`` more runs of ``a`` before its final one.
+    """
+    __slots__ = ('a', 'left')
+
+    def __init__(self, a : Wire, left : int):
+        self.a = a
+        self.left = left
+
+    @staticmethod
+    def new(a : Wire, left : int) -> '_Repeating':
+        try:
+            r = _free_repeating.pop()
+        except IndexError:
+            return _Repeating(a, left)
+        r.a = a
+        r.left = left
+        return r
+
+    async def __call__(self, ev) -> Optional[Wire]:
+        ret = await self.a(ev)
+        if ret is not None:
+            ev.start(ret)
+        self.left -= 1
+        if self.left > 0:
+            return self
+        # Nothing else refers to a finished run.
+        a = self.a
+        if len(_free_repeating) < Repeat.freelist:
+            self.a = None # type: ignore[assignment]
+            _free_repeating.append(self)
+        return a
+
 class Forever(Wire):
+    """
+    Run the wire ``a`` over and over.
+
+    Any wires returned by ``a`` are started concurrently.
+    """
+    __slots__ = ('a',)
+
     def __init__(self, a : Wire):
         self.a = a
     async def __call__(self, ev) -> Optional[Wire]:
-        M = Sequence(self.a, self)
-        return await M(ev)
+        ret = await self.a(ev)
+        if ret is not None:
+            ev.start(ret)
+        return self
+
+class After(Wire):
+    """
+    Run the wire ``a`` after ``delay`` seconds.
+
+    When an `EventLoop` starts (or continues with) an ``After``,
+    the wait is just an entry in the loop's timer wheel,
+    and no task is kept alive for it.
+    When awaited directly (e.g. ``After(1, a) >> b``), it sleeps.
+    """
+    __slots__ = ('delay', 'a')
+
+    def __init__(self, delay : float, a):
+        self.delay = delay
+        self.a = a
+    async def __call__(self, ev) -> Optional[Wire]:
+        await asyncio.sleep(self.delay)
+        return self.a
+
+def next_deadline(deadline : float, period : float,
+                  now : float, policy : str) -> float:
+    """ The deadline following `deadline` for a periodic wire
+        whose last tick finished at time `now`.
+
+        If that is already past, policy "skip" moves on to
+        the first deadline after `now`, while "catch_up" keeps it
+        (so missed ticks run back-to-back).
+    """
+    deadline += period
+    if deadline <= now and policy == "skip":
+        deadline += period*(math.floor((now - deadline)/period) + 1)
+    return deadline
+
+class Every(Wire):
+    """
+    Run the wire ``a`` every ``period`` seconds, forever,
+    starting ``period`` seconds from now.
+
+    Ticks are scheduled against absolute deadlines
+    (start + k*period), so they do not drift.
+    Each tick runs ``a`` (and any Wire-s it returns) to completion
+    before the next tick is scheduled.  If that overruns
+    one or more deadlines, ``policy`` decides what happens:
+
+      * "skip" -- drop the missed ticks, and wait for the next deadline
+      * "catch_up" -- run the missed ticks back-to-back
+
+    When started by an `EventLoop`, ticks are driven by the loop's
+    timer wheel, and an exception raised by a tick stops the wire.
+    When awaited directly, it sleeps between ticks.
+    """
+    __slots__ = ('period', 'a', 'policy')
+
+    def __init__(self, period : float, a, policy : str = "skip"):
+        if period <= 0:
+            raise ValueError("period must be positive")
+        if policy not in ("skip", "catch_up"):
+            raise ValueError(f"Unknown policy: {policy}")
+        self.period = period
+        self.a = a
+        self.policy = policy
+    async def __call__(self, ev) -> Optional[Wire]:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.period
+        while True:
+            dt = deadline - loop.time()
+            if dt > 0:
+                await asyncio.sleep(dt)
+            ret = await self.a(ev)
+            if ret is not None:
+                ev.start(ret)
+            deadline = next_deadline(deadline, self.period,
+                                     loop.time(), self.policy)
@@ -0,0 +1,69 @@
+"""
+Time per node of a composed wire, run as-is and after `aiowire.compile`.
+
+Each run starts a chain of ``n`` Call-s ``reps`` times, nested
+either way:
+
+  * "left" -- ``a >> b >> c ...``, which starts ``b``, ``c``, ...
+    concurrently, so each node is a task.  Uncompiled, it nests
+    a coroutine per node, so long ones overflow the stack
+    (shown as "-").
+  * "right" -- ``a >> (b >> (c >> ...))``, which runs the nodes in turn,
+    as steps of one task.
+
+Usage::
+
+    python benchmarks/bench_compile.py [n ...] [--reps R]
+"""
+import argparse
+import asyncio
+import time
+
+import aiowire
+from aiowire import EventLoop, Call, Wire
+
+async def bench(n : int, reps : int, compiled : bool, shape : str):
+    count = 0
+    def f():
+        nonlocal count
+        count += 1
+
+    w : Wire = Call(f)
+    for i in range(n-1):
+        if shape == "left":
+            w = w >> Call(f)
+        else:
+            w = Call(f) >> w
+    if compiled:
+        w = aiowire.compile(w)
+    failed = False
+    def fail(ev, e):
+        nonlocal failed
+        failed = True
+    t0 = time.perf_counter()
+    async with EventLoop() as ev:
+        for i in range(reps):
+            ev.start(w, fail)
+    if failed:
+        return None
+    dt = time.perf_counter() - t0
+    assert count == n*reps
+    return dt / (n*reps)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("sizes", type=int, nargs="*",
+                        default=[4, 16, 64, 256, 4096])
+    parser.add_argument("--reps", type=int, default=1000)
+    args = parser.parse_args(argv)
+
+    print(f"{'shape':>6}  {'n':>6}  {'as-is us':>9}  {'compiled us':>11}")
+    for shape in ["left", "right"]:
+        for n in args.sizes:
+            plain = asyncio.run(bench(n, args.reps, False, shape))
+            comp = asyncio.run(bench(n, args.reps, True, shape))
+            plain_us = "-" if plain is None else f"{plain*1e6:.3f}"
+            print(f"{shape:>6}  {n:>6}  {plain_us:>9}  {comp*1e6:>11.3f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Per-completion dispatch cost of `EventLoop.run` versus
+the number of resident (parked) wires.
+
+Each run parks ``n`` wires on an `asyncio.Event`, then
+times a single wire that starts a fresh copy of itself ``steps`` times.
+Every step is one task completion handled by `EventLoop.run`,
+so the reported time per step should stay flat as ``n`` grows.
+
+Usage::
+
+    python benchmarks/bench_completion.py [--steps 2000] [n ...]
+"""
+import argparse
+import asyncio
+import time
+
+from aiowire import EventLoop
+
+async def bench(n : int, steps : int) -> float:
+    gate = asyncio.Event()
+    async def parked(ev):
+        await gate.wait()
+
+    count = 0
+    t0 = 0.0
+    elapsed = 0.0
+    async def step(ev):
+        nonlocal count, t0, elapsed
+        await asyncio.sleep(0)
+        if count == 0:
+            t0 = time.perf_counter()
+        count += 1
+        if count <= steps:
+            ev.start(step)
+            return None
+        elapsed = time.perf_counter() - t0
+        gate.set()
+        return None
+
+    async with EventLoop() as ev:
+        for i in range(n):
+            ev.start(parked)
+        await asyncio.sleep(0) # let the parked wires reach their wait
+        ev.start(step)
+    return elapsed / steps
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--steps", type=int, default=2000,
+                        help="number of timed completions")
+    parser.add_argument("sizes", type=int, nargs="*",
+                        default=[10, 100, 1000, 10000, 100000])
+    args = parser.parse_args(argv)
+
+    print(f"{'resident wires':>15}  {'us/completion':>14}")
+    for n in args.sizes:
+        dt = asyncio.run(bench(n, args.steps))
+        print(f"{n:>15}  {dt*1e6:>14.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""
+Per-step cost of a long-lived state-machine wire,
+with and without trampolined continuations.
+
+The wire returns its successor ``steps`` times.
+With ``trampoline=False`` every successor is run in
+a new `asyncio.Task`.  Eager starts are disabled to
+isolate the effect of trampolining.
+
+Usage::
+
+    python benchmarks/bench_continuation.py [--steps 100000]
+"""
+import argparse
+import asyncio
+import time
+
+from aiowire import EventLoop, Wire
+
+async def bench(steps : int, trampoline : bool) -> float:
+    count = 0
+    async def state(ev):
+        nonlocal count
+        count += 1
+        if count < steps:
+            return Wire(state)
+        return None
+
+    t0 = time.perf_counter()
+    async with EventLoop(trampoline=trampoline, eager=False) as ev:
+        ev.start(state)
+    return (time.perf_counter() - t0) / steps
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--steps", type=int, default=100000,
+                        help="length of the continuation chain")
+    args = parser.parse_args(argv)
+
+    print(f"{'trampoline':>10}  {'us/step':>8}")
+    for trampoline in [False, True]:
+        dt = asyncio.run(bench(args.steps, trampoline))
+        print(f"{str(trampoline):>10}  {dt*1e6:>8.2f}")
+
+if __name__ == "__main__":
+    main()
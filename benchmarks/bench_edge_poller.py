@@ -0,0 +1,80 @@
+"""
+Round trips per second between two zmq PAIR sockets watched by
+a poller which also has ``idle`` other sockets registered,
+for `Poller` and `EdgePoller`.
+
+Usage::
+
+    python benchmarks/bench_edge_poller.py [idle ...] [-n N]
+"""
+import argparse
+import asyncio
+import time
+
+import zmq
+from zmq.asyncio import Context
+
+from aiowire import EventLoop, Poller, EdgePoller, Wire
+
+async def bench(n : int, idle : int, cls):
+    ctx = Context()
+    ctx.set(zmq.MAX_SOCKETS, idle + 16)
+    name = f'inproc://bench_edge{cls.__name__}{idle}'
+    socks = []
+    def pair(url):
+        a = ctx.socket(zmq.PAIR)
+        b = ctx.socket(zmq.PAIR)
+        a.setsockopt(zmq.LINGER, 0)
+        b.setsockopt(zmq.LINGER, 0)
+        a.bind(url)
+        b.connect(url)
+        socks.extend([a, b])
+        return a, b
+    a, b = pair(name)
+
+    count = 0
+    async def ping(ev):
+        await b.recv()
+        await b.send(b'x')
+    async def pong(ev):
+        nonlocal count
+        await a.recv()
+        count += 1
+        if count == n:
+            poller.shutdown()
+        else:
+            await a.send(b'x')
+
+    watch = {a: Wire(pong), b: Wire(ping)}
+    for i in range(idle):
+        s = ctx.socket(zmq.PULL) # never receives anything
+        s.setsockopt(zmq.LINGER, 0)
+        socks.append(s)
+        watch[s] = Wire(ping)
+    poller = cls(watch)
+    t0 = time.perf_counter()
+    await a.send(b'x')
+    async with EventLoop() as ev:
+        ev.start(poller)
+    dt = time.perf_counter() - t0
+    for s in socks:
+        s.close()
+    ctx.term()
+    assert count == n
+    return n / dt
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("idle", type=int, nargs="*",
+                        default=[0, 100, 500])
+    parser.add_argument("-n", type=int, default=2000)
+    args = parser.parse_args(argv)
+
+    print(f"{'idle':>6}  {'Poller/s':>10}  {'EdgePoller/s':>12}")
+    for idle in args.idle:
+        lvl = asyncio.run(bench(args.n, idle, Poller))
+        edge = asyncio.run(bench(args.n, idle, EdgePoller))
+        print(f"{idle:>6}  {lvl:>10.0f}  {edge:>12.0f}")
+
+if __name__ == "__main__":
+    main()
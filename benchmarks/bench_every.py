@@ -0,0 +1,57 @@
+"""
+Cadence of periodic wires under load:
+``Every(period, w)`` versus ``Forever(Call(asyncio.sleep, period) >> w)``.
+
+A background wire keeps the loop busy with short
+synchronous bursts.  Reports how far the last tick
+has drifted from its ideal time, start + n*period.
+
+Usage::
+
+    python benchmarks/bench_every.py [--period 0.01] [--ticks 200]
+"""
+import argparse
+import asyncio
+import time
+
+from aiowire import EventLoop, Call, Wire, Forever, Every
+
+async def bench(period : float, ticks : int, every : bool) -> float:
+    loop = asyncio.get_running_loop()
+    times = []
+    def tick():
+        times.append(loop.time())
+
+    async def load(ev):
+        t = time.perf_counter()
+        while time.perf_counter() - t < period/5:
+            pass
+        await asyncio.sleep(0)
+        return Wire(load)
+
+    w : Wire
+    if every:
+        w = Every(period, Call(tick))
+    else:
+        w = Forever(Call(asyncio.sleep, period) >> Call(tick))
+    async with EventLoop(timeout=(ticks+0.5)*period,
+                         timer_resolution=period/10) as ev:
+        t0 = loop.time()
+        ev.start(w)
+        ev.start(load)
+    return times[-1] - (t0 + len(times)*period)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--period", type=float, default=0.01)
+    parser.add_argument("--ticks", type=int, default=200)
+    args = parser.parse_args(argv)
+
+    print(f"{'wire':>40}  {'drift (ms)':>10}")
+    for every, name in [(False, "Forever(Call(sleep, p) >> w)"),
+                        (True, "Every(p, w)")]:
+        drift = asyncio.run(bench(args.period, args.ticks, every))
+        print(f"{name:>40}  {drift*1e3:>10.2f}")
+
+if __name__ == "__main__":
+    main()
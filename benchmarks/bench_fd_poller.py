@@ -0,0 +1,68 @@
+"""
+Round trips per second of a byte bounced between two socketpairs,
+with callbacks dispatched by `FdPoller` and by the zmq-based `Poller`.
+
+Usage::
+
+    python benchmarks/bench_fd_poller.py [n]
+"""
+import argparse
+import asyncio
+import socket
+import time
+from typing import Union
+
+from aiowire import EventLoop, FdPoller, Poller, Wire
+
+async def bench(n : int, kind : str):
+    a, b = socket.socketpair()
+    c, d = socket.socketpair()
+    for s in (a, b, c, d):
+        s.setblocking(False)
+
+    count = 0
+    def ping(ev):
+        b.recv(1)
+        c.send(b'x')
+    def pong(ev):
+        nonlocal count
+        d.recv(1)
+        count += 1
+        if count == n:
+            poller.shutdown()
+        else:
+            a.send(b'x')
+
+    socks = [(b.fileno(), Wire(ping)), (d.fileno(), Wire(pong))]
+    poller : Union[FdPoller, Poller]
+    if kind == "FdPoller":
+        poller = FdPoller(dict(socks))
+    else:
+        import zmq # Poller needs it
+        poller = Poller(dict(socks))
+    t0 = time.perf_counter()
+    a.send(b'x')
+    async with EventLoop() as ev:
+        ev.start(poller)
+    dt = time.perf_counter() - t0
+    for s in (a, b, c, d):
+        s.close()
+    assert count == n
+    return n / dt
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("n", type=int, nargs="?", default=20000)
+    args = parser.parse_args(argv)
+
+    print(f"{'poller':>8}  {'trips/s':>10}")
+    for kind in ["FdPoller", "Poller"]:
+        try:
+            rate = asyncio.run(bench(args.n, kind))
+        except ImportError:
+            print(f"{kind:>8}  {'(no zmq)':>10}")
+            continue
+        print(f"{kind:>8}  {rate:>10.0f}")
+
+if __name__ == "__main__":
+    main()
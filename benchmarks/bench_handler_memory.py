@@ -0,0 +1,42 @@
+"""
+Memory per resident wire, with and without debug-mode
+exception-context capture.
+
+Usage::
+
+    python benchmarks/bench_handler_memory.py [--wires 10000]
+"""
+import argparse
+import asyncio
+import tracemalloc
+
+from aiowire import EventLoop
+
+async def bench(wires : int, debug : bool) -> float:
+    gate = asyncio.Event()
+    async def parked(ev):
+        await gate.wait()
+
+    async with EventLoop(debug=debug) as ev:
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        for i in range(wires):
+            ev.start(parked)
+        after = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        gate.set()
+    return (after - before) / wires
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--wires", type=int, default=10000,
+                        help="number of resident wires")
+    args = parser.parse_args(argv)
+
+    print(f"{'debug':>6}  {'bytes/wire':>10}")
+    for debug in [True, False]:
+        nbytes = asyncio.run(bench(args.wires, debug))
+        print(f"{str(debug):>6}  {nbytes:>10.0f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Time per call of a function taking and returning ``size`` MiB
+of bytes in a worker process: `ProcessPool` passing the buffers through
+shared memory, `ProcessPool` pickling them, and
+`concurrent.futures.ProcessPoolExecutor`.
+
+Usage::
+
+    python benchmarks/bench_in_process.py [size ...] [--calls N]
+"""
+import argparse
+import asyncio
+import concurrent.futures
+import time
+
+from aiowire.process_pool import ProcessPool
+
+def touch(data):
+    # Return a buffer of the same size (without much work).
+    return bytes(data)
+
+async def bench_pool(data, calls, threshold):
+    pool = ProcessPool(1, threshold=threshold)
+    try:
+        await pool.run(touch, b'') # start the worker
+        t0 = time.perf_counter()
+        for i in range(calls):
+            await pool.run(touch, data)
+        return (time.perf_counter() - t0) / calls
+    finally:
+        pool.shutdown()
+
+async def bench_executor(data, calls):
+    loop = asyncio.get_running_loop()
+    with concurrent.futures.ProcessPoolExecutor(1) as ex:
+        await loop.run_in_executor(ex, touch, b'')
+        t0 = time.perf_counter()
+        for i in range(calls):
+            await loop.run_in_executor(ex, touch, data)
+        return (time.perf_counter() - t0) / calls
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("sizes", type=int, nargs="*", default=[1, 8, 64])
+    parser.add_argument("--calls", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    print(f"{'MiB':>4}  {'shm ms':>8}  {'pickle ms':>9}  {'executor ms':>11}")
+    for size in args.sizes:
+        data = b'x' * (size << 20)
+        shm = asyncio.run(bench_pool(data, args.calls, 1 << 16))
+        pkl = asyncio.run(bench_pool(data, args.calls, 1 << 62))
+        exe = asyncio.run(bench_executor(data, args.calls))
+        print(f"{size:>4}  {shm*1e3:>8.2f}  {pkl*1e3:>9.2f}  {exe*1e3:>11.2f}")
+
+if __name__ == "__main__":
+    main()
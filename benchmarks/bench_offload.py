@@ -0,0 +1,54 @@
+"""
+Wall time of ``n`` wires each making a blocking call of ``ms``
+milliseconds, with `Call` (inline) and with `Offload` (thread pool),
+and the worst delay seen meanwhile by a 1 ms ticker wire.
+
+Usage::
+
+    python benchmarks/bench_offload.py [n] [--ms MS] [--threads T]
+"""
+import argparse
+import asyncio
+import time
+
+from aiowire import EventLoop, Call, Offload
+
+async def bench(n : int, ms : float, threads : int, offload : bool):
+    worst = 0.0
+    running = True
+    async def ticker(ev):
+        nonlocal worst
+        while running:
+            t = time.perf_counter()
+            await asyncio.sleep(0.001)
+            worst = max(worst, time.perf_counter() - t - 0.001)
+
+    left = n
+    def finished():
+        nonlocal left, running
+        left -= 1
+        if left == 0:
+            running = False
+
+    wire = Offload if offload else Call
+    t0 = time.perf_counter()
+    async with EventLoop(threads=threads) as ev:
+        ev.start(ticker)
+        for i in range(n):
+            ev.start(wire(time.sleep, ms/1000) >> Call(finished))
+    return time.perf_counter() - t0, worst
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("n", type=int, nargs="?", default=100)
+    parser.add_argument("--ms", type=float, default=10.0)
+    parser.add_argument("--threads", type=int, default=16)
+    args = parser.parse_args(argv)
+
+    print(f"{'wire':>8}  {'wall s':>7}  {'max tick delay ms':>17}")
+    for offload, name in [(False, "Call"), (True, "Offload")]:
+        dt, worst = asyncio.run(bench(args.n, args.ms, args.threads, offload))
+        print(f"{name:>8}  {dt:>7.3f}  {worst*1000:>17.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Messages per second received through a `Poller` from a socket
+with ``n`` queued messages: one ``recv`` per callback,
+vs. draining in batches (``Poller(batch=N)``).
+
+Usage::
+
+    python benchmarks/bench_poller.py [n] [--batch N ...]
+"""
+import argparse
+import asyncio
+import time
+
+import zmq
+from zmq.asyncio import Context
+
+from aiowire import EventLoop, Poller, Wire
+from aiowire.poller import Callback
+
+async def bench(n : int, batch):
+    ctx = Context.instance()
+    push = ctx.socket(zmq.PUSH)
+    pull = ctx.socket(zmq.PULL)
+    for s in (push, pull):
+        s.setsockopt(zmq.LINGER, 0)
+        s.setsockopt(zmq.SNDHWM, 0)
+        s.setsockopt(zmq.RCVHWM, 0)
+    pull.bind(f'inproc://bench_poller{batch}')
+    push.connect(f'inproc://bench_poller{batch}')
+    for i in range(n):
+        push.send(b'x')
+
+    count = 0
+    async def one(ev):
+        nonlocal count
+        await pull.recv()
+        count += 1
+        if count == n:
+            poller.shutdown()
+    def many(ev, msgs):
+        nonlocal count
+        count += len(msgs)
+        if count == n:
+            poller.shutdown()
+
+    cb : Callback = Wire(one) if batch is None else many
+    poller = Poller({pull: cb}, batch=batch)
+    t0 = time.perf_counter()
+    async with EventLoop() as ev:
+        ev.start(poller)
+    dt = time.perf_counter() - t0
+    push.close()
+    pull.close()
+    assert count == n
+    return n / dt
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("n", type=int, nargs="?", default=20000)
+    parser.add_argument("--batch", type=int, nargs="*",
+                        default=[16, 256])
+    args = parser.parse_args(argv)
+
+    print(f"{'batch':>6}  {'msg/s':>10}")
+    for batch in [None] + args.batch:
+        rate = asyncio.run(bench(args.n, batch))
+        print(f"{str(batch):>6}  {rate:>10.0f}")
+
+if __name__ == "__main__":
+    main()
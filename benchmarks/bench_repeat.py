@@ -0,0 +1,49 @@
+"""
+Throughput and peak memory of ``Call(f) * n`` and
+``Forever(Call(f))`` as the number of iterations grows.
+
+Usage::
+
+    python benchmarks/bench_repeat.py [n ...]
+"""
+import argparse
+import asyncio
+import time
+import tracemalloc
+
+from aiowire import EventLoop, Call, Forever
+
+async def bench(n : int, forever : bool):
+    count = 0
+    def f():
+        nonlocal count
+        count += 1
+        if forever and count >= n:
+            raise StopAsyncIteration()
+
+    prog = Forever(Call(f)) if forever else Call(f) * n
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    t0 = time.perf_counter()
+    async with EventLoop() as ev:
+        ev.start(prog, lambda ev, e: None)
+    dt = time.perf_counter() - t0
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    assert count == n
+    return dt / n, peak
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("sizes", type=int, nargs="*",
+                        default=[10000, 100000, 1000000])
+    args = parser.parse_args(argv)
+
+    print(f"{'wire':>8}  {'n':>8}  {'us/iter':>8}  {'peak KiB':>9}")
+    for forever, name in [(False, "Repeat"), (True, "Forever")]:
+        for n in args.sizes:
+            dt, peak = asyncio.run(bench(n, forever))
+            print(f"{name:>8}  {n:>8}  {dt*1e6:>8.3f}  {peak/1024:>9.1f}")
+
+if __name__ == "__main__":
+    main()
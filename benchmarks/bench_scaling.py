@@ -0,0 +1,251 @@
+"""
+Memory and dispatch latency versus the number of resident wires.
+
+For each size ``n`` (1, 10, 100, ... up to ``--max``), a fresh
+Python process parks ``n`` wires of the given ``--kind`` on a future,
+and records:
+
+* the growth of its RSS, per wire,
+* the p50 and p99 latency of dispatching a continuation
+  (from the end of a task to the start of the wire it returned),
+  while the ``n`` wires are resident.
+
+For sizes up to ``--trace-max``, a second process runs under
+tracemalloc (which would inflate the RSS), to find the memory
+per wire, broken down by allocation site, and the objects
+(by type) that each wire keeps alive, from ``gc.get_objects()``.
+
+Kinds of parked wire:
+
+* ``fn`` -- an async function,
+* ``call`` -- ``Call(fut)``, awaiting the future,
+* ``sequence`` -- ``Call(fut) >> Call(noop)``.
+
+Usage::
+
+    python benchmarks/bench_scaling.py [--max 1000000] [--kind fn]
+        [--csv scaling.csv] [--breakdown sites.csv] [--plot scaling.png]
+"""
+from typing import Dict, List, Any, Optional
+import argparse
+import asyncio
+import csv
+import gc
+import json
+import os
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from aiowire import EventLoop, Wire, Call
+
+def noop():
+    pass
+
+async def wait(fut):
+    await fut
+
+def rss() -> int:
+    """ Resident set size of this process, in bytes. """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError: # not Linux: use the peak instead
+        import resource
+        scale = 1 if sys.platform == "darwin" else 1024
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+def count_types() -> Dict[str, List[int]]:
+    # type name -> [count, shallow bytes] of the objects the gc tracks
+    out : Dict[str, List[int]] = {}
+    for obj in gc.get_objects():
+        name = type(obj).__qualname__
+        entry = out.setdefault(name, [0, 0])
+        entry[0] += 1
+        entry[1] += sys.getsizeof(obj)
+    return out
+
+def quantile(xs : List[float], q : float) -> float:
+    xs = sorted(xs)
+    return xs[min(len(xs)-1, int(q * len(xs)))]
+
+async def measure(n : int, kind : str, trace : bool,
+                  samples : int) -> Dict[str, Any]:
+    gate = asyncio.get_running_loop().create_future()
+    async def parked(ev):
+        await gate
+    if kind == "fn":
+        wire : Any = parked
+    elif kind == "call":
+        wire = Call(wait, gate)
+    else:
+        wire = Call(wait, gate) >> Call(noop)
+
+    lat : List[float] = []
+    stamp = 0.0
+    async def _ping(ev):
+        nonlocal stamp
+        await asyncio.sleep(0)
+        stamp = time.perf_counter()
+        return pong
+    async def _pong(ev):
+        lat.append(time.perf_counter() - stamp)
+        if len(lat) < samples:
+            return ping
+        gate.set_result(None)
+        return None
+    ping, pong = Wire(_ping), Wire(_pong)
+
+    out : Dict[str, Any] = {"n": n, "kind": kind}
+    # Continuations are dispatched by run() only without trampolining.
+    async with EventLoop(trampoline=False) as ev:
+        gc.collect()
+        if trace:
+            types0 = count_types()
+            tracemalloc.start()
+            snap0 = tracemalloc.take_snapshot()
+        rss0 = rss()
+        for i in range(n):
+            ev.start(wire)
+        await asyncio.sleep(0)
+        out["tasks"] = len(ev.tasks)
+        if not trace:
+            out["rss_per_wire"] = (rss() - rss0) / n
+            ev.start(ping)
+        else:
+            snap1 = tracemalloc.take_snapshot()
+            tracemalloc.stop()
+            out["traced_per_wire"] = sum(d.size_diff for d in
+                    snap1.compare_to(snap0, "filename")) / n
+            out["sites"] = [(str(d.traceback[0]), d.size_diff / n,
+                             d.count_diff / n)
+                            for d in snap1.compare_to(snap0, "lineno")[:10]
+                            if d.size_diff > 0]
+            del snap0, snap1
+            gc.collect()
+            types1 = count_types()
+            out["types"] = sorted(
+                ((name, (c - types0.get(name, [0, 0])[0]) / n,
+                        (b - types0.get(name, [0, 0])[1]) / n)
+                 for name, (c, b) in types1.items()),
+                key=lambda t: -t[2])[:10]
+            gate.set_result(None)
+    if not trace:
+        out["p50_us"] = quantile(lat, 0.5) * 1e6
+        out["p99_us"] = quantile(lat, 0.99) * 1e6
+    return out
+
+def plot(rows : List[Dict[str, Any]], path : str) -> None:
+    import matplotlib # type: ignore[import-not-found]
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt # type: ignore[import-not-found]
+    ns = [r["n"] for r in rows]
+    fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(10, 4))
+    ax1.plot(ns, [r["rss_per_wire"] for r in rows], "o-", label="RSS")
+    traced = [r for r in rows if "traced_per_wire" in r]
+    ax1.plot([r["n"] for r in traced], [r["traced_per_wire"] for r in traced],
+             "s-", label="tracemalloc")
+    ax1.set(xscale="log", xlabel="resident wires", ylabel="bytes per wire")
+    ax1.legend()
+    ax2.plot(ns, [r["p50_us"] for r in rows], "o-", label="p50")
+    ax2.plot(ns, [r["p99_us"] for r in rows], "s-", label="p99")
+    ax2.set(xscale="log", yscale="log", xlabel="resident wires",
+            ylabel="dispatch latency (us)")
+    ax2.legend()
+    fig.tight_layout()
+    fig.savefig(path)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--max", type=int, default=1000000,
+                        help="largest number of resident wires")
+    parser.add_argument("--factor", type=int, default=10,
+                        help="ratio between successive sizes")
+    parser.add_argument("--kind", choices=["fn", "call", "sequence"],
+                        default="fn", help="kind of resident wire")
+    parser.add_argument("--trace-max", type=int, default=100000,
+                        help="largest size to run tracemalloc on")
+    parser.add_argument("--samples", type=int, default=2000,
+                        help="latency samples per size")
+    parser.add_argument("--csv", help="write a row per size here")
+    parser.add_argument("--breakdown",
+                        help="write the allocation sites and types here")
+    parser.add_argument("--plot", help="plot to this image (needs matplotlib)")
+    parser.add_argument("--one", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--traced", action="store_true",
+                        help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.one is not None: # child process: measure one size
+        out = asyncio.run(measure(args.one, args.kind,
+                                  args.traced, args.samples))
+        print(json.dumps(out))
+        return
+
+    def child(n : int, traced : bool) -> Optional[Dict[str, Any]]:
+        proc = subprocess.run([sys.executable, os.path.abspath(__file__),
+                               "--one", str(n), "--kind", args.kind,
+                               "--samples", str(args.samples)]
+                              + (["--traced"] if traced else []),
+                              capture_output=True, text=True)
+        if proc.returncode != 0:
+            print(f"{n:>8}  failed: {proc.stderr.strip().splitlines()[-1:]}")
+            return None
+        return json.loads(proc.stdout)
+
+    sizes = [1]
+    while sizes[-1] * args.factor <= args.max:
+        sizes.append(sizes[-1] * args.factor)
+    rows = []
+    print(f"{'wires':>8}  {'tasks':>8}  {'RSS B/wire':>10}  "
+          f"{'traced B/wire':>13}  {'p50 us':>7}  {'p99 us':>7}")
+    for n in sizes:
+        r = child(n, False)
+        if r is None:
+            break
+        if n <= args.trace_max:
+            t = child(n, True)
+            if t is None:
+                break
+            r.update((k, t[k]) for k in ("traced_per_wire", "sites", "types"))
+        rows.append(r)
+        traced = f"{r['traced_per_wire']:>13.0f}" \
+                 if "traced_per_wire" in r else f"{'-':>13}"
+        print(f"{n:>8}  {r['tasks']:>8}  {r['rss_per_wire']:>10.0f}  "
+              f"{traced}  {r['p50_us']:>7.1f}  {r['p99_us']:>7.1f}")
+
+    largest = max((r for r in rows if "sites" in r),
+                  key=lambda r: r["n"], default=None)
+    if largest is not None:
+        print(f"\nPer wire, with {largest['n']} resident:")
+        for name, count, nbytes in largest["types"]:
+            print(f"  {nbytes:>7.0f} B  {count:>5.2f} x {name}")
+        for site, nbytes, count in largest["sites"]:
+            print(f"  {nbytes:>7.0f} B  {count:>5.2f} blocks  {site}")
+
+    if args.csv is not None:
+        fields = ["n", "kind", "tasks", "rss_per_wire", "traced_per_wire",
+                  "p50_us", "p99_us"]
+        with open(args.csv, "w", newline="") as f:
+            w = csv.DictWriter(f, fields, extrasaction="ignore")
+            w.writeheader()
+            w.writerows(rows)
+    if args.breakdown is not None:
+        with open(args.breakdown, "w", newline="") as f:
+            w = csv.writer(f)
+            w.writerow(["n", "what", "name", "count_per_wire",
+                        "bytes_per_wire"])
+            for r in rows:
+                for name, count, nbytes in r.get("types", []):
+                    w.writerow([r["n"], "type", name, count, nbytes])
+                for site, nbytes, count in r.get("sites", []):
+                    w.writerow([r["n"], "site", site, count, nbytes])
+    if args.plot is not None:
+        try:
+            plot(rows, args.plot)
+        except ImportError:
+            print("--plot needs matplotlib", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""
+Throughput of CPU-bound wires spread over a `ShardedEventLoop`
+with a growing number of shards (including startup and shutdown).
+
+Usage::
+
+    python benchmarks/bench_shard.py [shards ...] [-n N] [--work W] [--pin]
+"""
+import argparse
+import asyncio
+import time
+
+from aiowire import ShardedEventLoop, Call
+
+def burn(n : int) -> int:
+    x = 0
+    for i in range(n):
+        x += i*i
+    return x
+
+async def bench(shards : int, n : int, work : int, pin : bool):
+    t0 = time.perf_counter()
+    async with ShardedEventLoop(shards, pin=pin) as sh:
+        for i in range(n):
+            await sh.submit(Call(burn, work), key=i)
+    dt = time.perf_counter() - t0
+    assert sum(st["started"] for st in sh.final_stats) == n
+    return n / dt
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("shards", type=int, nargs="*", default=[1, 2, 4])
+    parser.add_argument("-n", type=int, default=2000)
+    parser.add_argument("--work", type=int, default=20000)
+    parser.add_argument("--pin", action="store_true")
+    args = parser.parse_args(argv)
+
+    print(f"{'shards':>6}  {'wires/s':>10}  {'speedup':>7}")
+    base = None
+    for shards in args.shards:
+        rate = asyncio.run(bench(shards, args.n, args.work, args.pin))
+        if base is None:
+            base = rate
+        print(f"{shards:>6}  {rate:>10.0f}  {rate/base:>7.2f}")
+
+if __name__ == "__main__":
+    main()
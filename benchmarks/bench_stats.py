@@ -0,0 +1,52 @@
+"""
+Overhead of ``EventLoop(stats=True)``.
+
+Each run starts ``n`` wires, each of which suspends once
+and then continues with a `Call`, so every wire is one task launch
+and one continuation processed by `EventLoop.run`.
+The best of ``repeat`` runs is reported with and without stats.
+
+Usage::
+
+    python benchmarks/bench_stats.py [--repeat 9] [n ...]
+"""
+import argparse
+import asyncio
+import time
+
+from aiowire import EventLoop, Wire, Call
+
+def noop():
+    pass
+
+async def step(ev):
+    await asyncio.sleep(0)
+    return Call(noop)
+
+async def bench(n : int, stats : bool) -> float:
+    t0 = time.perf_counter()
+    async with EventLoop(stats=stats) as ev:
+        for i in range(n):
+            ev.start(step)
+    return time.perf_counter() - t0
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--repeat", type=int, default=9,
+                        help="runs per measurement (the best is shown)")
+    parser.add_argument("sizes", type=int, nargs="*",
+                        default=[1000, 10000, 100000])
+    args = parser.parse_args(argv)
+
+    print(f"{'wires':>8}  {'off (us/wire)':>14}  {'on (us/wire)':>13}"
+          f"  {'overhead':>9}")
+    for n in args.sizes:
+        off = on = float("inf")
+        for i in range(args.repeat): # interleaved, to share any drift
+            off = min(off, asyncio.run(bench(n, False)))
+            on = min(on, asyncio.run(bench(n, True)))
+        print(f"{n:>8}  {off/n*1e6:>14.2f}  {on/n*1e6:>13.2f}"
+              f"  {(on/off - 1)*100:>8.1f}%")
+
+if __name__ == "__main__":
+    main()
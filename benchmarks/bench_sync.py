@@ -0,0 +1,44 @@
+"""
+Throughput of short chains of synchronous wires,
+with and without eager (inline) starts.
+
+Each iteration starts ``Call(f) >> Call(g)``,
+where ``f`` and ``g`` are plain functions.
+
+Usage::
+
+    python benchmarks/bench_sync.py [--starts 100000]
+"""
+import argparse
+import asyncio
+import time
+
+from aiowire import EventLoop, Call
+
+async def bench(starts : int, eager : bool) -> float:
+    count = 0
+    def inc():
+        nonlocal count
+        count += 1
+
+    prog = Call(inc) >> Call(inc)
+    t0 = time.perf_counter()
+    async with EventLoop(eager=eager) as ev:
+        for i in range(starts):
+            ev.start(prog)
+    assert count == 2*starts
+    return (time.perf_counter() - t0) / starts
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--starts", type=int, default=100000,
+                        help="number of chains started")
+    args = parser.parse_args(argv)
+
+    print(f"{'eager':>6}  {'us/chain':>9}")
+    for eager in [False, True]:
+        dt = asyncio.run(bench(args.starts, eager))
+        print(f"{str(eager):>6}  {dt*1e6:>9.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Cost of pending timers: `After(delay, w)` (an entry in the
+EventLoop's timer wheel) versus ``Call(asyncio.sleep, delay) >> w``
+(a sleeping task).
+
+Reports the memory per pending timer, and the time to
+insert and cancel timers in the wheel versus `loop.call_at`.
+
+Usage::
+
+    python benchmarks/bench_timers.py [--timers 100000]
+"""
+import argparse
+import asyncio
+import time
+import tracemalloc
+
+from aiowire import EventLoop, Call, After
+from aiowire.timer import TimerWheel
+
+def noop():
+    pass
+
+async def memory(timers : int, wheel : bool) -> float:
+    async with EventLoop(timeout=0) as ev:
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        for i in range(timers):
+            if wheel:
+                ev.start( After(3600, Call(noop)) )
+            else:
+                ev.start( Call(asyncio.sleep, 3600) >> Call(noop) )
+        after = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+    return (after - before) / timers
+
+async def insert_cancel(timers : int) -> None:
+    loop = asyncio.get_running_loop()
+    now = loop.time()
+
+    wheel = TimerWheel(0.01, now)
+    t0 = time.perf_counter()
+    handles = [wheel.add(now + 1 + i*1e-3, noop) for i in range(timers)]
+    t1 = time.perf_counter()
+    for h in handles:
+        h.cancel()
+    t2 = time.perf_counter()
+    print(f"{'timer wheel':>14}  {(t1-t0)/timers*1e6:>9.3f}  "
+          f"{(t2-t1)/timers*1e6:>9.3f}")
+
+    t0 = time.perf_counter()
+    theap = [loop.call_at(now + 1 + i*1e-3, noop) for i in range(timers)]
+    t1 = time.perf_counter()
+    for th in theap:
+        th.cancel()
+    t2 = time.perf_counter()
+    print(f"{'loop.call_at':>14}  {(t1-t0)/timers*1e6:>9.3f}  "
+          f"{(t2-t1)/timers*1e6:>9.3f}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--timers", type=int, default=100000,
+                        help="number of pending timers")
+    args = parser.parse_args(argv)
+
+    print(f"{'pending timer':>30}  {'bytes':>6}")
+    for wheel, name in [(False, "Call(asyncio.sleep, t) >> w"),
+                        (True, "After(t, w)")]:
+        nbytes = asyncio.run(memory(args.timers, wheel))
+        print(f"{name:>30}  {nbytes:>6.0f}")
+    print()
+    print(f"{'':>14}  {'us/insert':>9}  {'us/cancel':>9}")
+    asyncio.run(insert_cancel(args.timers))
+
+if __name__ == "__main__":
+    main()
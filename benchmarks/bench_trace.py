@@ -0,0 +1,59 @@
+"""
+Overhead of tracing (``EventLoop(tracer=Tracer(sample=p))``).
+
+Each run starts ``n`` root wires, each of which suspends once,
+starts a child `Call` and continues with another `Call`.
+Spans are kept in memory (no file is written).
+The best of ``repeat`` runs is reported for each sampling rate.
+
+Usage::
+
+    python benchmarks/bench_trace.py [--repeat 5] [--n 10000] [rate ...]
+"""
+import argparse
+import asyncio
+import time
+
+from aiowire import EventLoop, Call
+from aiowire.trace import Tracer
+
+def noop():
+    pass
+
+async def step(ev):
+    ev.start(Call(noop))
+    await asyncio.sleep(0)
+    return Call(noop)
+
+async def bench(n : int, rate) -> float:
+    tracer = None if rate is None else Tracer(sample=rate, buffer=1 << 30)
+    t0 = time.perf_counter()
+    async with EventLoop(tracer=tracer) as ev:
+        for i in range(n):
+            ev.start(step)
+    return time.perf_counter() - t0
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--repeat", type=int, default=5,
+                        help="runs per measurement (the best is shown)")
+    parser.add_argument("--n", type=int, default=10000,
+                        help="root wires per run")
+    parser.add_argument("rates", type=float, nargs="*",
+                        default=[0.0, 0.01, 0.1, 1.0])
+    args = parser.parse_args(argv)
+
+    rates = [None] + args.rates
+    best = {r: float("inf") for r in rates}
+    for i in range(args.repeat): # interleaved, to share any drift
+        for r in rates:
+            best[r] = min(best[r], asyncio.run(bench(args.n, r)))
+    off = best[None]
+    print(f"{'sample':>8}  {'us/root':>8}  {'overhead':>9}")
+    for r in rates:
+        label = "off" if r is None else f"{r:g}"
+        print(f"{label:>8}  {best[r]/args.n*1e6:>8.2f}"
+              f"  {(best[r]/off - 1)*100:>8.1f}%")
+
+if __name__ == "__main__":
+    main()
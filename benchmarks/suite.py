@@ -0,0 +1,340 @@
+"""
+Microbenchmark suite for the core engine, with baselines
+written in plain asyncio.
+
+Each case runs ``n`` operations of one kind, and is repeated
+``--repeat`` times.  The fastest run gives the time per operation.
+Results are printed, and written as JSON with ``-o``, so that
+``--compare`` can show the change from an earlier run.
+
+Usage::
+
+    python benchmarks/suite.py [-k name] [--quick] [--repeat 5]
+                               [-o results.json] [--compare old.json]
+"""
+from typing import Callable, Dict, List, Any, Optional
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+from aiowire import EventLoop, Wire, Call, Repeat, compile
+
+try:
+    import zmq
+    import zmq.asyncio
+except ImportError:
+    zmq = None # type: ignore[assignment]
+
+def noop():
+    pass
+
+async def anoop():
+    pass
+
+async def nap(ev=None):
+    await asyncio.sleep(0)
+
+class Boom(Exception):
+    pass
+
+async def fail(ev=None):
+    await asyncio.sleep(0)
+    raise Boom()
+
+# Each case is an async function of n, returning the seconds
+# taken by its n operations.
+Case = Callable[[int], Any]
+
+cases : Dict[str, Case] = {}
+sizes : Dict[str, int] = {}
+
+def case(name : str, n : int) -> Callable[[Case], Case]:
+    def register(fn : Case) -> Case:
+        cases[name] = fn
+        sizes[name] = n
+        return fn
+    return register
+
+# start / complete throughput
+
+@case("start_complete/aiowire", 20000)
+async def start_aiowire(n):
+    t0 = time.perf_counter()
+    async with EventLoop() as ev:
+        for i in range(n):
+            ev.start(nap)
+    return time.perf_counter() - t0
+
+@case("start_complete/asyncio_tasks", 20000)
+async def start_tasks(n):
+    t0 = time.perf_counter()
+    await asyncio.gather(*[asyncio.create_task(nap()) for i in range(n)])
+    return time.perf_counter() - t0
+
+if sys.version_info >= (3, 11):
+    @case("start_complete/asyncio_taskgroup", 20000)
+    async def start_taskgroup(n):
+        t0 = time.perf_counter()
+        async with asyncio.TaskGroup() as tg: # type: ignore[attr-defined]
+            for i in range(n):
+                tg.create_task(nap())
+        return time.perf_counter() - t0
+
+# continuation-chain steps
+
+@case("chain_step/aiowire", 100000)
+async def chain_aiowire(n):
+    count = 0
+    async def state(ev):
+        nonlocal count
+        count += 1
+        if count < n:
+            return step
+        return None
+    step = Wire(state)
+    t0 = time.perf_counter()
+    async with EventLoop() as ev:
+        ev.start(step)
+    return time.perf_counter() - t0
+
+@case("chain_step/aiowire_untrampolined", 20000)
+async def chain_tasks(n):
+    count = 0
+    async def state(ev):
+        nonlocal count
+        count += 1
+        if count < n:
+            return step
+        return None
+    step = Wire(state)
+    t0 = time.perf_counter()
+    async with EventLoop(trampoline=False, eager=False) as ev:
+        ev.start(step)
+    return time.perf_counter() - t0
+
+@case("chain_step/asyncio_await", 100000)
+async def chain_await(n):
+    async def state():
+        pass
+    t0 = time.perf_counter()
+    for i in range(n):
+        await state()
+    return time.perf_counter() - t0
+
+# >> chains of various depths (per node)
+
+def _chain(depth : int) -> Wire:
+    # ((a >> b) >> c) >> ..., which nests `depth` deep
+    # when run uncompiled.
+    w = Call(noop)
+    for i in range(depth-1):
+        w = w >> Call(noop)
+    return w
+
+def _depth_case(depth : int, compiled : bool) -> None:
+    name = f"sequence_depth/{depth}" + ("_compiled" if compiled else "")
+    @case(name, 20000)
+    async def seq(n):
+        prog = _chain(depth)
+        if compiled:
+            prog = compile(prog)
+        runs = max(1, n // depth)
+        t0 = time.perf_counter()
+        async with EventLoop() as ev:
+            for i in range(runs):
+                ev.start(prog)
+        # (scaled to n nodes)
+        return (time.perf_counter() - t0) * n / (runs * depth)
+
+for _d in (10, 100, 1000):
+    # Uncompiled, deep chains overflow the stack.
+    if _d < sys.getrecursionlimit() // 2:
+        _depth_case(_d, False)
+    _depth_case(_d, True)
+
+@case("sequence_depth/asyncio_await", 20000)
+async def seq_await(n):
+    t0 = time.perf_counter()
+    for i in range(n):
+        await anoop()
+    return time.perf_counter() - t0
+
+# Repeat counts (per repetition)
+
+def _repeat_case(count : int) -> None:
+    @case(f"repeat/{count}", 50000)
+    async def rep(n):
+        prog = Repeat(Call(noop), count)
+        runs = max(1, n // count)
+        t0 = time.perf_counter()
+        async with EventLoop() as ev:
+            for i in range(runs):
+                ev.start(prog)
+        # (scaled to n repetitions)
+        return (time.perf_counter() - t0) * n / (runs * count)
+
+for _c in (10, 100, 1000, 10000):
+    _repeat_case(_c)
+
+# exceptions, sent to a handler
+
+@case("exception/aiowire_handler", 20000)
+async def exc_aiowire(n):
+    caught = 0
+    def handler(ev, e):
+        nonlocal caught
+        caught += 1
+    t0 = time.perf_counter()
+    async with EventLoop() as ev:
+        for i in range(n):
+            ev.start(fail, handler)
+    assert caught == n
+    return time.perf_counter() - t0
+
+@case("exception/asyncio_gather", 20000)
+async def exc_gather(n):
+    t0 = time.perf_counter()
+    out = await asyncio.gather(*[asyncio.create_task(fail())
+                                 for i in range(n)],
+                               return_exceptions=True)
+    assert len(out) == n
+    return time.perf_counter() - t0
+
+# inproc zmq messages
+
+if zmq is not None:
+    from aiowire import Poller
+
+    _nsock = 0
+
+    def _pair(ctx, n):
+        global _nsock
+        _nsock += 1
+        push = ctx.socket(zmq.PUSH)
+        pull = ctx.socket(zmq.PULL)
+        for s in (push, pull):
+            s.setsockopt(zmq.LINGER, 0)
+            s.setsockopt(zmq.SNDHWM, 0)
+            s.setsockopt(zmq.RCVHWM, 0)
+        pull.bind(f"inproc://suite{_nsock}")
+        push.connect(f"inproc://suite{_nsock}")
+        for i in range(n):
+            push.send(b"x")
+        return push, pull
+
+    def _poller_case(batch : Optional[int]) -> None:
+        name = "poller/per_message" if batch is None \
+               else f"poller/batch{batch}"
+        @case(name, 20000)
+        async def poll(n):
+            ctx = zmq.asyncio.Context.instance()
+            push, pull = _pair(ctx, n)
+            count = 0
+            async def one(ev):
+                nonlocal count
+                await pull.recv()
+                count += 1
+                if count == n:
+                    poller.shutdown()
+            def many(ev, msgs):
+                nonlocal count
+                count += len(msgs)
+                if count == n:
+                    poller.shutdown()
+            poller = Poller({pull: one if batch is None else many},
+                            batch=batch)
+            t0 = time.perf_counter()
+            async with EventLoop() as ev:
+                ev.start(poller)
+            dt = time.perf_counter() - t0
+            push.close()
+            pull.close()
+            return dt
+
+    _poller_case(None)
+    _poller_case(256)
+
+    @case("poller/asyncio_recv", 20000)
+    async def poll_recv(n):
+        ctx = zmq.asyncio.Context.instance()
+        push, pull = _pair(ctx, n)
+        t0 = time.perf_counter()
+        for i in range(n):
+            await pull.recv()
+        dt = time.perf_counter() - t0
+        push.close()
+        pull.close()
+        return dt
+
+def _commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"],
+                              capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))
+                             ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run(names : List[str], repeat : int, scale : float) -> Dict[str, Any]:
+    results = {}
+    for name in names:
+        n = max(1, int(sizes[name] * scale))
+        times = [asyncio.run(cases[name](n)) for i in range(repeat)]
+        best = min(times)
+        results[name] = { "n": n,
+                          "times": times,
+                          "best": best,
+                          "us_per_op": best / n * 1e6,
+                          "ops_per_s": n / best }
+    return { "python": platform.python_version(),
+             "implementation": platform.python_implementation(),
+             "machine": platform.machine(),
+             "platform": platform.platform(),
+             "cpus": os.cpu_count(),
+             "commit": _commit(),
+             "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+             "repeat": repeat,
+             "results": results }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("-k", dest="pattern", default="",
+                        help="only run cases whose name contains this")
+    parser.add_argument("--quick", action="store_true",
+                        help="run a tenth of the operations per case")
+    parser.add_argument("--repeat", type=int, default=5,
+                        help="runs per case (the best is kept)")
+    parser.add_argument("-o", "--output", help="write results to this file")
+    parser.add_argument("--compare", help="results file to compare with")
+    parser.add_argument("--list", action="store_true",
+                        help="list the cases and exit")
+    args = parser.parse_args(argv)
+
+    names = [name for name in cases if args.pattern in name]
+    if args.list:
+        print("\n".join(names))
+        return
+    out = run(names, args.repeat, 0.1 if args.quick else 1.0)
+    old = {}
+    if args.compare is not None:
+        with open(args.compare) as f:
+            old = json.load(f)["results"]
+
+    print(f"{'case':<36} {'us/op':>9} {'ops/s':>11}"
+          + (f" {'change':>8}" if old else ""))
+    for name, r in out["results"].items():
+        line = f"{name:<36} {r['us_per_op']:>9.3f} {r['ops_per_s']:>11.0f}"
+        if name in old:
+            line += f" {r['us_per_op']/old[name]['us_per_op'] - 1:>+8.1%}"
+        print(line)
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(out, f, indent=2)
+
+if __name__ == "__main__":
+    main()
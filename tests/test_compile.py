@@ -0,0 +1,111 @@
+import pytest
+import asyncio
+
+import aiowire
+from aiowire import EventLoop, Wire, Call, Repeat, Forever, Program
+
+def compositions(log):
+    # Each step logs (chain, step), so that the steps of each chain
+    # can be checked in order, however concurrent chains interleave.
+    # The chain that was started is "", the n-th chain spawned by
+    # `spawns` for x is (x, n), and the b-s forked by Repeat
+    # in [3] and [9] and by Forever in [7] are "b".
+    spawned = {}
+    def note(x, chain=""):
+        log.append((chain, x))
+    async def later(x, chain=""):
+        await asyncio.sleep(0)
+        log.append((chain, x))
+    def spawns(ev, x, chain=""):
+        log.append((chain, x))
+        n = spawned[x] = spawned.get(x, 0) + 1
+        return Call(note, x+"'", (x, n)) >> Call(later, x+"''", (x, n))
+    def stop(x):
+        log.append(("", x))
+        raise StopAsyncIteration()
+    count = 0
+    def counted():
+        nonlocal count
+        count += 1
+        log.append(("", count))
+        if count == 5:
+            raise StopAsyncIteration()
+
+    return [
+        Call(note, 'a') >> Call(note, 'b') >> Call(note, 'c'),
+        Call(note, 'a') >> (Call(later, 'b') >> Call(note, 'c')),
+        Wire(spawns, 'a') >> Call(note, 'b') >> Wire(spawns, 'c'),
+        (Wire(spawns, 'a') >> Call(later, 'b', 'b')) * 3 >> Call(note, 'c'),
+        Call(note, 'a') >> Repeat(Wire(spawns, 'b'), 0) >> Call(note, 'c'),
+        Call(note, 'a') >> Repeat(Wire(spawns, 'b'), 1),
+        Forever(Call(counted) >> Wire(spawns, 'a')),
+        Call(note, 'a') >> Forever(Call(counted) >> Call(later, 'b', 'b')),
+        Call(note, 'a') >> (Call(stop, 'b') >> Call(note, 'c')),
+        (Call(note, 'a') >> Wire(spawns, 'b', 'b')) * 2 >> Wire(spawns, 'c'),
+    ]
+
+async def trace(i, compiled, **kws):
+    log = []
+    w = compositions(log)[i]
+    if compiled:
+        w = aiowire.compile(w)
+    async with EventLoop(**kws) as ev:
+        ev.start(w, lambda ev, e: log.append(("", type(e).__name__)))
+    return log
+
+def chains(log):
+    # The steps of each chain in a trace, in order.
+    steps = {}
+    for chain, x in log:
+        steps.setdefault(chain, []).append(x)
+    return steps
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("kws", [{"eager": True}, {},
+                                 {"trampoline": False}])
+async def test_compile_semantics(kws):
+    for i in range(len(compositions([]))):
+        expect = await trace(i, False, **kws)
+        assert len(expect) > 0
+        got = await trace(i, True, **kws)
+        # Concurrent chains may interleave differently,
+        # but each must run its steps in order.
+        assert chains(got) == chains(expect), i
+
+@pytest.mark.asyncio
+async def test_compile_reuse():
+    n = 0
+    def f():
+        nonlocal n
+        n += 1
+    prog = aiowire.compile(Call(f) * 10 >> Call(f))
+    assert isinstance(prog, Program)
+    async with EventLoop() as ev:
+        for i in range(5):
+            ev.start(prog)
+    assert n == 5*11
+
+@pytest.mark.asyncio
+async def test_compile_long_chain():
+    n = 0
+    def f():
+        nonlocal n
+        n += 1
+    w = Call(f)
+    for i in range(9999):
+        w = w >> Call(f)
+    async with EventLoop() as ev:
+        ev.start(aiowire.compile(w))
+    assert n == 10000
+
+def test_compile_passthrough():
+    w = Wire(lambda ev: None)
+    assert aiowire.compile(w) is w
+    w = Call(print)
+    assert aiowire.compile(w) is w
+
+def test_compile_steps():
+    # One continuation boundary between nodes.
+    prog = aiowire.compile(Call(print) * 2 >> Wire(print))
+    ops = [op for op, arg in prog.ops]
+    assert all(a != b for a, b in zip(ops, ops[1:]))
@@ -1,6 +1,9 @@
 import pytest
 import asyncio
 import datetime
+import gc
+import sys
+import warnings
 
 from aiowire import __version__
 from aiowire import (
@@ -12,6 +15,7 @@ from aiowire import (
     Forever,
     UnhandledException,
 )
+from aiowire.event_loop import unhandled, HIGH, NORMAL, LOW
 
 # Wires with strange return values.
 async def return_non_callable(ev, x):
@@ -102,3 +106,396 @@ async def test_repeatM_call():
 async def test_foreverM_call():
     async with EventLoop(timeout=0.2) as eve:
         eve.start( Forever(Wire(callee, 1, 2)) )
+
+@pytest.mark.asyncio
+async def test_completion_queue():
+    gate = asyncio.Event()
+    finished = 0
+    async def parked(ev):
+        nonlocal finished
+        await gate.wait()
+        finished += 1
+
+    steps = 0
+    async def step(ev):
+        nonlocal steps
+        await asyncio.sleep(0)
+        steps += 1
+        if steps < 100:
+            return Wire(step)
+        gate.set()
+
+    async with EventLoop(timeout=5) as ev:
+        for i in range(1000):
+            ev.start(parked)
+        ev.start(step)
+        assert len(ev.tasks) == 1001
+
+    assert steps == 100
+    assert finished == 1000
+    assert len(ev.tasks) == 0
+
+@pytest.mark.asyncio
+async def test_trampoline():
+    tasks = set()
+    caught = []
+    async def state(ev, n):
+        await asyncio.sleep(0)
+        tasks.add(asyncio.current_task())
+        if n == 0:
+            raise ValueError("done")
+        return Wire(state, n-1)
+
+    def handler(ev, e):
+        caught.append(e)
+
+    for trampoline, ntasks in [(True, 1), (False, 201)]:
+        tasks.clear()
+        caught.clear()
+        async with EventLoop(trampoline=trampoline) as ev:
+            ev.start( Wire(state, 200), handler )
+        assert len(tasks) == ntasks
+        assert len(caught) == 1
+        assert isinstance(caught[0], ValueError)
+
+@pytest.mark.asyncio
+async def test_trampoline_cancelled():
+    # A wire cancelled before its first step leaves no coroutine
+    # unawaited.
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter("always")
+        for eager in [False, True]:
+            async with EventLoop(timeout=0, eager=eager) as ev:
+                ev.start( Call(print) >> Call(print) )
+            await asyncio.sleep(0) # (let the cancelled task finish)
+        gc.collect()
+    assert not [w for w in caught if w.category is RuntimeWarning]
+
+@pytest.mark.asyncio
+async def test_trampoline_fair():
+    # A chain that never awaits must not starve the timeout.
+    async with EventLoop(timeout=0.05) as ev:
+        ev.start( Forever(Call(lambda: None)) )
+
+@pytest.mark.asyncio
+async def test_eager():
+    counter = 0
+    def incr():
+        nonlocal counter
+        counter += 1
+    caught = []
+    def handler(ev, e):
+        caught.append(e)
+    def bad():
+        raise ValueError("sync failure")
+
+    async with EventLoop(eager=True) as ev:
+        ev.start( Call(incr) >> Call(incr) )
+        # Completed synchronously, and not tracked.
+        assert counter == 2
+        assert len(ev.tasks) == 0
+        ev.start( Call(bad), handler )
+        # The handler is still only called from run().
+        assert len(caught) == 0
+    assert len(caught) == 1
+    assert isinstance(caught[0], ValueError)
+
+    async with EventLoop(eager=False) as ev:
+        ev.start( Call(incr) >> Call(incr) )
+        assert counter == 2
+        assert len(ev.tasks) == 1
+    assert counter == 4
+
+@pytest.mark.asyncio
+async def test_eager_unsupported(monkeypatch):
+    # Without a way to step tasks eagerly, eager wires still run,
+    # as tasks started as usual.
+    import aiowire.event_loop
+    monkeypatch.setattr(aiowire.event_loop, "_eager_task",
+                        aiowire.event_loop._lazy_task)
+    counter = 0
+    def incr():
+        nonlocal counter
+        counter += 1
+    caught = []
+    async with EventLoop(eager=True) as ev:
+        ev.start( Call(incr) >> Call(incr) )
+        ev.start( Call(int, "x"), lambda ev, e: caught.append(e) )
+        assert counter == 0
+        assert len(ev.tasks) == 2
+    assert counter == 2
+    assert len(caught) == 1 and isinstance(caught[0], ValueError)
+
+@pytest.mark.asyncio
+async def test_eager_nesting():
+    depth = 0
+    async def spawn(ev):
+        nonlocal depth
+        depth += 1
+        if depth < 1000:
+            ev.start(spawn)
+
+    async with EventLoop(eager=True) as ev:
+        ev.start(spawn)
+        assert depth == EventLoop.inline_limit
+    assert depth == 1000
+
+@pytest.mark.asyncio
+async def test_eager_shared_future():
+    # Several wires, started eagerly, awaiting one future.
+    gate = asyncio.get_running_loop().create_future()
+    woken = 0
+    async def parked(ev):
+        nonlocal woken
+        await gate
+        woken += 1
+
+    async with EventLoop(eager=True) as ev:
+        for i in range(3):
+            ev.start(parked)
+        assert len(ev.tasks) == 3
+        await asyncio.sleep(0)
+        gate.set_result(None)
+    assert woken == 3
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("eager", [True, False])
+async def test_eager_current_task(eager):
+    # An eager first step runs in the wire's own task,
+    # whether started from another wire or from a callback.
+    seen = {}
+    async def probe(ev, name):
+        first = asyncio.current_task()
+        await asyncio.sleep(0)
+        seen[name] = (first, asyncio.current_task())
+    async def starter(ev):
+        ev.start(Wire(probe, "wire"))
+        seen["starter"] = asyncio.current_task()
+
+    async with EventLoop(eager=eager) as ev:
+        ev.start(starter)
+        asyncio.get_running_loop().call_soon(ev.start,
+                                             Wire(probe, "callback"))
+    for name in ("wire", "callback"):
+        first, later = seen[name]
+        assert first is not None and first is later
+    assert seen["wire"][0] is not seen["starter"]
+
+@pytest.mark.asyncio
+@pytest.mark.skipif(sys.version_info < (3, 11),
+                    reason="needs asyncio.timeout")
+@pytest.mark.parametrize("eager", [True, False])
+async def test_eager_timeout(eager):
+    # A timeout in a started wire cancels that wire's task,
+    # not the one that started it.
+    caught = []
+    async def slow(ev):
+        async with asyncio.timeout(0.02):
+            await asyncio.sleep(1)
+    async def starter(ev):
+        ev.start(slow, lambda ev, e: caught.append(e))
+        await asyncio.sleep(0.05)
+
+    async with EventLoop(eager=eager) as ev:
+        ev.start(starter)
+    assert len(caught) == 1
+    assert isinstance(caught[0], TimeoutError)
+
+@pytest.mark.asyncio
+async def test_shared_handler():
+    gate = asyncio.Event()
+    async def parked(ev):
+        await gate.wait()
+
+    async with EventLoop() as ev:
+        for i in range(10):
+            ev.start(parked)
+        assert all(h is unhandled for h in ev.tasks.values())
+        gate.set()
+
+@pytest.mark.asyncio
+async def test_debug_site():
+    async def fails(ev):
+        await asyncio.sleep(0)
+        raise ValueError("x")
+
+    with pytest.raises(UnhandledException) as e:
+        async with EventLoop() as ev:
+            ev.start(fails)
+    assert not getattr(e.value, "__notes__", None)
+
+    with pytest.raises(UnhandledException) as e:
+        async with EventLoop(debug=True) as ev:
+            ev.start(fails); line = sys._getframe().f_lineno
+    assert isinstance(e.value.__cause__, ValueError)
+    notes = e.value.__notes__
+    assert len(notes) == 1
+    assert f'{__file__}", line {line}, in test_debug_site' in notes[0]
+
+@pytest.mark.asyncio
+async def test_max_concurrency():
+    running = 0
+    peak = 0
+    done = 0
+    async def work(ev):
+        nonlocal running, peak, done
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.001)
+        running -= 1
+        done += 1
+
+    async with EventLoop(max_concurrency=4) as ev:
+        for i in range(20):
+            ev.start(work)
+        assert len(ev.tasks) == 4
+        assert ev.pending == 16
+    assert peak == 4
+    assert done == 20
+    assert ev.pending == 0
+    assert ev.pending_high == 16
+    assert ev.admitted == 16
+
+@pytest.mark.asyncio
+async def test_overflow():
+    async def work(ev, i, log):
+        await asyncio.sleep(0.001)
+        log.append(i)
+
+    for overflow, expect in [ ("drop_newest", [0, 1, 2]),
+                              ("drop_oldest", [0, 3, 4]),
+                              ("block", [0, 1, 2, 3, 4]) ]:
+        log = []
+        dropped = []
+        def handler(i):
+            def caught(ev, e):
+                assert isinstance(e, OverflowError)
+                dropped.append(i)
+            return caught
+        async with EventLoop(max_concurrency=1, max_pending=2,
+                             overflow=overflow) as ev:
+            for i in range(5):
+                ev.start( Wire(work, i, log), handler(i) )
+        assert log == expect
+        assert ev.dropped == 5 - len(expect)
+        assert sorted(dropped + log) == list(range(5))
+
+    with pytest.raises(UnhandledException):
+        async with EventLoop(max_concurrency=1, max_pending=2,
+                             overflow="drop_newest") as ev:
+            for i in range(5):
+                ev.start( Wire(work, i, []) )
+
+    with pytest.raises(asyncio.QueueFull):
+        async with EventLoop(max_concurrency=1, max_pending=2,
+                             overflow="raise") as ev:
+            for i in range(5):
+                ev.start( Wire(work, i, []) )
+
+    with pytest.raises(ValueError):
+        EventLoop(overflow="sometimes")
+    with pytest.raises(ValueError):
+        EventLoop(max_concurrency=1, max_pending=0, overflow="drop_oldest")
+
+@pytest.mark.asyncio
+async def test_submit():
+    log = []
+    async def work(ev, i):
+        await asyncio.sleep(0.001)
+        log.append(i)
+
+    async def producer(ev):
+        for i in range(10):
+            await ev.submit( Wire(work, i) )
+            assert ev.pending <= 2
+
+    async with EventLoop(max_concurrency=2, max_pending=2) as ev:
+        ev.start(producer)
+    assert log == list(range(10))
+    assert ev.pending_high == 2
+
+@pytest.mark.asyncio
+async def test_priority():
+    log = []
+    async def work(ev, name):
+        await asyncio.sleep(0.001)
+        log.append(name)
+
+    async with EventLoop(max_concurrency=1) as ev:
+        ev.start( Wire(work, "first") )
+        for i in range(3):
+            ev.start( Wire(work, "low"), priority=LOW )
+            ev.start( Wire(work, "normal") )
+            ev.start( Wire(work, "high"), priority=HIGH )
+    assert log == ["first"] + ["high"]*3 + ["normal"]*3 + ["low"]*3
+    assert ev.latency[HIGH].count == 3
+    assert ev.latency[NORMAL].count == 4
+    assert ev.latency[HIGH].mean < ev.latency[NORMAL].mean \
+                                 < ev.latency[LOW].mean
+
+    async with EventLoop() as ev:
+        for priority in [-1, 3, 5]:
+            with pytest.raises(ValueError):
+                ev.start( Wire(work, "bad"), priority=priority )
+            with pytest.raises(ValueError):
+                ev.after( 0.001, Wire(work, "bad"), priority=priority )
+            with pytest.raises(ValueError):
+                await ev.submit( Wire(work, "bad"), priority=priority )
+    assert "bad" not in log
+
+@pytest.mark.asyncio
+async def test_starvation():
+    log = []
+    async def work(ev, name):
+        await asyncio.sleep(0)
+        log.append(name)
+
+    async with EventLoop(max_concurrency=1) as ev:
+        ev.start( Wire(work, "first") )
+        ev.start( Wire(work, "low"), priority=LOW )
+        for i in range(20):
+            ev.start( Wire(work, "high"), priority=HIGH )
+    assert log.index("low") == 1 + EventLoop.starvation_limit
+
+@pytest.mark.asyncio
+async def test_repeat_reentrant():
+    counter = 0
+    def incr():
+        nonlocal counter
+        counter += 1
+    async def slow_incr():
+        await asyncio.sleep(0.001)
+        incr()
+
+    for prog in [ Call(incr) * 5, Call(slow_incr) * 5 ]:
+        counter = 0
+        async with EventLoop() as ev:
+            # started twice at once, and again afterwards
+            ev.start(prog)
+            ev.start(prog)
+        async with EventLoop() as ev:
+            ev.start(prog)
+        assert counter == 15
+
+    counter = 0
+    async with EventLoop() as ev:
+        ev.start( Call(incr) * 1 )
+        ev.start( Call(incr) * 0 )
+    assert counter == 1
+
+@pytest.mark.asyncio
+async def test_repeat_memory():
+    import tracemalloc
+    def noop():
+        pass
+
+    peaks = []
+    for n in [1000, 10000]:
+        prog = Call(noop) * n
+        tracemalloc.start()
+        async with EventLoop() as ev:
+            ev.start(prog)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    # O(1) memory over the lifetime of the Repeat.
+    assert peaks[1] < 2*peaks[0]
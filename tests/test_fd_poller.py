@@ -0,0 +1,93 @@
+import pytest
+import asyncio
+import socket
+import time
+
+from aiowire import EventLoop, FdPoller, Wire, Call
+
+@pytest.mark.asyncio
+async def test_fd_poller():
+    a, b = socket.socketpair()
+    c, d = socket.socketpair()
+    for s in (a, b, c, d):
+        s.setblocking(False)
+    got = []
+    def recv(ev, sock):
+        got.append(sock.recv(100))
+        if len(got) == 3:
+            poller.shutdown()
+
+    poller = FdPoller({b: Wire(recv, b)})
+    async def send(ev):
+        a.send(b'x')
+        await asyncio.sleep(0.01)
+        # Registering while running takes effect immediately.
+        poller.register(d.fileno(), Wire(recv, d))
+        c.send(b'y')
+        await asyncio.sleep(0.01)
+        poller.unregister(b)
+        a.send(b'ignored')
+        await asyncio.sleep(0.01)
+        c.send(b'z')
+
+    t0 = time.time()
+    async with EventLoop(5.0) as ev:
+        ev.start(poller)
+        ev.start(send)
+    assert time.time() - t0 < 1.0
+    assert got == [b'x', b'y', b'z']
+    for s in (a, b, c, d):
+        s.close()
+
+@pytest.mark.asyncio
+async def test_fd_poller_serialized():
+    a, b = socket.socketpair()
+    b.setblocking(False)
+    a.send(b'0123456789')
+
+    running = 0
+    most = 0
+    got = []
+    async def slow(ev):
+        # The socket stays readable while this sleeps.
+        nonlocal running, most
+        running += 1
+        most = max(most, running)
+        await asyncio.sleep(0.01)
+        got.append(b.recv(1))
+        running -= 1
+        if len(got) == 10:
+            poller.shutdown()
+
+    poller = FdPoller({})
+    poller.register(b, Wire(slow), mode="serialized")
+    async with EventLoop(5.0) as ev:
+        ev.start(poller)
+    assert most == 1
+    assert b''.join(got) == b'0123456789'
+    assert poller.inflight(b) == 0
+    a.close()
+    b.close()
+
+def test_fd_poller_pool_before_loop():
+    # A pool registered before any event loop runs.
+    a, b = socket.socketpair()
+    b.setblocking(False)
+    a.send(b'0123')
+
+    got = []
+    async def take(ev):
+        got.append(b.recv(1))
+        await asyncio.sleep(0.01)
+        if len(got) == 4:
+            poller.shutdown()
+
+    poller = FdPoller({})
+    poller.register(b, Wire(take), mode="pool")
+    async def main():
+        async with EventLoop(5.0) as ev:
+            ev.start(poller)
+    asyncio.run(main())
+    assert b''.join(got) == b'0123'
+    a.close()
+    b.close()
@@ -0,0 +1,56 @@
+import pytest
+import asyncio
+import glob
+import os
+import time
+
+from aiowire import EventLoop, InProcess, Call
+from aiowire.process_pool import ProcessPool
+
+def reverse(data, view=None):
+    return (bytes(data[::-1]), len(view) if view is not None else 0)
+
+def reverse_big(data):
+    return data[::-1]
+
+def fail(x):
+    raise ValueError(x)
+
+def pid():
+    return os.getpid()
+
+def segments():
+    return set(glob.glob("/dev/shm/psm_*"))
+
+@pytest.mark.asyncio
+async def test_in_process():
+    before = segments()
+    big = bytes(range(256)) * 4096 # 1 MiB
+    async with EventLoop(processes=2) as ev:
+        pool = ev.process_pool
+        # small: pickled
+        assert await ev.in_process(reverse, b'abc') == (b'cba', 0)
+        # large: shared memory (arguments and result)
+        ans = await ev.in_process(reverse_big, big)
+        assert ans == big[::-1]
+        ans = await ev.in_process(reverse, big, view=memoryview(big))
+        assert ans == (big[::-1], len(big))
+        errors = []
+        ev.start(InProcess(fail, 'x') >> Call(errors.append, 'not run'),
+                 lambda ev, e: errors.append(e))
+    assert len(errors) == 1 and isinstance(errors[0], ValueError)
+    assert pool.completed == 4
+    assert segments() == before
+
+@pytest.mark.asyncio
+async def test_in_process_cancel():
+    pool = ProcessPool(1)
+    try:
+        first = await pool.run(pid)
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(pool.run(time.sleep, 10), 0.2)
+        assert pool.restarts == 1
+        second = await pool.run(pid)
+        assert second != first
+    finally:
+        pool.shutdown()
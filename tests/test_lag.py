@@ -0,0 +1,53 @@
+import pytest
+import asyncio
+import time
+
+from aiowire import EventLoop, Forever, Call
+
+class Done(Exception):
+    pass
+
+@pytest.mark.asyncio
+async def test_lag():
+    count = 0
+    def work():
+        nonlocal count
+        count += 1
+        if count == 2:
+            time.sleep(0.3)
+        elif count == 3:
+            raise Done()
+
+    stalls = []
+    errors = []
+    async with EventLoop(stats=True, lag_threshold=0.05,
+                         on_lag=lambda ev, s: stalls.append(s)) as ev:
+        ev.start(Forever(Call(work) >> Call(asyncio.sleep, 0.1)),
+                 lambda ev, e: errors.append(e))
+    assert len(errors) == 1 and isinstance(errors[0], Done)
+    assert len(stalls) == 1
+    stall = stalls[0]
+    assert stall.lag >= 0.2
+    assert stall.path == ["Forever", "Sequence", "Call(work)"]
+    assert stall.wire == "Forever"
+    assert stall.step == "Call(work)"
+    assert stall.where[0] == __file__ and stall.where[2] == "work"
+
+    st = ev.stats()
+    assert list(st.stalls) == stalls
+    assert st["Call(work)"].stalls == 1
+    assert st["Call(work)"].stall_seconds == stall.lag
+    assert st.lag.count > 0 and st.lag.max >= 0.2
+
+@pytest.mark.asyncio
+async def test_no_lag():
+    stalls = []
+    async def nap(ev):
+        for i in range(10):
+            time.sleep(0.005)
+            await asyncio.sleep(0.01)
+    async with EventLoop(lag_threshold=0.05,
+                         on_lag=lambda ev, s: stalls.append(s)) as ev:
+        ev.start(nap)
+    assert stalls == []
+    assert ev._lag is None
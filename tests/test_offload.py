@@ -0,0 +1,64 @@
+import pytest
+import asyncio
+import threading
+import time
+
+from aiowire import EventLoop, Offload, Call
+
+@pytest.mark.asyncio
+async def test_offload():
+    ticks = 0
+    async def ticker(ev):
+        nonlocal ticks
+        while log.count('done') < 2:
+            await asyncio.sleep(0.001)
+            ticks += 1
+    threads = []
+    log = []
+    def block(x):
+        threads.append(threading.get_ident())
+        time.sleep(0.1)
+        return x
+
+    async with EventLoop() as ev:
+        ev.start(Offload(block, 1) >> Call(log.append, 'done'))
+        ev.start(ticker)
+        ev.start(Offload(block, 2) >> Call(log.append, 'done'))
+        pool = ev.thread_pool
+    # The loop kept running while block() slept.
+    assert ticks > 10
+    assert log.count('done') == 2
+    assert threading.get_ident() not in threads
+    assert pool.submitted == pool.completed == 2
+    assert 0 < pool.utilization() <= 1
+
+@pytest.mark.asyncio
+async def test_offload_queue():
+    gate = threading.Event()
+    seen = []
+    async def check(ev):
+        # Both threads are blocked, so further calls stay queued.
+        while pool.busy < 2 or pool.queued < 1:
+            await asyncio.sleep(0.001)
+        await asyncio.sleep(0.01)
+        seen.append((pool.busy, pool.queued))
+        gate.set()
+    async with EventLoop(5.0, threads=2, thread_queue=1) as ev:
+        pool = ev.thread_pool
+        for i in range(10):
+            ev.start(Offload(gate.wait))
+        ev.start(check)
+    assert seen == [(2, 1)]
+    assert pool.completed == 10
+    assert pool.queued == 0
+
+@pytest.mark.asyncio
+async def test_offload_exception():
+    errors = []
+    def fail():
+        raise ValueError("x")
+    async with EventLoop() as ev:
+        ev.start(Offload(fail) >> Call(errors.append, 'not run'),
+                 lambda ev, e: errors.append(e))
+    assert len(errors) == 1
+    assert isinstance(errors[0], ValueError)
@@ -0,0 +1,63 @@
+import pytest
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+from aiowire import EventLoop, Call, Forever
+from aiowire.profiler import Profiler
+
+def busy(dt):
+    t = time.perf_counter()
+    while time.perf_counter() - t < dt:
+        pass
+
+@pytest.mark.asyncio
+async def test_profiler():
+    with Profiler(0.001) as prof:
+        async with EventLoop() as ev:
+            ev.start((Call(busy, 0.02) >> Call(asyncio.sleep, 0.01)) * 5)
+    assert prof.samples > 0
+    text = prof.collapsed()
+    assert any(line.startswith("Repeat.a;Sequence.a;Call(busy);busy (")
+               for line in text.splitlines())
+    hot = sum(n for stack, n in prof.counts.items()
+                if stack[-2:-1] == ("Call(busy)",))
+    assert hot > 0.5*prof.samples
+
+script = """
+import asyncio, sys, time
+from aiowire import EventLoop, Forever, Call
+
+def busy():
+    t = time.perf_counter()
+    while time.perf_counter() - t < 0.01:
+        pass
+
+async def main():
+    async with EventLoop(timeout=float(sys.argv[1])) as ev:
+        ev.start(Forever(Call(busy) >> Call(asyncio.sleep, 0)))
+
+asyncio.run(main())
+"""
+
+def test_cli(tmp_path):
+    path = tmp_path / "work.py"
+    path.write_text(script)
+    out = tmp_path / "stacks.txt"
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.path.dirname(os.path.dirname(__file__))
+    subprocess.run([sys.executable, "-m", "aiowire.profiler",
+                    "-o", str(out), str(path), "0.2"],
+                   check=True, env=env, timeout=30)
+    lines = out.read_text().splitlines()
+    assert any(line.startswith("Forever.a;Sequence.a;Call(busy);busy (work.py:")
+               for line in lines)
+
+@pytest.mark.asyncio
+async def test_idle():
+    with Profiler(0.001, idle=True) as prof:
+        async with EventLoop() as ev:
+            ev.start(Call(asyncio.sleep, 0.05))
+    assert prof.counts.get(("<idle>",), 0) > 0
@@ -0,0 +1,41 @@
+import pytest
+import asyncio
+
+from aiowire import ShardedEventLoop, Call, UnhandledException
+
+def work(x):
+    return x*x
+
+def fail(x):
+    raise ValueError(x)
+
+@pytest.mark.asyncio
+async def test_sharded():
+    errors = []
+    def handler(sh, e):
+        errors.append(e)
+
+    keys = [f"user{i}" for i in range(40)]
+    async with ShardedEventLoop(3, handler) as sh:
+        assert [sh.shard_of(k) for k in keys] == \
+               [sh.shard_of(k) for k in keys]
+        assert len(set(sh.shard_of(k) for k in keys)) == 3
+        count = [0]*3
+        for k in keys:
+            i = sh.start(Call(work, 3), key=k)
+            assert i == sh.shard_of(k)
+            count[i] += 1
+        await sh.submit(Call(fail, 'x'), key=keys[0])
+        stats = await sh.stats()
+        assert [st["shard"] for st in stats] == [0, 1, 2]
+    assert [st["started"] for st in sh.final_stats] == \
+           [count[i] + (i == sh.shard_of(keys[0])) for i in range(3)]
+    assert len(errors) == 1
+    assert isinstance(errors[0], ValueError)
+    assert sh.final_stats[sh.shard_of(keys[0])]["errors"] == 1
+
+@pytest.mark.asyncio
+async def test_sharded_unhandled():
+    with pytest.raises(UnhandledException):
+        async with ShardedEventLoop(2) as sh:
+            sh.start(Call(fail, 'y'))
@@ -0,0 +1,125 @@
+import pytest
+import asyncio
+import pickle
+import tracemalloc
+
+from aiowire import (
+    EventLoop,
+    Wire,
+    Sequence,
+    Call,
+    Offload,
+    InProcess,
+    Repeat,
+    Forever,
+    After,
+    Every,
+    compile,
+)
+from aiowire import wire as wire_module
+
+def noop():
+    pass
+
+async def step(ev):
+    pass
+
+def builtins():
+    return [ Wire(step), Call(noop), Offload(noop), InProcess(noop),
+             Sequence(Call(noop), Call(noop)), Repeat(Call(noop), 3),
+             Forever(Call(noop)), After(1, Call(noop)),
+             Every(1, Call(noop)), compile(Call(noop) >> Call(noop)) ]
+
+def test_no_dict():
+    for w in builtins():
+        assert not hasattr(w, "__dict__"), type(w)
+
+def test_pickle():
+    w = Call(print, "x", end="") >> Repeat(Wire(step), 2)
+    w2 = pickle.loads(pickle.dumps(w))
+    assert type(w2.a) is Call and w2.a.args == ("x",)
+    assert w2.a.kwargs == {"end": ""}
+    assert w2.b.n == 2 and w2.b.a._aiowire is step
+
+def bytes_per(make, n=2000):
+    make() # (warm up caches)
+    tracemalloc.start()
+    objs = [make() for i in range(n)]
+    size, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size / n
+
+class DictSequence(Wire):
+    # A Wire extension, with an instance __dict__.
+    def __init__(self, a, b):
+        self.a = a
+        self.b = b
+    async def __call__(self, ev):
+        pass
+
+def test_memory():
+    leaf = Call(noop)
+    slotted = bytes_per(lambda: Sequence(leaf, leaf))
+    with_dict = bytes_per(lambda: DictSequence(leaf, leaf))
+    assert slotted < with_dict
+    # The object itself, and a pointer in the list.
+    assert slotted <= 96
+
+@pytest.mark.asyncio
+async def test_extension():
+    # Extensions following the __init__/__call__ rule still work,
+    # with or without __slots__ of their own.
+    log = []
+    class Tagged(Wire):
+        def __init__(self, tag):
+            self.tag = tag
+        async def __call__(self, ev):
+            log.append(self.tag)
+    class Compact(Wire):
+        __slots__ = ('tag',)
+        def __init__(self, tag):
+            self.tag = tag
+        async def __call__(self, ev):
+            log.append(self.tag)
+
+    t = Tagged("a")
+    t.extra = 1
+    assert not hasattr(Compact("b"), "__dict__")
+    async with EventLoop() as ev:
+        ev.start(t >> Compact("b") >> Wire(step))
+    assert log == ["a", "b"]
+
+@pytest.mark.asyncio
+async def test_repeat_freelist():
+    count = 0
+    async def incr(ev):
+        nonlocal count
+        await asyncio.sleep(0)
+        count += 1
+
+    rep = Repeat(Wire(incr), 3)
+    async with EventLoop() as ev:
+        for i in range(10):
+            ev.start(rep)
+    assert count == 30
+    free = wire_module._free_repeating
+    assert 0 < len(free) <= Repeat.freelist
+    assert all(r.a is None for r in free)
+
+    # A later run reuses one.
+    n = len(free)
+    async with EventLoop(eager=True) as ev:
+        ev.start(rep)
+        assert len(free) == n-1
+    assert count == 33
+
+    old = Repeat.freelist
+    Repeat.freelist = 0
+    try:
+        del free[:]
+        async with EventLoop() as ev:
+            ev.start(rep)
+        assert count == 36
+        assert len(free) == 0
+    finally:
+        Repeat.freelist = old
@@ -0,0 +1,114 @@
+import pytest
+import asyncio
+import os
+import socket
+import threading
+
+from aiowire import EventLoop, Wire, Call
+from aiowire.stats import Histogram, prometheus_text, write_prometheus
+
+def test_histogram():
+    h = Histogram()
+    for i in range(1, 1001):
+        h.record(i * 1e-3)
+    assert h.count == 1000
+    assert h.max == 1.0
+    assert abs(h.mean - 0.5005) < 1e-9
+    # within the bucket width (1/8)
+    assert 0.5 <= h.quantile(0.5) <= 0.5 * (1 + 1/8)
+    assert 0.99 <= h.quantile(0.99) <= 1.0
+    h.record(0.0)
+    h.record(1e9) # beyond the range
+    assert h.counts[0] == 1 and h.counts[-1] == 1
+    le, n = h.cumulative()[-1]
+    assert n == h.count
+
+@pytest.mark.asyncio
+async def test_stats():
+    async def nap(ev):
+        await asyncio.sleep(0.01)
+    async def bad(ev):
+        return 42
+    async def fail(ev):
+        await asyncio.sleep(0)
+        raise ValueError("x")
+    errors = []
+    def handler(ev, e):
+        errors.append(e)
+
+    async with EventLoop(stats=True) as ev:
+        ev.stats().sample = 1 # time every task
+        for i in range(3):
+            ev.start(nap)
+        ev.start(Call(print, end=""))
+        ev.start(bad, handler)
+        ev.start(fail, handler)
+        ev.start(Wire(nap) >> Call(print, end=""))
+    st = ev.stats()
+    assert st["nap"].starts == 3
+    assert st["nap"].completions == 3
+    assert st["nap"].residency.count == 3
+    assert st["nap"].residency.quantile(0.5) >= 0.01
+    assert st["Call(print)"].starts == 1
+    assert st["bad"].type_errors == 1
+    assert st["fail"].exceptions == 1
+    assert st["Sequence"].completions == 1
+    assert len(errors) == 2
+    assert st.as_dict()["fail"]["exceptions"] == 1
+
+    with pytest.raises(RuntimeError):
+        EventLoop().stats()
+
+@pytest.mark.asyncio
+async def test_stats_sample():
+    async def nap(ev):
+        await asyncio.sleep(0)
+    async with EventLoop(stats=True) as ev:
+        assert ev.stats().sample == 16
+        for i in range(20):
+            ev.start(nap)
+    st = ev.stats()
+    assert st["nap"].completions == 20
+    # The 1st and 17th launches were timed.
+    assert st["nap"].residency.count == 2
+
+@pytest.mark.asyncio
+async def test_prometheus(tmp_path):
+    async def nap(ev):
+        await asyncio.sleep(0.001)
+    async with EventLoop(stats=True) as ev:
+        ev.stats().sample = 1
+        ev.start(nap)
+        ev.start(nap)
+    text = prometheus_text(ev.stats(), ev)
+    assert 'aiowire_wire_starts_total{wire="nap"} 2' in text
+    assert 'aiowire_wire_residency_seconds_bucket{wire="nap",le="+Inf"} 2' \
+            in text
+    assert 'aiowire_wire_residency_seconds_count{wire="nap"} 2' in text
+    assert "aiowire_tasks 0" in text
+
+    path = str(tmp_path / "aiowire.prom")
+    write_prometheus(text, path)
+    with open(path) as f:
+        assert f.read() == text
+    assert os.listdir(tmp_path) == ["aiowire.prom"]
+
+    addr = str(tmp_path / "sock")
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(addr)
+    server.listen(1)
+    got = []
+    def accept():
+        conn, _ = server.accept()
+        with conn:
+            while True:
+                data = conn.recv(65536)
+                if not data:
+                    break
+                got.append(data)
+    th = threading.Thread(target=accept)
+    th.start()
+    write_prometheus(text, unix_socket=addr)
+    th.join()
+    server.close()
+    assert b"".join(got).decode() == text
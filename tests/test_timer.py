@@ -0,0 +1,200 @@
+import pytest
+import asyncio
+import random
+
+from aiowire import EventLoop, Wire, Call, After, Every
+from aiowire.timer import TimerWheel
+
+def turn(wheel, jitter=0.0):
+    # Run the wheel until it is empty, as an owner would.
+    fired = []
+    t = wheel.t0
+    while len(wheel) > 0:
+        t = max(t, wheel.next_expiry()) + random.uniform(0, jitter)
+        for timer in wheel.advance(t):
+            assert timer.deadline <= t
+            assert t - timer.deadline <= wheel.resolution + jitter
+            fired.append(timer.item)
+    return fired
+
+def test_wheel():
+    random.seed(7)
+    wheel = TimerWheel(0.01)
+    deadlines = [random.uniform(0, 3000) for i in range(5000)]
+    timers = [wheel.add(d, i) for i, d in enumerate(deadlines)]
+    cancelled = set(random.sample(range(len(timers)), 500))
+    for i in cancelled:
+        assert timers[i].cancel()
+        assert not timers[i].cancel()
+    assert len(wheel) == 4500
+
+    fired = turn(wheel, 0.005)
+    assert len(fired) == 4500
+    assert not (set(fired) & cancelled)
+    ticks = [wheel.tick_of(deadlines[i]) for i in fired]
+    assert ticks == sorted(ticks)
+
+def test_wheel_span():
+    # Deadlines beyond the span of the wheel are re-filed.
+    wheel = TimerWheel(1e-6)
+    wheel.add(wheel.span*2.5e-6, "far")
+    wheel.add(1.0, "near")
+    assert turn(wheel) == ["near", "far"]
+
+def test_wheel_reuse():
+    wheel = TimerWheel(0.1)
+    timer = wheel.add(1.0, "x")
+    assert wheel.advance(0.95) == []
+    assert wheel.advance(1.0) == [timer]
+    assert not timer.active
+    timer.deadline = 2.0
+    wheel.add_timer(timer)
+    assert wheel.advance(2.0) == [timer]
+
+def test_wheel_freelist():
+    wheel = TimerWheel(0.1)
+    kept = wheel.add(1.0, "kept")
+    spare = wheel.add(1.0, "spare", reuse=True)
+    assert wheel.advance(1.0) == [kept, spare]
+    wheel.release(kept) # not added with reuse
+    wheel.release(spare)
+    assert wheel.add(2.0, "x") is not spare
+    again = wheel.add(2.0, "y", reuse=True)
+    assert again is spare and again.active
+    assert wheel.advance(2.0)[-1].item == "y"
+
+@pytest.mark.asyncio
+async def test_after_freelist():
+    # A chain of After continuations recycles the loop's timers,
+    # but never one handed out by ev.after().
+    steps = 0
+    free = []
+    async def step(ev):
+        nonlocal steps
+        steps += 1
+        if steps < 20:
+            return After(0.001, Wire(step))
+        free.extend(ev._wheel._free)
+
+    async with EventLoop(timer_resolution=0.001) as ev:
+        held = ev.after(0.001, Wire(step))
+    assert steps == 20
+    assert not held.reuse
+    assert len(free) == 1 and free[0] is not held
+
+@pytest.mark.asyncio
+async def test_after():
+    log = []
+    loop = asyncio.get_running_loop()
+    t0 = loop.time()
+    def mark(name):
+        log.append((name, loop.time() - t0))
+
+    async with EventLoop(timer_resolution=0.005, eager=True) as ev:
+        ev.start( After(0.05, Call(mark, "b")) )
+        ev.start( After(0.02, Call(mark, "a")) )
+        # Returned After-s park the continuation in the wheel.
+        ev.start( Call(mark, "c0") >> After(0.03, Call(mark, "c")) )
+        timer = ev.after(0.01, Call(mark, "cancelled"))
+        assert timer is not None and timer.cancel()
+        # No tasks are needed for any of this.
+        assert len(ev.tasks) == 0
+
+    assert [name for name, t in log] == ["c0", "a", "c", "b"]
+    for name, t in log[1:]:
+        delay = {"a": 0.02, "b": 0.05, "c": 0.03}[name]
+        assert delay <= t < delay + 0.05
+
+@pytest.mark.asyncio
+async def test_after_timeout():
+    log = []
+    async with EventLoop(timeout=0.05) as ev:
+        ev.start( After(0.01, Call(log.append, "early")) )
+        ev.start( After(10, Call(log.append, "late")) )
+    assert log == ["early"]
+
+@pytest.mark.asyncio
+async def test_after_exception():
+    caught = []
+    async def fails(ev):
+        raise ValueError("x")
+
+    async with EventLoop() as ev:
+        ev.start( After(0.01, Wire(fails)), lambda ev, e: caught.append(e) )
+    assert len(caught) == 1
+    assert isinstance(caught[0], ValueError)
+
+    # Awaited directly, After just sleeps.
+    log = []
+    async with EventLoop() as ev:
+        ev.start( After(0.01, Call(log.append, 1)) >> Call(log.append, 2) )
+    assert sorted(log) == [1, 2]
+
+@pytest.mark.asyncio
+async def test_every():
+    loop = asyncio.get_running_loop()
+    ticks = []
+    def tick():
+        ticks.append(loop.time())
+
+    async with EventLoop(timeout=0.205, timer_resolution=0.001) as ev:
+        t0 = loop.time()
+        ev.start( Every(0.02, Call(tick)) )
+    assert len(ticks) == 10
+    # No drift: tick k is due at t0 + k*period.
+    for k, t in enumerate(ticks, 1):
+        assert 0 <= t - (t0 + k*0.02) < 0.01
+
+@pytest.mark.asyncio
+async def test_every_delayed():
+    # An Every started after a delay ticks a whole period after that.
+    loop = asyncio.get_running_loop()
+    for delayed in ["After", "ev.after"]:
+        ticks = []
+        def tick():
+            ticks.append(loop.time())
+        async with EventLoop(timeout=0.13, timer_resolution=0.001) as ev:
+            t0 = loop.time()
+            w = Every(0.04, Call(tick))
+            if delayed == "After":
+                ev.start( After(0.02, w) )
+            else:
+                ev.after(0.02, w)
+        assert len(ticks) == 2
+        for k, t in enumerate(ticks):
+            assert 0 <= t - (t0 + 0.06 + k*0.04) < 0.01
+
+@pytest.mark.asyncio
+async def test_every_overrun():
+    loop = asyncio.get_running_loop()
+    for policy, lo, hi in [("skip", 5, 6), ("catch_up", 9, 10)]:
+        ticks = []
+        async def slow(ev):
+            ticks.append(loop.time())
+            if len(ticks) == 1:
+                await asyncio.sleep(0.095) # overruns 4 deadlines
+        async with EventLoop(timeout=0.2, timer_resolution=0.001) as ev:
+            t0 = loop.time()
+            ev.start( Every(0.02, Wire(slow), policy) )
+        assert lo <= len(ticks) <= hi
+        if policy == "skip":
+            # Later ticks stay on the original grid.
+            for t in ticks[1:]:
+                assert (t - t0 + 0.002) % 0.02 < 0.01
+
+@pytest.mark.asyncio
+async def test_every_exception():
+    calls = 0
+    caught = []
+    async def fails(ev):
+        nonlocal calls
+        calls += 1
+        if calls == 3:
+            raise ValueError("x")
+    async with EventLoop(timeout=1) as ev:
+        ev.start( Every(0.01, Wire(fails)), lambda ev, e: caught.append(e) )
+    assert calls == 3
+    assert len(caught) == 1
+
+    with pytest.raises(ValueError):
+        Every(0, Wire(fails))
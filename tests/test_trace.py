@@ -0,0 +1,108 @@
+import pytest
+import asyncio
+import json
+
+from aiowire import EventLoop, Call
+from aiowire.trace import Tracer
+
+def background():
+    pass
+
+def send_ans():
+    pass
+
+async def handle_req(ev):
+    ev.start(Call(background))
+    await asyncio.sleep(0)
+    return Call(send_ans)
+
+async def server(ev):
+    await asyncio.sleep(0)
+    ev.start(handle_req)
+    ev.start(handle_req)
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("trampoline", [True, False])
+async def test_trace(trampoline):
+    tracer = Tracer()
+    async with EventLoop(tracer=tracer, trampoline=trampoline) as ev:
+        ev.start(server)
+    spans = tracer.spans
+    by_id = {s.span_id: s for s in spans}
+    names = sorted(s.name for s in spans)
+    assert names == ["Call(background)"]*2 + ["Call(send_ans)"]*2 \
+                  + ["handle_req"]*2 + ["server"]
+    assert len({s.trace_id for s in spans}) == 1
+    for s in spans:
+        assert s.end >= s.start
+        if s.name == "server":
+            assert s.parent_id is None
+        elif s.name == "handle_req":
+            assert by_id[s.parent_id].name == "server"
+        elif s.name == "Call(background)":
+            assert by_id[s.parent_id].name == "handle_req"
+        else: # continuation of handle_req
+            assert by_id[s.link_id].name == "handle_req"
+            assert by_id[s.parent_id].name == "server"
+
+@pytest.mark.asyncio
+async def test_sampling():
+    tracer = Tracer(sample=0.0)
+    async with EventLoop(tracer=tracer) as ev:
+        ev.start(server)
+    assert tracer.spans == []
+
+    tracer = Tracer(sample=0.5)
+    async with EventLoop(tracer=tracer) as ev:
+        for i in range(200):
+            ev.start(server)
+    # Whole traces are kept or dropped.
+    traces = {}
+    for s in tracer.spans:
+        traces[s.trace_id] = traces.get(s.trace_id, 0) + 1
+    assert 50 < len(traces) < 150
+    assert set(traces.values()) == {7}
+
+@pytest.mark.asyncio
+async def test_errors():
+    async def fail(ev):
+        raise ValueError("oops")
+    tracer = Tracer()
+    async with EventLoop(tracer=tracer) as ev:
+        ev.start(fail, lambda ev, e: None)
+    assert tracer.spans[0].error == "ValueError('oops')"
+
+@pytest.mark.asyncio
+async def test_export(tmp_path):
+    path = str(tmp_path / "trace.json")
+    tracer = Tracer(path, buffer=3)
+    async with EventLoop(tracer=tracer) as ev:
+        ev.start(server)
+    assert tracer.written == 7
+    with open(path) as f:
+        text = f.read()
+    events = json.loads(text.rstrip().rstrip(",") + "]")
+    assert len(events) == 14
+    assert {e["ph"] for e in events} == {"b", "e"}
+    assert len({e["id"] for e in events}) == 1
+
+    path = str(tmp_path / "trace.jsonl")
+    tracer = Tracer(path, format="otlp")
+    async with EventLoop(tracer=tracer) as ev:
+        ev.start(server)
+    with open(path) as f:
+        lines = f.readlines()
+    assert len(lines) == 1
+    spans = json.loads(lines[0])["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    assert len(spans) == 7
+    ids = {s["spanId"] for s in spans}
+    for s in spans:
+        assert len(s["traceId"]) == 32 and len(s["spanId"]) == 16
+        assert int(s["endTimeUnixNano"]) >= int(s["startTimeUnixNano"])
+        if s["name"] != "server":
+            assert s["parentSpanId"] in ids
+        if s["name"] == "Call(send_ans)":
+            assert s["links"][0]["spanId"] in ids
+
+    with pytest.raises(ValueError):
+        Tracer(format="zipkin")
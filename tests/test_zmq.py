@@ -17,7 +17,7 @@ import time
 
 import pytest
 
-from aiowire import EventLoop, Poller, Call
+from aiowire import EventLoop, Poller, EdgePoller, Wire, Call
 
 import zmq
 from zmq.asyncio import Context
@@ -114,3 +114,157 @@ async def test_run():
         ev.start( C )
     assert C.nok > 1
     assert C.nshut > 1
+
+@pytest.mark.asyncio
+async def test_wakeup():
+    ctx = Context.instance()
+    a = new_socket(ctx, zmq.PAIR)
+    b = new_socket(ctx, zmq.PAIR)
+    a.bind('inproc://test_wakeup')
+    b.connect('inproc://test_wakeup')
+    got = []
+    async def recv(ev):
+        got.append(await b.recv())
+        poller.shutdown()
+
+    poller = Poller({})
+    async def later(ev):
+        # Registering with a waiting poll takes effect immediately.
+        await asyncio.sleep(0.05)
+        poller.register(b, Wire(recv))
+        await a.send(b'x')
+
+    t0 = time.time()
+    async with EventLoop(5.0) as ev:
+        ev.start( poller )
+        ev.start( later )
+    assert got == [b'x']
+    assert time.time() - t0 < 1.0
+    assert poller._wake_r == -1
+
+    # Shutdown is noticed without an interval.
+    poller = Poller({})
+    t0 = time.time()
+    async with EventLoop(5.0) as ev:
+        ev.start( poller )
+        ev.start( Call(asyncio.sleep, 0.05) >> Call(poller.shutdown) )
+    assert time.time() - t0 < 1.0
+    a.close()
+    b.close()
+
+@pytest.mark.asyncio
+async def test_batch():
+    ctx = Context.instance()
+    socks = []
+    for i in range(2):
+        a = new_socket(ctx, zmq.PAIR)
+        b = new_socket(ctx, zmq.PAIR)
+        a.bind(f'inproc://test_batch{i}')
+        b.connect(f'inproc://test_batch{i}')
+        for j in range(100):
+            a.send_multipart([b'%d' % i, b'%d' % j])
+        socks.append((a, b))
+
+    batches = []
+    def recv(ev, msgs):
+        batches.append(msgs)
+        if sum(map(len, batches)) == 200:
+            poller.shutdown()
+    poller = Poller({b: recv for a, b in socks}, batch=16)
+    async with EventLoop(2.0) as ev:
+        ev.start(poller)
+
+    assert all(0 < len(m) <= 16 for m in batches)
+    for i in range(2):
+        got = [m[1] for msgs in batches for m in msgs if m[0] == b'%d' % i]
+        assert got == [b'%d' % j for j in range(100)]
+    # Busy sockets take turns.
+    first = [msgs[0][0] for msgs in batches[:8]]
+    assert first.count(b'0') == 4
+    for a, b in socks:
+        a.close()
+        b.close()
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("mode,workers,batch,edge", [
+                                        ("serialized", 1, None, False),
+                                        ("pool", 3, 1, False),
+                                        ("serialized", 1, None, True)])
+async def test_dispatch_mode(mode, workers, batch, edge):
+    ctx = Context.instance()
+    a = new_socket(ctx, zmq.PAIR)
+    b = new_socket(ctx, zmq.PAIR)
+    a.bind(f'inproc://test_mode_{mode}{edge}')
+    b.connect(f'inproc://test_mode_{mode}{edge}')
+    for i in range(10):
+        a.send(b'%d' % i)
+
+    running = 0
+    most = 0
+    got = []
+    async def slow(ev, msgs=None):
+        # The socket stays readable while this sleeps.
+        nonlocal running, most
+        running += 1
+        most = max(most, running)
+        await asyncio.sleep(0.01)
+        if msgs is None:
+            got.append(await b.recv())
+        else:
+            got.extend(m[0] for m in msgs)
+        running -= 1
+        if len(got) == 10:
+            poller.shutdown()
+
+    if edge:
+        poller = EdgePoller({})
+    else:
+        poller = Poller({}, batch=batch)
+    poller.register(b, slow, mode=mode, workers=workers)
+    with pytest.raises(ValueError):
+        poller.register(a, slow, mode="storm")
+    t0 = time.time()
+    async with EventLoop(5.0) as ev:
+        ev.start(poller)
+    assert time.time() - t0 < 2.0
+    assert most == workers
+    assert sorted(got) == sorted(b'%d' % i for i in range(10))
+    assert poller.inflight(b) == 0
+    a.close()
+    b.close()
+
+@pytest.mark.asyncio
+async def test_edge_poller():
+    ctx = Context.instance()
+    pairs = []
+    for i in range(20):
+        a = new_socket(ctx, zmq.PAIR)
+        b = new_socket(ctx, zmq.PAIR)
+        a.bind(f'inproc://test_edge{i}')
+        b.connect(f'inproc://test_edge{i}')
+        pairs.append((a, b))
+    # Queued before the poller starts.
+    for j in range(100):
+        pairs[0][0].send(b'%d' % j)
+
+    got = []
+    async def recv(ev, b):
+        got.append(await b.recv())
+        if len(got) == 200:
+            poller.shutdown()
+    poller = EdgePoller({b: Wire(recv, b) for a, b in pairs})
+    async def send(ev):
+        for j in range(100):
+            await asyncio.sleep(0)
+            pairs[j % 20][0].send(b'x')
+
+    async with EventLoop(5.0) as ev:
+        ev.start(poller)
+        ev.start(send)
+    assert len(got) == 200
+    assert [m for m in got if m != b'x'] == [b'%d' % j for j in range(100)]
+    for a, b in pairs:
+        poller.unregister(b)
+        a.close()
+        b.close()
+    assert poller._fds == {}